@@ -1 +0,0 @@
-from .ball_possession import BallPossession
\ No newline at end of file
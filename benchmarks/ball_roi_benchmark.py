@@ -0,0 +1,130 @@
+import argparse
+import json
+import time
+import sys
+import numpy as np
+from football_analysis import DEFAULT_MODEL_PATH
+from football_analysis.utils import VideoReader
+from football_analysis.trackers import Tracker
+from football_analysis.ball_roi_tracker.ball_roi_tracker import model_input_pixels
+from football_analysis.track_store import ObjectTracks
+from football_analysis.trackers.tracker import BALL_ROI_FULL_PASS_IMGSZ
+from benchmarks.synthetic import make_match
+
+#ball box centre per frame, nan where there's no ball
+def ball_centres(ball_tracks, num_frames):
+    centres = np.full((num_frames,2), np.nan)
+    bbox = ball_tracks.column('bbox').astype(np.float64)
+    centres[ball_tracks.frame] = (bbox[:,:2] + bbox[:,2:])/2
+    return centres
+
+#share of the reference balls found within distance pixels, and share of the found balls that are near one
+def score_ball(reference_centres, centres, distance=12):
+    reference_seen = ~np.isnan(reference_centres[:,0])
+    seen = ~np.isnan(centres[:,0])
+    close = np.linalg.norm(np.nan_to_num(reference_centres - centres, nan=np.inf), axis=1) <= distance
+    return {
+        'frames_with_ball': int(seen.sum()),
+        'recall': float(close[reference_seen].mean()) if reference_seen.any() else None,
+        'precision': float(close[seen].mean()) if seen.any() else None,
+    }
+
+#ball found by full-frame detection at imgsz on every frame, and how long it took
+def detect_ball_full_frame(tracker, frames, imgsz):
+    start = time.perf_counter()
+    ball_frames = []
+    ball_bboxes = []
+    for frame_num, frame in enumerate(frames):
+        bbox = tracker.detect_ball(frame, imgsz)
+        if bbox is not None:
+            ball_frames.append(frame_num)
+            ball_bboxes.append(bbox)
+    seconds = time.perf_counter() - start
+    return ObjectTracks(len(frames), ball_frames, np.ones(len(ball_frames)), np.reshape(ball_bboxes, (-1,4))), seconds
+
+#ball detection on the full frame every frame against following the ball with crops, on their own and on
+#top of the smaller full-frame pass get_track_store(ball_roi=True) runs for the players, without a
+#labelled reference the full-frame detections are the reference
+def compare_ball_roi(model_path, frames, reference_tracks=None, crop_size=320, max_misses=3, imgsz=640,
+                     full_pass_imgsz=BALL_ROI_FULL_PASS_IMGSZ):
+    tracker = Tracker(model_path)
+    num_frames = len(frames)
+    height, width = frames[0].shape[:2]
+
+    full_frame_tracks, full_frame_seconds = detect_ball_full_frame(tracker, frames, imgsz)
+    full_frame_centres = ball_centres(full_frame_tracks, num_frames)
+
+    start = time.perf_counter()
+    roi_tracks = tracker.get_ball_tracks_roi(frames, crop_size=crop_size, max_misses=max_misses, full_frame_imgsz=imgsz)
+    roi_seconds = time.perf_counter() - start
+    roi_centres = ball_centres(roi_tracks, num_frames)
+    roi_stats = tracker.ball_roi_stats
+
+    #the full-frame pass is what the players need anyway, so its time counts too
+    pass_tracks, pass_seconds = detect_ball_full_frame(tracker, frames, full_pass_imgsz)
+    start = time.perf_counter()
+    shared_tracks = tracker.get_ball_tracks_roi(frames, fallback_tracks=pass_tracks, fallback_imgsz=full_pass_imgsz,
+                                                crop_size=crop_size, max_misses=max_misses, full_frame_imgsz=imgsz)
+    shared_seconds = time.perf_counter() - start + pass_seconds
+    shared_centres = ball_centres(shared_tracks, num_frames)
+
+    reference_centres = ball_centres(reference_tracks, num_frames) if reference_tracks is not None else full_frame_centres
+    return {
+        'full_frame': {
+            'seconds': full_frame_seconds,
+            'fps': num_frames/full_frame_seconds,
+            'model_pixels': num_frames*model_input_pixels(height, width, imgsz),
+            **score_ball(reference_centres, full_frame_centres),
+        },
+        'roi': {
+            'seconds': roi_seconds,
+            'fps': num_frames/roi_seconds,
+            **roi_stats,
+            **score_ball(reference_centres, roi_centres),
+        },
+        'roi_with_full_pass': {
+            'seconds': shared_seconds,
+            'fps': num_frames/shared_seconds,
+            **tracker.ball_roi_stats,
+            **score_ball(reference_centres, shared_centres),
+        },
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare ball detection on crops around its predicted position against the full frame')
+    parser.add_argument('--video', help='real footage, scored against full-frame detections, synthetic footage with a known ball otherwise')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--frames', type=int, default=120, help='number of frames to use')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--crop-size', type=int, default=320)
+    parser.add_argument('--max-misses', type=int, default=3)
+    parser.add_argument('--imgsz', type=int, default=640, help='model input size for full-frame searches')
+    parser.add_argument('--full-pass-imgsz', type=int, default=BALL_ROI_FULL_PASS_IMGSZ,
+                        help='model input size of the players\' full-frame pass the crops run on top of')
+    parser.add_argument('--output', help='write the report to this json file')
+    args = parser.parse_args()
+
+    reference_tracks = None
+    if args.video:
+        frames = VideoReader(args.video).read_frames(stop=args.frames)
+    else:
+        frames, tracks, _ = make_match(args.frames, seed=args.seed)
+        reference_tracks = tracks['ball']
+    results = compare_ball_roi(args.model, frames, reference_tracks, args.crop_size, args.max_misses, args.imgsz,
+                               args.full_pass_imgsz)
+
+    for name, result in results.items():
+        recall = f"{result['recall']:.3f}" if result['recall'] is not None else '-'
+        print(f"{name:<20}{result['fps']:>8.1f} fps, ball in {result['frames_with_ball']} frames, recall {recall}, "
+              f"{result['model_pixels']/len(frames)/1000:.0f}k model pixels/frame")
+    for name in ('roi', 'roi_with_full_pass'):
+        print(f"{name}: {results[name]['roi_searches']} crop searches, {results[name]['full_searches']} extra full-frame "
+              f"searches, {results[name]['pixel_ratio']:.2f}x the full-frame pixels")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
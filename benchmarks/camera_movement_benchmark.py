@@ -0,0 +1,60 @@
+import argparse
+import time
+import sys
+import numpy as np
+from football_analysis.utils import VideoReader
+from football_analysis.camera_movement_estimator import CameraMovementEstimator
+from benchmarks.synthetic import make_panning_frames
+
+#time both camera movement modes on the same frames and compare their output
+def compare_camera_movement(frames, downscale=0.5, reduction='max'):
+    results = {}
+
+    estimator = CameraMovementEstimator(frames[0])
+    start = time.perf_counter()
+    accurate = np.asarray(estimator.get_camera_movement(frames), dtype=np.float32)
+    results['accurate_fps'] = len(frames)/(time.perf_counter()-start)
+
+    estimator = CameraMovementEstimator(frames[0])
+    start = time.perf_counter()
+    fast = estimator.get_camera_movement_fast(frames, downscale=downscale, reduction=reduction)
+    results['fast_fps'] = len(frames)/(time.perf_counter()-start)
+
+    deviation = np.abs(fast - accurate).max(axis=1)
+    results['max_deviation_px'] = float(deviation.max())
+    results['mean_deviation_px'] = float(deviation.mean())
+    return results, accurate, fast
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare camera movement estimation modes')
+    parser.add_argument('--video', help='video to run on, synthetic panning footage when not given')
+    parser.add_argument('--frames', type=int, default=120, help='number of frames to use')
+    parser.add_argument('--downscale', type=float, default=0.5)
+    parser.add_argument('--reduction', choices=['median','max'], default='max',
+                        help="'max' keeps to the accurate mode's statistic, 'median' is faster but can differ from it")
+    parser.add_argument('--tolerance', type=float, default=1.0, help='allowed deviation from the accurate mode in pixels')
+    args = parser.parse_args()
+
+    truth = None
+    if args.video:
+        frames = VideoReader(args.video).read_frames(stop=args.frames)
+    else:
+        frames, truth = make_panning_frames(args.frames)
+        #both modes report no movement below the estimator's minimum distance
+        minimum_distance = CameraMovementEstimator(frames[0]).minimum_distance
+        truth[np.hypot(truth[:,0],truth[:,1]) <= minimum_distance] = 0
+
+    results, accurate, fast = compare_camera_movement(frames, args.downscale, args.reduction)
+    print(f"accurate: {results['accurate_fps']:.1f} fps")
+    print(f"fast:     {results['fast_fps']:.1f} fps ({results['fast_fps']/results['accurate_fps']:.1f}x)")
+    print(f"deviation: max {results['max_deviation_px']:.2f} px, mean {results['mean_deviation_px']:.2f} px")
+    #the fast mode replaces the accurate one in the pipeline, so it is held to the accurate mode's output,
+    #the error against a known pan is only reported alongside
+    if truth is not None:
+        print(f"error against true pan: accurate {np.abs(accurate-truth).max():.2f} px, fast {np.abs(fast-truth).max():.2f} px")
+    within = results['max_deviation_px'] <= args.tolerance
+    print('within tolerance' if within else f'outside {args.tolerance} px tolerance')
+    return 0 if within else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+import argparse
+import json
+import time
+import sys
+import numpy as np
+from football_analysis import DEFAULT_MODEL_PATH
+from football_analysis.utils import VideoReader
+from football_analysis.trackers import Tracker
+
+#intersection over union of every box in boxes_a against every box in boxes_b
+def box_iou(boxes_a, boxes_b):
+    boxes_a = np.asarray(boxes_a, dtype=np.float64).reshape(-1,4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float64).reshape(-1,4)
+    top_left = np.maximum(boxes_a[:,None,:2], boxes_b[None,:,:2])
+    bottom_right = np.minimum(boxes_a[:,None,2:], boxes_b[None,:,2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:,2:] - boxes_a[:,:2], axis=1)
+    area_b = np.prod(boxes_b[:,2:] - boxes_b[:,:2], axis=1)
+    union = area_a[:,None] + area_b[None,:] - intersection
+    return np.where(union > 0, intersection/np.maximum(union,1e-9), 0)
+
+#greedily pair boxes with the highest overlap first, returning the IoU of every pair above the threshold
+def match_boxes(reference_boxes, boxes, threshold=0.5):
+    iou = box_iou(reference_boxes, boxes)
+    matched = []
+    while iou.size and iou.max() >= threshold:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        matched.append(iou[i,j])
+        iou[i,:] = 0
+        iou[:,j] = 0
+    return matched
+
+#how closely tracks follow the reference tracks, per object type
+def compare_tracks(reference_tracks, tracks, threshold=0.5):
+    fidelity = {}
+    for object, reference_object_tracks in reference_tracks.items():
+        matched_iou = []
+        reference_count = 0
+        count = 0
+        for reference_frame, frame in zip(reference_object_tracks, tracks[object]):
+            reference_boxes = [track_info['bbox'] for track_info in reference_frame.values()]
+            boxes = [track_info['bbox'] for track_info in frame.values()]
+            reference_count += len(reference_boxes)
+            count += len(boxes)
+            matched_iou += match_boxes(reference_boxes, boxes, threshold)
+        fidelity[object] = {
+            'recall': len(matched_iou)/reference_count if reference_count else 1.0,
+            'precision': len(matched_iou)/count if count else 1.0,
+            'mean_iou': float(np.mean(matched_iou)) if matched_iou else None,
+        }
+    return fidelity
+
+#time adaptive detection at each stride against detecting every frame, and score how far the tracks drift
+def compare_detection_stride(model_path, frames, strides=(2,3,5), min_confidence=0.6, max_pan=8):
+    results = {}
+
+    tracker = Tracker(model_path)
+    start = time.perf_counter()
+    reference_tracks = tracker.get_object_tracks(frames)
+    reference_seconds = time.perf_counter()-start
+    results['every_frame'] = {'seconds': reference_seconds, 'fps': len(frames)/reference_seconds}
+
+    for stride in strides:
+        tracker = Tracker(model_path)
+        start = time.perf_counter()
+        tracks = tracker.get_object_tracks_adaptive(frames, stride=stride, min_confidence=min_confidence, max_pan=max_pan)
+        seconds = time.perf_counter()-start
+        results[f'stride_{stride}'] = {
+            'seconds': seconds,
+            'fps': len(frames)/seconds,
+            'speed_up': reference_seconds/seconds,
+            **tracker.adaptive_stats,
+            'fidelity': compare_tracks(reference_tracks, tracks),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare adaptive detection strides against detecting every frame')
+    parser.add_argument('--video', required=True)
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--frames', type=int, default=240, help='number of frames to use')
+    parser.add_argument('--strides', type=int, nargs='+', default=[2,3,5])
+    parser.add_argument('--min-confidence', type=float, default=0.6)
+    parser.add_argument('--max-pan', type=float, default=8)
+    parser.add_argument('--output', help='write the report to this json file')
+    args = parser.parse_args()
+
+    frames = VideoReader(args.video).read_frames(stop=args.frames)
+    results = compare_detection_stride(args.model, frames, args.strides, args.min_confidence, args.max_pan)
+
+    print(f"every frame: {results['every_frame']['fps']:.1f} fps")
+    for stride in args.strides:
+        result = results[f'stride_{stride}']
+        players = result['fidelity']['players']
+        print(f"stride {stride}: {result['fps']:.1f} fps ({result['speed_up']:.2f}x), "
+              f"{result['detected_frames']} detected, {result['fallback_frames']} early, "
+              f"player recall {players['recall']:.3f}, mean IoU {players['mean_iou'] or 0:.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
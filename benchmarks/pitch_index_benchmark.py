@@ -0,0 +1,91 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from football_analysis.track_store import TrackStore, ObjectTracks
+from football_analysis.pitch_index import PitchIndex
+from football_analysis.pitch_index.pitch_index import PITCH_SIZE
+
+#penalty area of the pitch segment the view transformer covers, in metres
+PENALTY_AREA = (0, 13.84, 16.5, 54.16)
+
+#players wandering over the pitch for a whole match, with pitch positions and teams already filled in
+def make_pitch_tracks(minutes=95, fps=24, num_players=22, missing=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    num_frames = int(minutes*60*fps)
+    frame = np.repeat(np.arange(num_frames), num_players)
+    track_id = np.tile(np.arange(1, num_players + 1), num_frames)
+    size = np.array(PITCH_SIZE)
+    #random walks folded back at the touchlines
+    position = rng.uniform(0, size, (1,num_players,2)) + np.cumsum(rng.normal(0, 0.05, (num_frames,num_players,2)), axis=0)
+    position = size - np.abs(np.mod(position, 2*size) - size)
+    position = position.reshape(-1,2)
+    position[rng.random(len(position)) < missing] = np.nan
+
+    player_tracks = ObjectTracks(num_frames, frame, track_id, np.zeros((len(frame),4)))
+    player_tracks.set_column('transformed_position', position)
+    player_tracks.set_column('team', (track_id > num_players//2).astype(np.int8))
+    return TrackStore(num_frames, {'players': player_tracks})
+
+#the same zone question answered by a pass over every row
+def scan_zone_occupancy(player_tracks, zone, start_frame, stop_frame):
+    position = player_tracks.column('transformed_position')
+    inside = ((player_tracks.frame >= start_frame) & (player_tracks.frame < stop_frame)
+              & (position[:,0] >= zone[0]) & (position[:,0] <= zone[2])
+              & (position[:,1] >= zone[1]) & (position[:,1] <= zone[3]))
+    track_ids, frames = np.unique(player_tracks.track_id[inside], return_counts=True)
+    return dict(zip(track_ids.tolist(), frames.tolist()))
+
+def time_query(fn, repeats):
+    seconds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)*1000
+
+def benchmark_pitch_index(tracks, fps=24, repeats=20):
+    start = time.perf_counter()
+    index = PitchIndex(tracks, fps=fps)
+    build_seconds = time.perf_counter() - start
+
+    ten, twelve = index.frame_at(minutes=10), index.frame_at(minutes=12)
+    queries = {
+        'zone_2_minutes': lambda: index.zone_occupancy(PENALTY_AREA, ten, twelve),
+        'zone_match': lambda: index.zone_occupancy(PENALTY_AREA),
+        'heatmap_player': lambda: index.heatmap(track_id=7),
+        'heatmap_team': lambda: index.heatmap(team=0),
+        'team_shape_2_minutes': lambda: index.team_shape(0, ten, twelve),
+        'scan_zone_2_minutes': lambda: scan_zone_occupancy(tracks['players'], PENALTY_AREA, ten, twelve),
+    }
+    if index.zone_occupancy(PENALTY_AREA, ten, twelve) != scan_zone_occupancy(tracks['players'], PENALTY_AREA, ten, twelve):
+        raise AssertionError('index and scan disagree on the penalty area')
+    return {
+        'rows': index.num_rows,
+        'build_seconds': build_seconds,
+        'query_ms': {name: time_query(query, repeats) for name, query in queries.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Time pitch index queries against scanning every row')
+    parser.add_argument('--minutes', type=float, default=95)
+    parser.add_argument('--fps', type=int, default=24)
+    parser.add_argument('--players', type=int, default=22)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--output', help='write the report to this json file')
+    args = parser.parse_args()
+
+    tracks = make_pitch_tracks(args.minutes, args.fps, args.players)
+    results = benchmark_pitch_index(tracks, args.fps, args.repeats)
+    print(f"{results['rows']} rows indexed in {results['build_seconds']:.2f}s")
+    for name, milliseconds in results['query_ms'].items():
+        print(f'{name:<24}{milliseconds:>8.2f} ms')
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import argparse
+import copy
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import numpy as np
+from football_analysis.trackers import Tracker
+from football_analysis.camera_movement_estimator import CameraMovementEstimator
+from football_analysis.view_transformer import ViewTransformer
+from football_analysis.speed_and_distance_estimator import SpeedAndDistanceEstimator
+from football_analysis.team_assigner import TeamAssigner
+from football_analysis.ball_possession import BallPossession, PossessionStats
+from football_analysis.annotation_renderer import AnnotationRenderer
+from benchmarks.synthetic import make_match, load_labelled_images
+
+TEST_IMAGES = 'football-players-detection-1/football-players-detection-1/test'
+#default synthetic run recorded with --save-baseline, timings only compare on similar hardware
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stage_baseline.json')
+
+#each stage takes the shared context of frames, tracks and earlier results and adds its own, in the
+#order main.process_video runs them
+def run_detection(context):
+    context['tracks'] = context['tracker'].get_track_store(context['frames'])
+
+def run_positions(context):
+    context['tracker'].add_position_to_tracks(context['tracks'])
+
+def run_camera_movement(context):
+    estimator = CameraMovementEstimator(context['frames'][0])
+    context['camera_movement'] = estimator.get_camera_movement(context['frames'])
+
+def run_camera_movement_fast(context):
+    estimator = CameraMovementEstimator(context['frames'][0])
+    context['camera_movement_fast'] = estimator.get_camera_movement(context['frames'], fast=True)
+
+def run_view_transformer(context):
+    view_transformer = ViewTransformer()
+    view_transformer.set_camera_movement(context['camera_movement'])
+    view_transformer.add_transformed_position_to_tracks(context['tracks'])
+
+def run_ball_interpolation(context):
+    context['tracks']['ball'] = context['tracker'].interpolate_ball_position(context['tracks']['ball'])
+
+def run_speed_and_distance(context):
+    SpeedAndDistanceEstimator().add_speed_and_distance_to_tracks(context['tracks'])
+
+def run_team_assignment(context):
+    team_assigner = TeamAssigner()
+    team_assigner.assign_team_colour(context['frames'][0], context['tracks']['players'][0])
+    team_assigner.add_team_to_track_store(context['tracks'], context['frames'])
+
+def run_ball_possession(context):
+    tracks = context['tracks']
+    ball_possession = BallPossession()
+    assigned_players = ball_possession.add_possession_to_track_store(tracks)
+    team_possession = ball_possession.get_team_possession(tracks['players'], assigned_players)
+    context['possession_stats'] = PossessionStats.from_frames(team_possession, assigned_players)
+
+#drawing only, frames are rendered in this process and dropped rather than encoded
+def run_rendering(context):
+    renderer = AnnotationRenderer()
+    for _ in renderer.render(context['frames'], context['tracks'], context['possession_stats'], context['camera_movement']):
+        pass
+
+STAGES = {
+    'detection': run_detection,
+    'positions': run_positions,
+    'camera_movement': run_camera_movement,
+    'camera_movement_fast': run_camera_movement_fast,
+    'view_transformer': run_view_transformer,
+    'ball_interpolation': run_ball_interpolation,
+    'speed_and_distance': run_speed_and_distance,
+    'team_assignment': run_team_assignment,
+    'ball_possession': run_ball_possession,
+    'rendering': run_rendering,
+}
+#stages timed on their own but left out of the end to end run, which uses the accurate camera movement
+#as main.py does
+OPTIONAL_STAGES = ('camera_movement_fast',)
+
+#peak bytes allocated while fn runs, numpy and opencv arrays included
+def measure_peak_memory(fn, *args):
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+#time the chosen stages on their own and every stage end to end, each stage is given a copy of exactly
+#the context the stages before it produced, so it is timed on realistic input without re-running the rest
+def benchmark_stages(frames, tracks, tracker, stages, repeats=3, detection=False):
+    num_frames = len(frames)
+    shared = {'frames': frames, 'tracker': tracker}
+    def fresh(snapshot):
+        return dict(copy.deepcopy(snapshot), **shared)
+
+    #first run through records the input of every stage, and warms up imports and caches
+    pipeline_stages = [name for name in STAGES if name not in OPTIONAL_STAGES and (name != 'detection' or detection)]
+    context = fresh({'tracks': tracks})
+    snapshots = {}
+    for name in STAGES:
+        if name in pipeline_stages or name in stages:
+            snapshots[name] = copy.deepcopy({key: value for key, value in context.items() if key not in shared})
+            STAGES[name](context)
+
+    results = {}
+    for name in stages:
+        seconds = []
+        for _ in range(repeats):
+            stage_context = fresh(snapshots[name])
+            start = time.perf_counter()
+            STAGES[name](stage_context)
+            seconds.append(time.perf_counter() - start)
+        peak = measure_peak_memory(STAGES[name], fresh(snapshots[name]))
+        results[name] = summarise(seconds, num_frames, peak)
+
+    def run_pipeline(context):
+        for name in pipeline_stages:
+            STAGES[name](context)
+    seconds = []
+    for _ in range(repeats):
+        pipeline_context = fresh(snapshots[pipeline_stages[0]])
+        start = time.perf_counter()
+        run_pipeline(pipeline_context)
+        seconds.append(time.perf_counter() - start)
+    peak = measure_peak_memory(run_pipeline, fresh(snapshots[pipeline_stages[0]]))
+    results['pipeline'] = summarise(seconds, num_frames, peak)
+    return results
+
+#best of the repeats is the figure compared between runs, it is the least affected by other load
+def summarise(seconds, num_frames, peak_bytes):
+    best = min(seconds)
+    return {
+        'seconds': best,
+        'median_seconds': float(np.median(seconds)),
+        'fps': num_frames/best if best > 0 else float('inf'),
+        'peak_mb': peak_bytes/1024**2,
+    }
+
+#stages that got slower or hungrier than the baseline by more than the tolerances, None when the
+#baseline was recorded with different settings and can't be compared
+def compare_to_baseline(report, baseline, tolerance=0.15, memory_tolerance=0.25):
+    if baseline.get('config') != report['config']:
+        return None
+    regressions = []
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        #stages taking a fraction of a millisecond are all timer noise, they need to lose at least a
+        #millisecond as well before they count
+        if result['fps'] < base['fps']*(1 - tolerance) and result['seconds'] - base['seconds'] > 0.001:
+            regressions.append({'stage': name, 'metric': 'fps', 'baseline': base['fps'], 'value': result['fps']})
+        #a little slack so tiny stages don't flag on allocator noise
+        if result['peak_mb'] > base['peak_mb']*(1 + memory_tolerance) + 1:
+            regressions.append({'stage': name, 'metric': 'peak_mb', 'baseline': base['peak_mb'], 'value': result['peak_mb']})
+    return regressions
+
+def print_report(report, baseline=None):
+    print(f"{'stage':<22}{'fps':>10}{'ms/frame':>10}{'peak MB':>10}" + (f"{'vs base':>10}" if baseline else ''))
+    for name, result in report['results'].items():
+        line = f"{name:<22}{result['fps']:>10.1f}{1000/result['fps']:>10.2f}{result['peak_mb']:>10.1f}"
+        base = baseline['results'].get(name) if baseline else None
+        if base is not None:
+            line += f"{result['fps']/base['fps']:>9.2f}x"
+        print(line)
+    print(f"max RSS {report['max_rss_mb']:.0f} MB")
+
+def main():
+    parser = argparse.ArgumentParser(description='Time each pipeline stage and the pipeline end to end, CPU only')
+    parser.add_argument('--frames', type=int, default=60, help='number of frames')
+    parser.add_argument('--players', type=int, default=22, help='players on the synthetic pitch')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--images', nargs='?', const=TEST_IMAGES, help='use a labelled YOLO split instead of synthetic footage, '
+                                                                        f'{TEST_IMAGES} when no folder is given')
+    parser.add_argument('--model', help='also time detection and tracking with this model, tracks then come from the model')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), help='stages to time on their own, every stage by default')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='write the report as JSON')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='report to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed fractional drop in fps')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='allowed fractional rise in peak memory')
+    args = parser.parse_args()
+
+    if args.images:
+        frames, tracks = load_labelled_images(args.images, args.frames)
+    else:
+        frames, tracks, _ = make_match(args.frames, args.players, seed=args.seed)
+
+    if args.model:
+        tracker = Tracker(args.model)
+        tracker.warm_up(frames[0].shape)
+    else:
+        #the stages after detection never touch the model, so they can run on a tracker without one
+        tracker = Tracker.__new__(Tracker)
+    if args.stages and 'detection' in args.stages and not args.model:
+        parser.error('the detection stage needs --model')
+    stages = args.stages or [name for name in STAGES if name != 'detection' or args.model]
+
+    #runs are only compared when they were made on the same footage and tracks
+    config = {'frames': len(frames), 'players': args.players, 'seed': args.seed, 'images': args.images, 'model': args.model}
+    report = {
+        'config': config,
+        'repeats': args.repeats,
+        'results': benchmark_stages(frames, tracks, tracker, stages, args.repeats, detection=bool(args.model)),
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024,
+    }
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = []
+    if baseline is not None:
+        regressions = compare_to_baseline(report, baseline, args.tolerance, args.memory_tolerance)
+        if regressions is None:
+            print(f'{args.baseline} was recorded with different settings, not compared')
+            baseline, regressions = None, []
+    print_report(report, baseline)
+    if baseline is not None:
+        for regression in regressions:
+            print(f"REGRESSION {regression['stage']} {regression['metric']}: "
+                  f"{regression['baseline']:.2f} -> {regression['value']:.2f}")
+        report['regressions'] = regressions
+
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import glob
+import os
+import numpy as np
+import cv2
+from football_analysis.track_store import ObjectTracks, TrackStore
+
+#textured background larger than the frame so the camera has room to pan
+def make_background(height, width, seed=0):
+    rng = np.random.default_rng(seed)
+    #low resolution noise scaled up gives blobs with corners for the feature detector
+    noise = rng.integers(0,256,(height//8,width//8,3),dtype=np.uint8)
+    background = cv2.resize(noise,(width,height),interpolation=cv2.INTER_NEAREST)
+    return cv2.GaussianBlur(background,(5,5),0)
+
+#synthetic panning footage, returns the frames and the true per-frame camera offset
+def make_panning_frames(num_frames=60, height=1080, width=1920, max_pan=8, seed=0):
+    rng = np.random.default_rng(seed)
+    margin = max_pan*num_frames//2 + 8
+    background = make_background(height+2*margin, width+2*margin, seed)
+
+    #smooth pan made of a slow sine plus a few still stretches, offsets are whole pixels
+    steps = np.round(max_pan*np.sin(np.linspace(0,3*np.pi,num_frames))[:,None]*np.array([1,0.3]))
+    steps[rng.random(num_frames) < 0.2] = 0
+    steps[0] = 0
+    offsets = np.cumsum(steps,axis=0).astype(int)
+    offsets = np.clip(offsets + margin, 0, 2*margin)
+
+    frames = []
+    for x_offset, y_offset in offsets:
+        frames.append(np.ascontiguousarray(background[y_offset:y_offset+height, x_offset:x_offset+width]))
+
+    #content moving left when the camera pans right gives a positive movement, as in the estimator
+    camera_movement = np.zeros((num_frames,2), dtype=np.float32)
+    camera_movement[1:] = offsets[1:] - offsets[:-1]
+    return frames, camera_movement
+
+#shirt colours of the two teams and the referees, in BGR
+TEAM_COLOURS = ((190,190,190), (60,60,160))
+REFEREE_COLOUR = (20,20,20)
+
+#draw a player as a shirt and shorts narrower than their box, so the box corners stay background as
+#they do around a detected player
+def draw_player(frame, bbox, shirt_colour):
+    x1, y1, x2, y2 = (int(value) for value in bbox)
+    inset = (x2 - x1)//4
+    middle = (y1 + y2)//2
+    cv2.rectangle(frame, (x1+inset,y1+2), (x2-inset,middle), shirt_colour, -1)
+    cv2.rectangle(frame, (x1+inset,middle), (x2-inset,y2-2), (80,80,80), -1)
+
+#synthetic match: panning footage with players, referees and a ball drawn on, and the tracks that
+#match what was drawn, returns the frames, a TrackStore and the true per-frame camera offset
+def make_match(num_frames=60, num_players=22, height=1080, width=1920, max_pan=8, ball_missing=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    frames, camera_movement = make_panning_frames(num_frames, height, width, max_pan, seed)
+    #objects sit on the pitch, so they move with the background as the camera pans
+    pan = np.cumsum(camera_movement, axis=0)
+
+    num_referees = 3
+    num_people = num_players + num_referees
+    size = np.stack([rng.uniform(36,50,num_people), rng.uniform(90,115,num_people)], axis=1)
+    start = rng.uniform([100,300], [width-150,height-150], (num_people,2))
+    velocity = rng.normal(0, 2, (num_people,2))
+    #wandering about the pitch, bounced off the edges of the frame
+    steps = velocity[None] + rng.normal(0, 0.5, (num_frames,num_people,2))
+    feet = start[None] + np.cumsum(steps, axis=0) - pan[:,None]
+    low, high = np.array([60,200]), np.array([width-60,height-20])
+    span = high - low
+    feet = low + np.abs((feet - low + span) % (2*span) - span)
+
+    bboxes = np.concatenate([feet - size*[0.5,1], feet + size*[0.5,0]], axis=2).astype(np.float32)
+    colours = [TEAM_COLOURS[player % 2] for player in range(num_players)] + [REFEREE_COLOUR]*num_referees
+
+    #the ball stays at the feet of whoever has it, possession changes every couple of seconds
+    holders = np.repeat(rng.integers(0, num_players, num_frames//48 + 1), 48)[:num_frames]
+    ball_centre = feet[np.arange(num_frames),holders] + [12,-6]
+    ball_bboxes = np.concatenate([ball_centre - 6, ball_centre + 6], axis=1).astype(np.float32)
+    ball_seen = rng.random(num_frames) >= ball_missing
+
+    #grass green with enough of the texture left for the camera movement features
+    grass = np.full((height,width,3), (40,140,60), dtype=np.uint8)
+    for frame_num, frame in enumerate(frames):
+        cv2.addWeighted(frame, 0.7, grass, 0.3, 0, dst=frame)
+        for person in range(num_people):
+            draw_player(frame, bboxes[frame_num,person], colours[person])
+        if ball_seen[frame_num]:
+            cv2.circle(frame, tuple(int(value) for value in ball_centre[frame_num]), 6, (255,255,255), -1)
+
+    frame_nums = np.repeat(np.arange(num_frames), num_players)
+    track_ids = np.tile(np.arange(1, num_players+1), num_frames)
+    referee_frame_nums = np.repeat(np.arange(num_frames), num_referees)
+    referee_ids = np.tile(np.arange(num_players+1, num_people+1), num_frames)
+    tracks = TrackStore(num_frames, {
+        'players': ObjectTracks(num_frames, frame_nums, track_ids, bboxes[:,:num_players].reshape(-1,4)),
+        'referees': ObjectTracks(num_frames, referee_frame_nums, referee_ids, bboxes[:,num_players:].reshape(-1,4)),
+        'ball': ObjectTracks(num_frames, np.flatnonzero(ball_seen), np.ones(ball_seen.sum()), ball_bboxes[ball_seen]),
+    })
+    return frames, tracks, camera_movement
+
+#frames and labelled tracks from a YOLO dataset split such as football-players-detection-1/test, the
+#images are repeated to make up num_frames, goalkeepers are tracked as players as they are by the tracker
+def load_labelled_images(split_dir, num_frames=None, height=1080, width=1920):
+    image_paths = sorted(glob.glob(os.path.join(split_dir, 'images', '*')))
+    if not image_paths:
+        raise FileNotFoundError(f'no images found in {split_dir}')
+    num_frames = num_frames or len(image_paths)
+    objects = {0: 'ball', 1: 'players', 2: 'players', 3: 'referees'}
+
+    frames = []
+    rows = {'players': [], 'referees': [], 'ball': []}
+    for frame_num in range(num_frames):
+        image_path = image_paths[frame_num % len(image_paths)]
+        frame = cv2.imread(image_path)
+        if frame.shape[:2] != (height, width):
+            frame = cv2.resize(frame, (width, height))
+        frames.append(frame)
+
+        label_path = os.path.join(split_dir, 'labels', os.path.splitext(os.path.basename(image_path))[0] + '.txt')
+        labels = np.loadtxt(label_path, ndmin=2) if os.path.exists(label_path) else np.zeros((0,5))
+        for track_id, (class_id, x_centre, y_centre, box_width, box_height) in enumerate(labels, start=1):
+            object = objects[int(class_id)]
+            #one ball per frame, as the tracker keeps
+            if object == 'ball':
+                if rows['ball'] and rows['ball'][-1][0] == frame_num:
+                    continue
+                track_id = 1
+            bbox = [(x_centre - box_width/2)*width, (y_centre - box_height/2)*height,
+                    (x_centre + box_width/2)*width, (y_centre + box_height/2)*height]
+            rows[object].append((frame_num, track_id, bbox))
+
+    tracks = TrackStore(num_frames)
+    for object, object_rows in rows.items():
+        tracks[object] = ObjectTracks(num_frames, [row[0] for row in object_rows], [row[1] for row in object_rows],
+                                      np.array([row[2] for row in object_rows], dtype=np.float32).reshape(-1,4))
+    return frames, tracks
@@ -0,0 +1,74 @@
+import argparse
+import json
+import sys
+import time
+import numpy as np
+from football_analysis.team_assigner import TeamAssigner
+from benchmarks.synthetic import make_match, load_labelled_images
+
+#team labels from the per-crop KMeans path and the batched path on every frame's players, each frame
+#gets its own team model since labelled images come from different matches.
+#colour_agreed compares the two colour engines under the per-crop path's team model, team_agreed runs
+#each path end to end with its own team model and counts the labels as the same split of the players,
+#as team numbers are arbitrary and can come out swapped
+def compare_team_labels(frames, tracks):
+    player_tracks = tracks['players']
+    bboxes = player_tracks.column('bbox')
+    results = {'frames': 0, 'crops': 0, 'colour_agreed': 0, 'team_agreed': 0,
+               'per_crop_seconds': 0.0, 'batched_seconds': 0.0}
+    for frame_num, frame in enumerate(frames):
+        frame_bboxes = bboxes[player_tracks.frame_rows(frame_num)]
+        frame_bboxes = frame_bboxes[TeamAssigner().has_top_half(frame_bboxes, frame.shape)]
+        if len(frame_bboxes) < 2:
+            continue
+        player_detections = {track_id: {'bbox': bbox} for track_id, bbox in enumerate(frame_bboxes)}
+
+        start = time.perf_counter()
+        per_crop = TeamAssigner()
+        per_crop.assign_team_colour(frame, player_detections, batched=False)
+        per_crop_teams = per_crop.kmeans.predict(np.array([per_crop.get_player_colour(frame, bbox) for bbox in frame_bboxes]))
+        results['per_crop_seconds'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        batched = TeamAssigner()
+        batched.assign_team_colour(frame, player_detections)
+        batched_teams = np.asarray(batched.get_player_teams(frame, frame_bboxes, list(range(len(frame_bboxes)))))
+        results['batched_seconds'] += time.perf_counter() - start
+
+        colour_teams = per_crop.kmeans.predict(per_crop.get_player_colours(per_crop.get_top_half_crops(frame, frame_bboxes)))
+        agreed = int((batched_teams == per_crop_teams).sum())
+        results['frames'] += 1
+        results['crops'] += len(frame_bboxes)
+        results['colour_agreed'] += int((colour_teams == per_crop_teams).sum())
+        results['team_agreed'] += max(agreed, len(frame_bboxes) - agreed)
+    for name in ('colour', 'team'):
+        results[f'{name}_agreement'] = results[f'{name}_agreed']/results['crops'] if results['crops'] else 1.0
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batched team assignment with the per-crop KMeans path')
+    parser.add_argument('--labelled', help='YOLO dataset split to take frames and player boxes from, '
+                                           'e.g. football-players-detection-1/football-players-detection-1/valid, '
+                                           'synthetic match footage when not given')
+    parser.add_argument('--frames', type=int, help='number of frames to use, every labelled image by default')
+    parser.add_argument('--min-agreement', type=float, default=0.95, help='share of crops that must agree on both measures')
+    parser.add_argument('--output', help='write the results to this json file')
+    args = parser.parse_args()
+
+    if args.labelled:
+        frames, tracks = load_labelled_images(args.labelled, args.frames)
+    else:
+        frames, tracks, _ = make_match(args.frames or 10)
+
+    results = compare_team_labels(frames, tracks)
+    print(f"{results['crops']} crops over {results['frames']} frames")
+    print(f"per crop: {results['per_crop_seconds']:.2f}s, batched: {results['batched_seconds']:.2f}s")
+    print(f"colour agreement: {results['colour_agreed']}/{results['crops']} ({100*results['colour_agreement']:.1f}%)")
+    print(f"team agreement: {results['team_agreed']}/{results['crops']} ({100*results['team_agreement']:.1f}%)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0 if min(results['colour_agreement'], results['team_agreement']) >= args.min_agreement else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import argparse
+import json
+import time
+import sys
+from football_analysis import DEFAULT_MODEL_PATH
+from football_analysis.utils import VideoReader
+from football_analysis.trackers import Tracker
+from football_analysis.track_store import TrackStore, TrackRows
+
+#everything get_track_store does with a frame's model output, ByteTrack included, building the old
+#dictionaries and converting them at the end
+def postprocess_dicts(tracker, detections):
+    tracks = {'players': [], 'referees': [], 'ball': []}
+    for frame_num, detection in enumerate(detections):
+        detection_supervision, class_names_inverse = tracker.convert_detection(detection)
+        tracker.add_detections_to_tracks(tracks, frame_num, detection_supervision, class_names_inverse)
+    return TrackStore.from_tracks(tracks)
+
+#the same, written straight into columns as track_frames does
+def postprocess_rows(tracker, detections):
+    rows = TrackRows()
+    for frame_num, detection in enumerate(detections):
+        detection_supervision, class_names_inverse = tracker.convert_detection(detection)
+        tracker.add_detections_to_rows(rows, frame_num, detection_supervision, class_names_inverse)
+    return rows.to_store(len(detections))
+
+#model output is recorded once and replayed, so only the post-processing after inference is timed
+def compare_postprocessing(model_path, frames, repeats=3):
+    tracker = Tracker(model_path)
+    detections = tracker.detect_frames(frames)
+    results = {}
+    for name, postprocess in (('dicts', postprocess_dicts), ('rows', postprocess_rows)):
+        seconds = []
+        for _ in range(repeats):
+            tracker.reset()
+            start = time.perf_counter()
+            postprocess(tracker, detections)
+            seconds.append(time.perf_counter() - start)
+        results[name] = {'seconds': min(seconds), 'fps': len(detections)/min(seconds)}
+    results['speed_up'] = results['dicts']['seconds']/results['rows']['seconds']
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Time detection post-processing and tracking, without inference')
+    parser.add_argument('--video', required=True)
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--frames', type=int, default=240, help='number of frames to use')
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='write the report to this json file')
+    args = parser.parse_args()
+
+    frames = VideoReader(args.video).read_frames(stop=args.frames)
+    results = compare_postprocessing(args.model, frames, args.repeats)
+    print(f"dictionaries: {results['dicts']['fps']:.0f} fps, columns: {results['rows']['fps']:.0f} fps "
+          f"({results['speed_up']:.2f}x)")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
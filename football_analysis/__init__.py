@@ -0,0 +1,4 @@
+import os
+
+#the bundled model, found from the package rather than the working directory
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'best.pt')
\ No newline at end of file
@@ -0,0 +1 @@
+from .annotation_renderer import AnnotationRenderer
\ No newline at end of file
@@ -0,0 +1,292 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+from football_analysis.track_store import TrackStore
+from football_analysis.ball_possession import PossessionStats
+from football_analysis.utils import VideoReader
+
+#render frames start to stop inside a worker process, straight into their slots of the shared output buffer
+def _render_chunk(renderer, frames, tracks, possession_stats, camera_movement, start, stop, output_path, slot):
+    output = np.load(output_path, mmap_mode='r+')
+    #readers are passed whole and indexed directly, anything else arrives sliced and renumbered from start
+    offset = 0 if isinstance(frames, VideoReader) else start
+    for frame_num in range(start, stop):
+        movement = camera_movement[frame_num-start] if camera_movement is not None else None
+        renderer.render_frame(frames[frame_num-offset], frame_num-start, tracks, possession_stats, movement,
+                              out=output[slot+frame_num-start])
+    output.flush()
+    return start
+
+#draws every annotation layer for a frame into a single output buffer
+class AnnotationRenderer:
+
+    #colours and panel placement used by the original drawing functions
+    player_colour = (255,0,255)
+    referee_colour = (0,255,255)
+    ball_colour = (0,0,255)
+    has_ball_colour = (255,249,125)
+    possession_panel = ((1350,850),(1900,970),0.4)
+    camera_panel = ((50,50),(600,150),0.6)
+
+    def __init__(self):
+        #sprites that never change between frames, built the first time they are needed
+        self._panel_sprites = {}
+        self._ellipse_offsets = {}
+        self._triangle_offsets = None
+
+    #solid block of colour matching the part of a panel inside the frame
+    def get_panel_sprite(self, height, width, colour):
+        key = (height,width,colour)
+        if key not in self._panel_sprites:
+            self._panel_sprites[key] = np.full((height,width,3), colour, dtype=np.uint8)
+        return self._panel_sprites[key]
+
+    #shade a rectangle exactly as a filled overlay plus addWeighted would, but only touching the pixels inside it
+    def blend_panel(self, frame, top_left, bottom_right, colour, alpha):
+        #filled rectangles include both corners, anything outside the frame is dropped
+        x1, y1 = max(top_left[0],0), max(top_left[1],0)
+        x2, y2 = min(bottom_right[0]+1,frame.shape[1]), min(bottom_right[1]+1,frame.shape[0])
+        if x1 >= x2 or y1 >= y2:
+            return frame
+        roi = frame[y1:y2,x1:x2]
+        sprite = self.get_panel_sprite(y2-y1, x2-x1, colour)
+        roi[:] = cv2.addWeighted(sprite,alpha,roi,1-alpha,0)
+        return frame
+
+    #pixel offsets of an ellipse outline from its centre, drawn once per size
+    def get_ellipse_offsets(self, axes):
+        if axes not in self._ellipse_offsets:
+            #leave room for the line thickness on every side
+            half_width, half_height = axes[0] + 3, axes[1] + 3
+            mask = np.zeros((2*half_height+1,2*half_width+1), dtype=np.uint8)
+            cv2.ellipse(mask,
+                        center=(half_width,half_height),
+                        axes=axes,
+                        angle=0.0,
+                        startAngle=-20,
+                        endAngle=240,
+                        color=255,
+                        thickness=3,
+                        lineType=cv2.LINE_4)
+            ys, xs = np.nonzero(mask)
+            self._ellipse_offsets[axes] = (ys - half_height, xs - half_width)
+        return self._ellipse_offsets[axes]
+
+    #pixel offsets of the triangle fill and outline from its tip
+    def get_triangle_offsets(self):
+        if self._triangle_offsets is None:
+            tip_x, tip_y = 15, 20
+            triangle_points = np.array([[tip_x,tip_y],
+                                        [tip_x-10,tip_y-15],
+                                        [tip_x+10,tip_y-15]])
+            fill = np.zeros((tip_y+5,2*tip_x+1), dtype=np.uint8)
+            outline = fill.copy()
+            cv2.drawContours(fill,[triangle_points],0,255,cv2.FILLED)
+            cv2.drawContours(outline,[triangle_points],0,255,2)
+            #the outline is drawn over the fill, so only keep fill pixels it doesn't cover
+            fill[outline > 0] = 0
+            self._triangle_offsets = [(ys - tip_y, xs - tip_x) for ys, xs in (np.nonzero(fill),np.nonzero(outline))]
+        return self._triangle_offsets
+
+    #set the pixels at the given offsets from (x,y), clipped to the frame
+    def paint_offsets(self, frame, x, y, offsets, colour):
+        ys, xs = offsets
+        ys = ys + y
+        xs = xs + x
+        inside = (ys >= 0) & (ys < frame.shape[0]) & (xs >= 0) & (xs < frame.shape[1])
+        frame[ys[inside],xs[inside]] = colour
+
+    def draw_ellipse(self, frame, bbox, colour, track_id=None):
+        y2 = int(bbox[3])
+        x_centre = int((bbox[0]+bbox[2])/2)
+        width = bbox[2] - bbox[0]
+        self.paint_offsets(frame, x_centre, y2, self.get_ellipse_offsets((int(width),int(0.35*width))), colour)
+
+        #box holding the track id, only drawn for players
+        if track_id is not None:
+            rect_height = 20
+            rect_width = 35
+            x1_rect = x_centre - rect_width//2
+            x2_rect = x_centre + rect_width//2
+            y1_rect = (y2 - rect_height//2) + 30
+            y2_rect = (y2 + rect_height//2) + 30
+            cv2.rectangle(frame,(x1_rect,y1_rect),(x2_rect,y2_rect),colour,cv2.FILLED)
+
+            x1_text = x1_rect + 7
+            if track_id > 99:
+                x1_text -= 10
+            cv2.putText(frame,
+                        f"{track_id}",
+                        (x1_text,y2_rect-3),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        fontScale=0.6,
+                        color=(0,0,0),
+                        thickness=2)
+        return frame
+
+    def draw_triangle(self, frame, bbox, colour):
+        y = int(bbox[1])
+        x = int((bbox[0]+bbox[2])/2)
+        fill, outline = self.get_triangle_offsets()
+        self.paint_offsets(frame, x, y, fill, colour)
+        self.paint_offsets(frame, x, y, outline, (0,0,0))
+        return frame
+
+    def draw_team_possession(self, frame, frame_num, possession_stats):
+        (top_left, bottom_right, alpha) = self.possession_panel
+        self.blend_panel(frame, top_left, bottom_right, (255,255,255), alpha)
+
+        possession_percentages = possession_stats.possession_percentages(frame_num)
+        cv2.putText(frame,
+                    f'Team 1 Possession: {possession_percentages[1]:.2f}%',
+                    (1400,900),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=1,
+                    color=(0,0,0),
+                    thickness=3)
+        cv2.putText(frame,
+                    f'Team 2 Possession: {possession_percentages[0]:.2f}%',
+                    (1400,950),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=1,
+                    color=(0,0,0),
+                    thickness=3)
+        return frame
+
+    def draw_camera_movement(self, frame, camera_movement):
+        (top_left, bottom_right, alpha) = self.camera_panel
+        self.blend_panel(frame, top_left, bottom_right, (255,255,255), alpha)
+
+        x_movement, y_movement = camera_movement
+        cv2.putText(frame,f'Camera - X Movement: {x_movement:.2f}',(75,90),cv2.FONT_HERSHEY_SIMPLEX,1,(0,0,0),3)
+        cv2.putText(frame,f'Camera - Y Movement: {y_movement:.2f}',(75,140),cv2.FONT_HERSHEY_SIMPLEX,1,(0,0,0),3)
+        return frame
+
+    #ellipses, track ids and ball markers, read straight from the track store columns
+    def draw_objects(self, frame, frame_num, tracks):
+        #opencv rounds colours to the nearest integer, do the same since pixels are set directly
+        team_colours = {team: tuple(int(c) for c in np.clip(np.rint(colour),0,255)) for team, colour in tracks.team_colours.items()}
+
+        if 'players' in tracks:
+            players = tracks['players']
+            rows = players.frame_rows(frame_num)
+            bboxes = players.columns['bbox'][rows].astype(np.float64)
+            teams = players.columns['team'][rows] if 'team' in players.columns else np.full(len(bboxes), -1)
+            has_ball = players.columns['has_ball'][rows] if 'has_ball' in players.columns else np.zeros(len(bboxes), dtype=bool)
+            for bbox, track_id, team, player_has_ball in zip(bboxes, players.track_id[rows], teams, has_ball):
+                colour = team_colours.get(int(team), self.player_colour)
+                self.draw_ellipse(frame, bbox, colour, int(track_id))
+                if player_has_ball:
+                    self.draw_triangle(frame, bbox, self.has_ball_colour)
+
+        if 'referees' in tracks:
+            referees = tracks['referees']
+            for bbox in referees.columns['bbox'][referees.frame_rows(frame_num)].astype(np.float64):
+                self.draw_ellipse(frame, bbox, self.referee_colour)
+
+        if 'ball' in tracks:
+            ball = tracks['ball']
+            for bbox in ball.columns['bbox'][ball.frame_rows(frame_num)].astype(np.float64):
+                self.draw_triangle(frame, bbox, self.ball_colour)
+        return frame
+
+    #speed and distance under every object they have been estimated for
+    def draw_speed_and_distance(self, frame, frame_num, tracks):
+        for object, object_tracks in tracks.items():
+            if 'speed' not in object_tracks.columns:
+                continue
+            rows = object_tracks.frame_rows(frame_num)
+            speeds = object_tracks.columns['speed'][rows]
+            distances = object_tracks.column('distance')[rows]
+            bboxes = object_tracks.columns['bbox'][rows].astype(np.float64)
+            for bbox, speed, distance in zip(bboxes, speeds, distances):
+                if np.isnan(speed) or np.isnan(distance):
+                    continue
+                position = (int((bbox[0]+bbox[2])/2),int(bbox[3])+60)
+                cv2.putText(frame,f'{speed:.2f} Km/h',position,cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,0),2)
+                cv2.putText(frame,f'{distance:.2f} m',(position[0],position[1]+20),cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,0,0),2)
+        return frame
+
+    #copy the source frame once into out and draw every layer on top, in the same order as the old chain
+    def render_frame(self, frame, frame_num, tracks, possession_stats=None, camera_movement=None, out=None):
+        if out is None:
+            out = np.empty(frame.shape, dtype=frame.dtype)
+        np.copyto(out, frame)
+
+        self.draw_objects(out, frame_num, tracks)
+        if possession_stats is not None:
+            self.draw_team_possession(out, frame_num, possession_stats)
+        if camera_movement is not None:
+            self.draw_camera_movement(out, camera_movement)
+        self.draw_speed_and_distance(out, frame_num, tracks)
+        return out
+
+    #lazily render a whole video, frames are produced one at a time so they can be streamed to the writer
+    def render(self, frames, tracks, possession_stats=None, camera_movement_per_frame=None):
+        if not isinstance(tracks, TrackStore):
+            tracks = TrackStore.from_tracks(tracks)
+        if possession_stats is not None and not isinstance(possession_stats, PossessionStats):
+            possession_stats = PossessionStats.from_frames(possession_stats)
+
+        for frame_num, frame in enumerate(frames):
+            camera_movement = camera_movement_per_frame[frame_num] if camera_movement_per_frame is not None else None
+            yield self.render_frame(frame, frame_num, tracks, possession_stats, camera_movement)
+
+    #render in a process pool, yielding frames in order as each chunk finishes
+    #rendered frames pass back through a memory-mapped ring in buffer_dir, the system temp directory by default,
+    #which is often tmpfs and so held in memory. the ring is two chunks per worker, and chunks are shortened
+    #so it stays within max_buffer_bytes, a 1080p frame is about 6MB
+    def render_parallel(self, frames, tracks, possession_stats=None, camera_movement_per_frame=None,
+                        workers=None, chunk_size=64, copy=True, max_buffer_bytes=1024**3, buffer_dir=None):
+        if not isinstance(tracks, TrackStore):
+            tracks = TrackStore.from_tracks(tracks)
+        if possession_stats is not None and not isinstance(possession_stats, PossessionStats):
+            possession_stats = PossessionStats.from_frames(possession_stats)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        num_frames = len(frames)
+        #a single worker has nothing to overlap with, render in this process instead
+        if workers == 1 or num_frames == 0:
+            yield from self.render(frames, tracks, possession_stats, camera_movement_per_frame)
+            return
+
+        #ring of output slots shared with the workers, two chunks in flight per worker
+        chunks_in_flight = 2*workers
+        first_frame = frames[0]
+        chunk_size = max(1, min(chunk_size, max_buffer_bytes//(chunks_in_flight*first_frame.nbytes)))
+        with tempfile.TemporaryDirectory(dir=buffer_dir) as output_dir:
+            output_path = os.path.join(output_dir, 'rendered_frames.npy')
+            output = np.lib.format.open_memmap(output_path,
+                                               mode='w+',
+                                               dtype=first_frame.dtype,
+                                               shape=(chunks_in_flight*chunk_size,) + first_frame.shape)
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                def submit(chunk_num):
+                    start = chunk_num*chunk_size
+                    stop = min(start + chunk_size, num_frames)
+                    slot = (chunk_num % chunks_in_flight)*chunk_size
+                    #each worker only receives its own slice of the frames, tracks, possession and camera movement,
+                    #a reader is sent as its paths and reopened in the worker rather than decoding the slice here
+                    chunk_frames = frames if isinstance(frames, VideoReader) else frames[start:stop]
+                    camera_movement = camera_movement_per_frame[start:stop] if camera_movement_per_frame is not None else None
+                    chunk_stats = possession_stats.select_frames(start, stop) if possession_stats is not None else None
+                    return executor.submit(_render_chunk, self, chunk_frames, tracks.select_frames(start, stop),
+                                           chunk_stats, camera_movement, start, stop, output_path, slot)
+
+                num_chunks = (num_frames + chunk_size - 1)//chunk_size
+                futures = {chunk_num: submit(chunk_num) for chunk_num in range(min(chunks_in_flight, num_chunks))}
+                for chunk_num in range(num_chunks):
+                    futures.pop(chunk_num).result()
+                    start = chunk_num*chunk_size
+                    slot = (chunk_num % chunks_in_flight)*chunk_size
+                    for frame_num in range(start, min(start + chunk_size, num_frames)):
+                        frame = output[slot+frame_num-start]
+                        #without a copy the frame is only valid until the next one is requested
+                        yield np.array(frame) if copy else frame
+                    #the slots have been handed on, so the chunk that reuses them can start
+                    if chunk_num + chunks_in_flight < num_chunks:
+                        futures[chunk_num + chunks_in_flight] = submit(chunk_num + chunks_in_flight)
+            del output
@@ -0,0 +1 @@
+from .ball_gap_filler import BallGapFiller
\ No newline at end of file
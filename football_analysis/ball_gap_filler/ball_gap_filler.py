@@ -0,0 +1,109 @@
+import numpy as np
+
+#fills frames where the ball wasn't detected by interpolating between the detections either side,
+#either for a whole match at once or online as frames arrive
+class BallGapFiller:
+
+    def __init__(self, look_ahead=48, max_speed=None):
+        #frames the online filler will hold back waiting for the next detection before giving up on it
+        self.look_ahead = look_ahead
+        #fastest plausible ball movement in pixels per frame, detections needing more are dropped as
+        #false positives before interpolating, None keeps every detection
+        self.max_speed = max_speed
+        self.reset()
+
+    def reset(self):
+        #last detection kept, and a rejected one that later detections may confirm as the real ball
+        self._last_frame = None
+        self._last_bbox = None
+        self._candidate_frame = None
+        self._candidate_bbox = None
+        #frames waiting on the next detection
+        self._pending = []
+
+    #whether a detection is consistent with where the ball was, a rejected detection replaces the kept
+    #one when the next detection agrees with it rather than with the kept one
+    def _accept(self, frame_num, bbox):
+        if self.max_speed is None or self._last_frame is None:
+            return True
+        if self._within_reach(self._last_frame, self._last_bbox, frame_num, bbox):
+            self._candidate_frame = None
+            return True
+        if self._candidate_frame is not None and self._within_reach(self._candidate_frame, self._candidate_bbox, frame_num, bbox):
+            self._candidate_frame = None
+            return True
+        self._candidate_frame, self._candidate_bbox = frame_num, bbox
+        return False
+
+    def _within_reach(self, from_frame, from_bbox, frame_num, bbox):
+        from_centre = (from_bbox[:2] + from_bbox[2:])/2
+        centre = (bbox[:2] + bbox[2:])/2
+        return np.hypot(*(centre - from_centre)) <= self.max_speed*(frame_num - from_frame)
+
+    #mask of the detections that survive the motion model, bboxes has NaN rows for missing frames
+    def accepted_detections(self, bboxes):
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1,4)
+        detected = ~np.isnan(bboxes).any(axis=1)
+        if self.max_speed is None:
+            return detected
+        self.reset()
+        for frame_num in np.flatnonzero(detected):
+            if self._accept(frame_num, bboxes[frame_num]):
+                self._last_frame, self._last_bbox = frame_num, bboxes[frame_num]
+            else:
+                detected[frame_num] = False
+        self.reset()
+        return detected
+
+    #fill every missing frame of a whole match, linear between detections and held at the first and
+    #last detection beyond them, the same as pandas interpolate followed by bfill
+    def fill(self, bboxes):
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1,4)
+        detected = self.accepted_detections(bboxes)
+        if not detected.any():
+            return np.full(bboxes.shape, np.nan)
+
+        frame_nums = np.arange(len(bboxes))
+        detected_frames = frame_nums[detected]
+        filled = np.empty(bboxes.shape)
+        for column in range(4):
+            filled[:,column] = np.interp(frame_nums, detected_frames, bboxes[detected,column])
+        return filled
+
+    #feed the next frame's ball box, or None when it wasn't detected, and get back the frames that are
+    #now settled as (frame_num, bbox) pairs, in order
+    def update(self, frame_num, bbox=None):
+        settled = []
+        if bbox is not None:
+            bbox = np.asarray(bbox, dtype=np.float64)
+            if np.isnan(bbox).any() or not self._accept(frame_num, bbox):
+                bbox = None
+
+        if bbox is None:
+            self._pending.append(frame_num)
+            #waited as long as we can, hold the oldest frame at the last position seen
+            if len(self._pending) > self.look_ahead:
+                held = self._last_bbox if self._last_bbox is not None else np.full(4, np.nan)
+                settled.append((self._pending.pop(0), held.copy()))
+            return settled
+
+        if self._last_frame is None:
+            #frames before the first detection take its position
+            settled += [(pending_frame, bbox.copy()) for pending_frame in self._pending]
+        else:
+            #same arithmetic as np.interp so the online and whole-match results agree
+            slope = (bbox - self._last_bbox)/(frame_num - self._last_frame)
+            settled += [(pending_frame, slope*(pending_frame - self._last_frame) + self._last_bbox)
+                        for pending_frame in self._pending]
+        settled.append((frame_num, bbox.copy()))
+
+        self._pending = []
+        self._last_frame, self._last_bbox = frame_num, bbox
+        return settled
+
+    #settle every frame still waiting at the end of the video, held at the last position seen
+    def flush(self):
+        held = self._last_bbox if self._last_bbox is not None else np.full(4, np.nan)
+        settled = [(pending_frame, held.copy()) for pending_frame in self._pending]
+        self._pending = []
+        return settled
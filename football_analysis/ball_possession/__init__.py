@@ -0,0 +1,2 @@
+from .ball_possession import BallPossession
+from .possession_stats import PossessionStats
\ No newline at end of file
@@ -0,0 +1,154 @@
+import numpy as np
+
+from football_analysis.utils import get_box_centre, measure_distance
+
+#create a class for the ball possession
+class BallPossession():
+
+    def __init__(self):
+        #set the maximum distance that the ball can be from the player without losing indication
+        self.max_distance_from_player = 60
+
+    #function to assign ball possession
+    def assign_ball_possession(self, players, ball_bbox):
+        #retrieve ball position
+        ball_position = get_box_centre(ball_bbox)
+
+        #initial values of min distance and assigned player to be overwritten
+        minimum_distance  = 8000
+        assigned_player=-1
+        #loop over each player within the frame
+        for player_id, player in players.items():
+            player_bbox = player['bbox']
+
+            #ditance between left x and bottom y coords
+            distance_left = measure_distance((player_bbox[0],player_bbox[-1]),ball_position)
+            #distance between right x and bottom y coords
+            distance_right = measure_distance((player_bbox[2],player_bbox[-1]),ball_position)
+            #mimumum distance of the two
+            distance = min(distance_left,distance_right)
+
+            #check distance, assign possession to a player if within range
+            if distance < self.max_distance_from_player:
+                if distance < minimum_distance:
+                    minimum_distance = distance
+                    assigned_player = player_id
+
+        return assigned_player
+
+    #bottom left and bottom right corners of each bbox, the points measured against the ball
+    def get_foot_corners(self, bboxes):
+        bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1,4)
+        return np.stack([bboxes[:,[0,3]], bboxes[:,[2,3]]], axis=1)
+
+    #ball centre as whole pixels, matching get_box_centre
+    def get_ball_centres(self, ball_bboxes):
+        ball_bboxes = np.asarray(ball_bboxes, dtype=np.float64).reshape(-1,4)
+        return np.trunc(np.stack([(ball_bboxes[:,0]+ball_bboxes[:,2])/2,
+                                  (ball_bboxes[:,1]+ball_bboxes[:,3])/2], axis=1))
+
+    #possession for every frame at once, ball_centres is one (x,y) per frame (nan when there's no ball),
+    #and each player row has its frame, track id and (2,2) foot corners. returns the track id per frame, -1 for nobody
+    def assign_ball_possession_all(self, ball_centres, player_frames, player_ids, foot_corners):
+        ball_centres = np.asarray(ball_centres, dtype=np.float64).reshape(-1,2)
+        player_frames = np.asarray(player_frames)
+        assigned_players = np.full(len(ball_centres), -1, dtype=np.int64)
+        if len(player_frames) == 0:
+            return assigned_players
+
+        #distance from the ball of the row's frame to the nearer of the two foot corners
+        offsets = foot_corners - ball_centres[player_frames][:,None,:]
+        distances = np.hypot(offsets[:,:,0], offsets[:,:,1]).min(axis=1)
+        in_range = distances < self.max_distance_from_player
+
+        #closest candidate per frame, the stable sort keeps the first player on ties as the loop does
+        candidates = np.flatnonzero(in_range)
+        order = candidates[np.lexsort((distances[candidates], player_frames[candidates]))]
+        first = np.r_[True, player_frames[order][1:] != player_frames[order][:-1]] if len(order) else np.zeros(0, bool)
+        closest = order[first]
+        assigned_players[player_frames[closest]] = np.asarray(player_ids)[closest]
+        return assigned_players
+
+    #grid variant for footage with many balls and players, e.g. training drills. players are bucketed into
+    #cells the size of the possession range so each ball only checks the 3x3 cells around it.
+    #balls are given with their frames, and the result is a track id per ball
+    def assign_ball_possession_grid(self, ball_frames, ball_centres, player_frames, player_ids, foot_corners):
+        ball_frames = np.asarray(ball_frames, dtype=np.int64)
+        ball_centres = np.asarray(ball_centres, dtype=np.float64).reshape(-1,2)
+        player_frames = np.asarray(player_frames, dtype=np.int64)
+        player_ids = np.asarray(player_ids)
+        assigned_players = np.full(len(ball_frames), -1, dtype=np.int64)
+        if len(player_frames) == 0 or len(ball_frames) == 0:
+            return assigned_players
+
+        cell_size = self.max_distance_from_player
+        #each foot corner goes into the grid on its own, pointing back at its player row
+        corner_rows = np.repeat(np.arange(len(player_frames)), 2)
+        corner_points = foot_corners.reshape(-1,2)
+        valid = ~np.isnan(corner_points).any(axis=1)
+        corner_rows, corner_points = corner_rows[valid], corner_points[valid]
+        corner_cells = np.floor(corner_points/cell_size).astype(np.int64)
+        corner_keys = self._cell_keys(player_frames[corner_rows], corner_cells[:,0], corner_cells[:,1])
+        order = np.argsort(corner_keys, kind='stable')
+        corner_keys, corner_rows, corner_points = corner_keys[order], corner_rows[order], corner_points[order]
+
+        valid_balls = np.flatnonzero(~np.isnan(ball_centres).any(axis=1))
+        ball_cells = np.floor(ball_centres[valid_balls]/cell_size).astype(np.int64)
+
+        #gather (ball, corner) candidate pairs from the neighbouring cells
+        pair_balls, pair_corners = [], []
+        for dx in (-1,0,1):
+            for dy in (-1,0,1):
+                keys = self._cell_keys(ball_frames[valid_balls], ball_cells[:,0]+dx, ball_cells[:,1]+dy)
+                starts = np.searchsorted(corner_keys, keys, side='left')
+                stops = np.searchsorted(corner_keys, keys, side='right')
+                counts = stops - starts
+                pair_balls.append(np.repeat(valid_balls, counts))
+                pair_corners.append(np.repeat(starts - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(counts.sum()))
+        pair_balls = np.concatenate(pair_balls)
+        pair_corners = np.concatenate(pair_corners)
+
+        offsets = corner_points[pair_corners] - ball_centres[pair_balls]
+        distances = np.hypot(offsets[:,0], offsets[:,1])
+        in_range = distances < self.max_distance_from_player
+        pair_balls, pair_rows, distances = pair_balls[in_range], corner_rows[pair_corners[in_range]], distances[in_range]
+
+        #closest player per ball, ties go to the earlier player row
+        order = np.lexsort((pair_rows, distances, pair_balls))
+        first = np.r_[True, pair_balls[order][1:] != pair_balls[order][:-1]] if len(order) else np.zeros(0, bool)
+        closest = order[first]
+        assigned_players[pair_balls[closest]] = player_ids[pair_rows[closest]]
+        return assigned_players
+
+    #pack frame and cell coordinates into one sortable key
+    def _cell_keys(self, frames, cell_x, cell_y):
+        return (frames << 40) | ((cell_x + (1 << 19)) << 20) | (cell_y + (1 << 19))
+
+    #possession for a whole track store, marks has_ball on the player rows and returns the track id per frame
+    def add_possession_to_track_store(self, tracks):
+        player_tracks = tracks['players']
+        ball_tracks = tracks['ball']
+
+        ball_centres = np.full((player_tracks.num_frames,2), np.nan)
+        ball_rows = ball_tracks.track_id == 1
+        ball_centres[ball_tracks.frame[ball_rows]] = self.get_ball_centres(ball_tracks.column('bbox')[ball_rows])
+
+        assigned_players = self.assign_ball_possession_all(ball_centres,
+                                                           player_tracks.frame,
+                                                           player_tracks.track_id,
+                                                           self.get_foot_corners(player_tracks.column('bbox')))
+
+        has_ball = player_tracks.column('has_ball')
+        has_ball[:] = False
+        assigned_rows = player_tracks.find_rows(np.arange(player_tracks.num_frames), assigned_players)
+        has_ball[assigned_rows[assigned_players >= 0]] = True
+        return assigned_players
+
+    #team of the player with the ball, -1 for frames where nobody has it or there are no players at all
+    def get_team_possession(self, player_tracks, assigned_players):
+        team_possession = np.full(len(assigned_players), -1, dtype=np.int64)
+        assigned_rows = player_tracks.find_rows(np.arange(len(assigned_players)), assigned_players)
+        found = assigned_rows >= 0
+        team_possession[found] = player_tracks.column('team')[assigned_rows[found]]
+        return team_possession
+
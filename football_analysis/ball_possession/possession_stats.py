@@ -0,0 +1,146 @@
+import json
+import numpy as np
+
+#running possession statistics, every per-frame query is a lookup rather than a rescan of earlier frames
+class PossessionStats:
+
+    def __init__(self, num_teams=2, capacity=1024):
+        self.num_teams = num_teams
+        self.num_frames = 0
+        #per-frame buffers, grown by doubling as frames arrive
+        self._cumulative = np.zeros((capacity,num_teams), dtype=np.int64)
+        self._team = np.full(capacity, -1, dtype=np.int64)
+        self._player = np.full(capacity, -1, dtype=np.int64)
+        #last team and player to have the ball, carried through frames where nobody has it
+        self._holder_team = np.full(capacity, -1, dtype=np.int64)
+        self._holder_player = np.full(capacity, -1, dtype=np.int64)
+        #first frame of the spell the current holder's team is in
+        self._spell_start = np.full(capacity, -1, dtype=np.int64)
+        self._counts = np.zeros(num_teams, dtype=np.int64)
+
+    def _grow(self, size):
+        capacity = len(self._team)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ('_cumulative','_team','_player','_holder_team','_holder_player','_spell_start'):
+            old = getattr(self, name)
+            fill = 0 if name == '_cumulative' else -1
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    #add the next frame, team is -1 when nobody has the ball
+    def update(self, team, player=-1):
+        frame_num = self.num_frames
+        self._grow(frame_num + 1)
+
+        has_team = 0 <= team < self.num_teams
+        if has_team:
+            self._counts[team] += 1
+        self._cumulative[frame_num] = self._counts
+        self._team[frame_num] = team if has_team else -1
+        self._player[frame_num] = player if has_team else -1
+
+        previous_team = self._holder_team[frame_num-1] if frame_num > 0 else -1
+        if has_team:
+            self._holder_team[frame_num] = team
+            self._holder_player[frame_num] = player
+            #a new spell starts whenever the other team takes the ball
+            self._spell_start[frame_num] = frame_num if team != previous_team else self._spell_start[frame_num-1]
+        elif frame_num > 0:
+            self._holder_team[frame_num] = previous_team
+            self._holder_player[frame_num] = self._holder_player[frame_num-1]
+            self._spell_start[frame_num] = self._spell_start[frame_num-1]
+
+        self.num_frames += 1
+
+    #build the statistics for a whole match at once, anything outside 0..num_teams-1 counts as nobody
+    @classmethod
+    def from_frames(cls, team_possession, player_possession=None, num_teams=2):
+        team_possession = np.asarray(team_possession, dtype=np.int64)
+        num_frames = len(team_possession)
+        stats = cls(num_teams, capacity=max(num_frames,1))
+
+        has_team = (team_possession >= 0) & (team_possession < num_teams)
+        team = np.where(has_team, team_possession, -1)
+        if player_possession is None:
+            player = np.full(num_frames, -1, dtype=np.int64)
+        else:
+            player = np.where(has_team, np.asarray(player_possession, dtype=np.int64), -1)
+
+        one_hot = np.zeros((num_frames,num_teams), dtype=np.int64)
+        one_hot[np.flatnonzero(has_team), team[has_team]] = 1
+        stats._cumulative[:num_frames] = np.cumsum(one_hot, axis=0)
+        stats._team[:num_frames] = team
+        stats._player[:num_frames] = player
+
+        #carry the last holder forward through frames where nobody has the ball
+        last_held = np.maximum.accumulate(np.where(has_team, np.arange(num_frames), -1)) if num_frames else np.zeros(0, dtype=np.int64)
+        held = last_held >= 0
+        stats._holder_team[:num_frames] = np.where(held, team[last_held], -1)
+        stats._holder_player[:num_frames] = np.where(held, player[last_held], -1)
+
+        #a spell starts on a frame where a team has the ball and the previous holder was the other team
+        holder_team = stats._holder_team[:num_frames]
+        previous_team = np.r_[-1, holder_team[:-1]] if num_frames else holder_team
+        starts = has_team & (team != previous_team)
+        stats._spell_start[:num_frames] = np.where(held, np.maximum.accumulate(np.where(starts, np.arange(num_frames), -1)), -1)
+
+        stats._counts = stats._cumulative[num_frames-1].copy() if num_frames else np.zeros(num_teams, dtype=np.int64)
+        stats.num_frames = num_frames
+        return stats
+
+    #statistics for frames start to stop renumbered from 0, small enough to hand to a worker process,
+    #counts and spell starts still reach back over the whole match
+    def select_frames(self, start, stop):
+        stop = min(stop, self.num_frames)
+        start = min(start, stop)
+        selected = PossessionStats(self.num_teams, capacity=max(stop - start, 1))
+        for name in ('_cumulative','_team','_player','_holder_team','_holder_player','_spell_start'):
+            getattr(selected, name)[:stop-start] = getattr(self, name)[start:stop]
+        selected._counts = self._cumulative[stop-1].copy() if stop > 0 else np.zeros(self.num_teams, dtype=np.int64)
+        selected.num_frames = stop - start
+        return selected
+
+    #frames each team has had the ball up to and including frame_num
+    def possession_frames(self, frame_num):
+        return self._cumulative[frame_num]
+
+    #share of possession per team up to and including frame_num, as percentages
+    def possession_percentages(self, frame_num):
+        counts = self._cumulative[frame_num]
+        total = counts.sum()
+        if total == 0:
+            return np.zeros(self.num_teams)
+        return counts/total*100
+
+    #team and player who last had the ball at frame_num, (-1,-1) before anyone has touched it
+    def holder(self, frame_num):
+        return int(self._holder_team[frame_num]), int(self._holder_player[frame_num])
+
+    #team in possession at frame_num and the frame their spell began, (-1,-1) before anyone has touched it
+    def current_spell(self, frame_num):
+        return int(self._holder_team[frame_num]), int(self._spell_start[frame_num])
+
+    #every spell as (team, start frame, end frame), a spell runs until the other team takes the ball
+    def spells(self):
+        spell_start = self._spell_start[:self.num_frames]
+        starts = np.flatnonzero((spell_start >= 0) & (spell_start == np.arange(self.num_frames)))
+        ends = np.r_[starts[1:], self.num_frames] - 1
+        return [(int(self._holder_team[start]), int(start), int(end)) for start, end in zip(starts, ends)]
+
+    def to_report(self):
+        last_frame = self.num_frames - 1
+        report = {
+            'frames': self.num_frames,
+            'possession_frames': self.possession_frames(last_frame).tolist() if self.num_frames else [0]*self.num_teams,
+            'possession_percentages': self.possession_percentages(last_frame).tolist() if self.num_frames else [0.0]*self.num_teams,
+            'spells': [{'team':team, 'start_frame':start, 'end_frame':end} for team, start, end in self.spells()],
+        }
+        return report
+
+    def save_report(self, report_path):
+        with open(report_path, 'w') as f:
+            json.dump(self.to_report(), f, indent=2)
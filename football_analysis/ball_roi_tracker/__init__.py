@@ -0,0 +1 @@
+from .ball_roi_tracker import BallRoiTracker
\ No newline at end of file
@@ -0,0 +1,124 @@
+from collections import deque
+import math
+import numpy as np
+
+#pixels the model actually sees for an image, ultralytics scales the longest side to imgsz and pads
+#each side up to a multiple of the stride
+def model_input_pixels(height, width, imgsz, stride=32):
+    scale = imgsz/max(height, width)
+    input_height = math.ceil(round(height*scale)/stride)*stride
+    input_width = math.ceil(round(width*scale)/stride)*stride
+    return input_height*input_width
+
+#follows the ball with detections on a small crop around where its recent trajectory says it will be,
+#the crop is run at its own resolution so a ball a few pixels wide isn't shrunk away by downscaling the
+#whole frame, and the full frame is only searched once the ball has been lost
+class BallRoiTracker:
+
+    def __init__(self, crop_size=320, max_crop_size=640, search_growth=0.5, max_misses=3, history=5,
+                 full_frame_imgsz=640, stride=32, shared_full_pass=False, shared_pass_imgsz=None, lost_search_interval=4):
+        #side of the square crop while the ball is being followed, and the size every crop is run at
+        self.crop_size = crop_size
+        #the crop grows by search_growth of its size for every frame the ball is missed, up to max_crop_size,
+        #a grown crop is scaled down to crop_size so a search never costs more than the first one
+        self.max_crop_size = max_crop_size
+        self.search_growth = search_growth
+        #frames without a detection before the ball counts as lost and the full frame is searched
+        self.max_misses = max_misses
+        #recent detections the velocity is estimated from
+        self.history = history
+        self.full_frame_imgsz = full_frame_imgsz
+        self.stride = stride
+        #every frame also goes through the model whole for the players, so a ball the crop misses is taken
+        #from that pass instead of searching again, and its pixels count towards model_pixels. the pass only
+        #has to find players once the crops look after the ball, so it can run at a smaller shared_pass_imgsz
+        self.shared_full_pass = shared_full_pass
+        self.shared_pass_imgsz = shared_pass_imgsz if shared_pass_imgsz is not None else full_frame_imgsz
+        #with a shared pass, a lost ball that pass didn't find either is searched for on the full frame at
+        #full_frame_imgsz every lost_search_interval frames rather than every frame
+        self.lost_search_interval = lost_search_interval
+        self.reset()
+
+    def reset(self):
+        self._detections = deque(maxlen=self.history)
+        self._last_full_search = None
+        self.stats = {'frames': 0, 'roi_searches': 0, 'roi_found': 0, 'full_searches': 0, 'full_found': 0,
+                      'fallback_found': 0, 'model_pixels': 0, 'full_frame_pixels': 0}
+
+    #expected ball centre and search crop size for frame_num, None when the ball is lost
+    def predict(self, frame_num):
+        if not self._detections:
+            return None
+        last_frame, last_centre = self._detections[-1]
+        frames_since = frame_num - last_frame
+        if frames_since > self.max_misses:
+            return None
+
+        #average velocity over the recent detections, steadier than the last step alone
+        first_frame, first_centre = self._detections[0]
+        velocity = (last_centre - first_centre)/(last_frame - first_frame) if last_frame > first_frame else np.zeros(2)
+        centre = last_centre + velocity*frames_since
+        size = min(self.crop_size*(1 + self.search_growth*(frames_since - 1)), self.max_crop_size)
+        return centre, size
+
+    #square crop of side size around centre, moved inside the frame, as x1,y1,x2,y2
+    def get_crop(self, frame_shape, centre, size):
+        height, width = frame_shape[:2]
+        size = int(min(size, height, width))
+        x1 = int(np.clip(round(centre[0] - size/2), 0, width - size))
+        y1 = int(np.clip(round(centre[1] - size/2), 0, height - size))
+        return x1, y1, x1 + size, y1 + size
+
+    def _imgsz(self, size):
+        return int(math.ceil(size/self.stride)*self.stride)
+
+    #ball box for frame_num in full frame coordinates, or None
+    #detect(image, imgsz) runs the model and returns the best ball box in that image's coordinates or None,
+    #fallback_bbox is a ball already found by a full-frame pass for other objects, used whenever the crop
+    #comes up empty or the ball is lost, instead of searching the frame again
+    def search(self, frame, frame_num, detect, fallback_bbox=None):
+        height, width = frame.shape[:2]
+        full_frame_pixels = model_input_pixels(height, width, self.full_frame_imgsz, self.stride)
+        self.stats['frames'] += 1
+        self.stats['full_frame_pixels'] += full_frame_pixels
+        if self.shared_full_pass:
+            self.stats['model_pixels'] += model_input_pixels(height, width, self.shared_pass_imgsz, self.stride)
+
+        bbox = None
+        prediction = self.predict(frame_num)
+        if prediction is not None:
+            x1, y1, x2, y2 = self.get_crop(frame.shape, *prediction)
+            imgsz = self._imgsz(min(x2 - x1, self.crop_size))
+            crop_bbox = detect(frame[y1:y2, x1:x2], imgsz)
+            self.stats['roi_searches'] += 1
+            self.stats['model_pixels'] += model_input_pixels(y2 - y1, x2 - x1, imgsz, self.stride)
+            if crop_bbox is not None:
+                bbox = np.asarray(crop_bbox, dtype=np.float64) + [x1, y1, x1, y1]
+                self.stats['roi_found'] += 1
+        if bbox is None and fallback_bbox is not None:
+            bbox = np.asarray(fallback_bbox, dtype=np.float64)
+            self.stats['fallback_found'] += 1
+        elif bbox is None and prediction is None and self._full_search_due(frame_num):
+            self._last_full_search = frame_num
+            bbox = detect(frame, self.full_frame_imgsz)
+            self.stats['full_searches'] += 1
+            self.stats['model_pixels'] += model_input_pixels(height, width, self.full_frame_imgsz, self.stride)
+            if bbox is not None:
+                bbox = np.asarray(bbox, dtype=np.float64)
+                self.stats['full_found'] += 1
+
+        if bbox is not None:
+            self._detections.append((frame_num, (bbox[:2] + bbox[2:])/2))
+        return bbox
+
+    def _full_search_due(self, frame_num):
+        if not self.shared_full_pass or self._last_full_search is None:
+            return True
+        return frame_num - self._last_full_search >= self.lost_search_interval
+
+    #model pixels the ball search used against running the full frame through the model every frame at
+    #full_frame_imgsz, a shared pass counts in full
+    def pixel_ratio(self):
+        if self.stats['full_frame_pixels'] == 0:
+            return 0.0
+        return self.stats['model_pixels']/self.stats['full_frame_pixels']
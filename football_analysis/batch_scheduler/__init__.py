@@ -0,0 +1 @@
+from .batch_scheduler import run_batch, read_inputs
\ No newline at end of file
@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import cv2
+from football_analysis import DEFAULT_MODEL_PATH
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v')
+
+#state of each pool process, the tracker is loaded once by the initialiser and reused for every video
+#the process is given
+_worker = {}
+
+def _init_worker(model_path, threads, cache_dir, frame_store_dir, warm_up):
+    #thread pools are sized before torch is imported by the tracker, otherwise every process starts one
+    #thread per core and they fight over the machine
+    for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS'):
+        os.environ[name] = str(threads)
+    cv2.setNumThreads(threads)
+
+    from football_analysis.main import load_tracker
+    tracker, timings = load_tracker(model_path, warm_up=warm_up)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    #frames are decoded on demand unless the processes are given somewhere to memory-map them
+    frame_store_path = None
+    if frame_store_dir is not None:
+        frame_store_path = os.path.join(frame_store_dir, f'frame_store_{os.getpid()}.npy')
+    _worker.update(tracker=tracker, cache_dir=cache_dir, timings=timings, frame_store_path=frame_store_path)
+
+def _process(job):
+    from football_analysis.main import process_video
+    #written before any work so that if this process dies, the scheduler knows which job it was running
+    open(job['marker'], 'w').close()
+    result = dict(job, pid=os.getpid(), worker_load_seconds=sum(_worker['timings'].values()))
+    start = time.perf_counter()
+    try:
+        possession_stats = process_video(job['input'], job['output'], _worker['tracker'],
+                                         cache_dir=_worker['cache_dir'],
+                                         frame_store_path=_worker['frame_store_path'],
+                                         report_path=job['report'],
+                                         workers=1)
+        result.update(state='done', frames=int(possession_stats.num_frames))
+    except Exception as error:
+        result.update(state='failed', error=f'{type(error).__name__}: {error}', traceback=traceback.format_exc())
+    finally:
+        if _worker['frame_store_path'] is not None and os.path.exists(_worker['frame_store_path']):
+            os.remove(_worker['frame_store_path'])
+    result['seconds'] = time.perf_counter() - start
+    if result.get('frames'):
+        result['fps'] = result['frames']/result['seconds']
+    return result
+
+#videos to process from a folder, a text file with one path per line, or a JSON list of paths or of
+#{"input": ..., "output": ...} objects, relative paths in a manifest are taken from the manifest's folder
+def read_inputs(source):
+    if os.path.isdir(source):
+        return [{'input': os.path.join(source, file_name)} for file_name in sorted(os.listdir(source))
+                if file_name.lower().endswith(VIDEO_EXTENSIONS)]
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        if source.endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    jobs = []
+    for entry in entries:
+        job = dict(entry) if isinstance(entry, dict) else {'input': entry}
+        for key in ('input', 'output', 'report'):
+            if key in job:
+                job[key] = os.path.join(base_dir, job[key])
+        jobs.append(job)
+    return jobs
+
+#fill in output paths, names are made unique so videos with the same name from different folders
+#don't overwrite each other
+def plan_jobs(jobs, output_dir):
+    used = set()
+    for job in jobs:
+        name = os.path.splitext(os.path.basename(job['input']))[0]
+        unique_name, count = name, 1
+        while unique_name in used:
+            count += 1
+            unique_name = f'{name}_{count}'
+        used.add(unique_name)
+        job['input'] = os.path.abspath(job['input'])
+        job.setdefault('output', os.path.join(output_dir, f'{unique_name}.avi'))
+        job.setdefault('report', os.path.join(output_dir, f'{unique_name}_possession.json'))
+        for path in (job['output'], job['report']):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        capture = cv2.VideoCapture(job['input'])
+        job['expected_frames'] = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) if capture.isOpened() else 0
+        capture.release()
+    #longest videos first so the pool isn't left waiting on one long match at the end
+    return sorted(jobs, key=lambda job: -job['expected_frames'])
+
+#process every job across a pool of processes, each with its own model, and return the summary.
+#a worker that dies outright, out of memory for instance, breaks the whole pool, so the jobs that hadn't
+#finished go to a fresh pool. when several were running at the time, each is rerun on its own to find the
+#one that did it, and a job that takes a worker down on its own gets max_retries more tries
+def run_batch(jobs, output_dir='Output_Videos/batch', model_path=DEFAULT_MODEL_PATH, workers=None, threads=None,
+              cache_dir='stubs/cache', frame_store_dir=None, summary_path=None, warm_up=True, max_retries=1):
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, cpu_count//(threads or 4))
+    if threads is None:
+        threads = max(1, cpu_count//workers)
+    workers = min(workers, max(1, len(jobs)))
+    if frame_store_dir is not None:
+        os.makedirs(frame_store_dir, exist_ok=True)
+    jobs = plan_jobs(jobs, output_dir)
+
+    marker_dir = tempfile.mkdtemp(prefix='batch_')
+    for job_num, job in enumerate(jobs):
+        job['marker'] = os.path.join(marker_dir, f'{job_num}.started')
+        job['attempts'] = 0
+
+    def report(result):
+        result = {key: value for key, value in result.items() if key != 'marker'}
+        results.append(result)
+        print(f'[{len(results)}/{len(jobs)}] {result["state"]} {result["input"]}'
+              + (f' ({result["fps"]:.1f} fps)' if 'fps' in result else f' ({result.get("error")})'))
+
+    start = time.perf_counter()
+    results = []
+    pending = jobs
+    #jobs that were running alongside others when a worker died, rerun one at a time
+    isolated = []
+    #pools that broke before any job had started, the model failing to load for instance
+    broken_pools = 0
+    try:
+        while pending or isolated:
+            round_jobs = isolated[:1] if isolated else pending
+            with ProcessPoolExecutor(max_workers=min(workers, len(round_jobs)), initializer=_init_worker,
+                                     initargs=(model_path, threads, cache_dir, frame_store_dir, warm_up)) as pool:
+                unfinished = []
+                futures = {pool.submit(_process, job): job for job in round_jobs}
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        unfinished.append(futures[future])
+                        continue
+                    report(dict(result, attempts=result['attempts'] + 1))
+
+            if isolated:
+                isolated = isolated[1:]
+            else:
+                pending = []
+
+            #only jobs that had started can have taken the worker down with them
+            suspects = [job for job in unfinished if os.path.exists(job['marker'])]
+            broken_pools = broken_pools + 1 if unfinished and not suspects else 0
+            for job in unfinished:
+                if job in suspects:
+                    os.remove(job['marker'])
+                    if len(suspects) == 1:
+                        job['attempts'] += 1
+                    else:
+                        isolated.append(job)
+                        continue
+                if job['attempts'] > max_retries or broken_pools > max_retries:
+                    report(dict(job, state='failed', error=f'worker process died ({job["attempts"]} attempt(s))'))
+                elif job in suspects:
+                    #a job that has taken a worker down is retried on its own
+                    isolated.append(job)
+                else:
+                    pending.append(job)
+    finally:
+        shutil.rmtree(marker_dir, ignore_errors=True)
+    wall_seconds = time.perf_counter() - start
+
+    done = [result for result in results if result['state'] == 'done']
+    frames = sum(result['frames'] for result in done)
+    summary = {
+        'workers': workers,
+        'threads_per_worker': threads,
+        'videos': len(jobs),
+        'done': len(done),
+        'failed': len(results) - len(done),
+        'frames': frames,
+        'wall_seconds': wall_seconds,
+        'frames_per_second': frames/wall_seconds if wall_seconds > 0 else 0.0,
+        'videos_per_hour': len(done)*3600/wall_seconds if wall_seconds > 0 else 0.0,
+        'failures': [{'input': result['input'], 'error': result.get('error')} for result in results if result['state'] != 'done'],
+        'results': sorted(results, key=lambda result: result['input']),
+    }
+    if summary_path is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(summary_path)), exist_ok=True)
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return summary
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Process a folder or manifest of videos across a pool of processes')
+    parser.add_argument('source', help='folder of videos, or a .txt/.json manifest')
+    parser.add_argument('--output-dir', default='Output_Videos/batch')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--workers', type=int, help='processes, each loads its own model')
+    parser.add_argument('--threads', type=int, help='threads per process, defaults to the cores shared between processes')
+    parser.add_argument('--cache-dir', default='stubs/cache')
+    parser.add_argument('--frame-store-dir', help='memory-map each process\'s decoded frames in this folder, about 6MB per 1080p frame')
+    parser.add_argument('--summary', help='defaults to batch_summary.json in the output folder')
+    parser.add_argument('--no-warm-up', action='store_true')
+    parser.add_argument('--max-retries', type=int, default=1, help='tries left for a video whose worker died while running it')
+    args = parser.parse_args(argv)
+
+    jobs = read_inputs(args.source)
+    if not jobs:
+        parser.error(f'no videos found in {args.source}')
+    summary_path = args.summary or os.path.join(args.output_dir, 'batch_summary.json')
+    summary = run_batch(jobs, args.output_dir, args.model, workers=args.workers, threads=args.threads,
+                        cache_dir=args.cache_dir, frame_store_dir=args.frame_store_dir,
+                        summary_path=summary_path, warm_up=not args.no_warm_up, max_retries=args.max_retries)
+    print(f'{summary["done"]}/{summary["videos"]} videos, {summary["frames_per_second"]:.1f} fps overall, '
+          f'{summary["wall_seconds"]:.1f}s with {summary["workers"]} workers x {summary["threads_per_worker"]} threads, '
+          f'summary in {summary_path}')
+    return 0 if summary['failed'] == 0 else 1
+
+if __name__ == '__main__':
+    raise SystemExit(main())
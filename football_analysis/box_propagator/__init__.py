@@ -0,0 +1 @@
+from .box_propagator import BoxPropagator
\ No newline at end of file
@@ -0,0 +1,56 @@
+import cv2
+import numpy as np
+
+#moves boxes from one frame to the next with sparse optical flow, used between detection keyframes
+class BoxPropagator:
+
+    def __init__(self, points_per_side=3, max_fb_error=1.0):
+        #grid of points tracked inside each box
+        self.points_per_side = points_per_side
+        #points whose backward flow doesn't land near where they started are treated as lost
+        self.max_fb_error = max_fb_error
+        self.lk_params = dict(
+            winSize = (15,15),
+            maxLevel = 2,
+            criteria = (cv2.TermCriteria_EPS | cv2.TermCriteria_COUNT, 10, 0.03)
+        )
+        #grid positions as fractions of the box, kept to the middle so the points sit on the object
+        steps = np.linspace(0.2, 0.8, points_per_side)
+        grid_x, grid_y = np.meshgrid(steps, steps)
+        self._grid = np.stack([grid_x.ravel(),grid_y.ravel()],axis=1)
+
+    #points to track for every box, shape (boxes*points, 2)
+    def get_box_points(self, boxes):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1,4)
+        top_left = boxes[:,None,:2]
+        size = boxes[:,None,2:] - boxes[:,None,:2]
+        return (top_left + self._grid[None]*size).reshape(-1,2).astype(np.float32)
+
+    #shift boxes from old_grey to new_grey, returning the moved boxes, the fraction of each box's points
+    #that were tracked reliably and the median movement of every tracked point
+    def propagate(self, old_grey, new_grey, boxes):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1,4)
+        num_boxes = len(boxes)
+        if num_boxes == 0:
+            return boxes, np.zeros(0), 0.0
+
+        points = self.get_box_points(boxes).reshape(-1,1,2)
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(old_grey,new_grey,points,None,**self.lk_params)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(new_grey,old_grey,new_points,None,**self.lk_params)
+
+        fb_error = np.linalg.norm((back_points - points).reshape(-1,2), axis=1)
+        valid = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+        flow = (new_points - points).reshape(num_boxes,-1,2)
+        valid = valid.reshape(num_boxes,-1)
+
+        confidence = valid.mean(axis=1)
+        if not valid.any():
+            return boxes, confidence, np.inf
+        median_flow = np.median(flow[valid], axis=0)
+
+        #median movement of each box's good points, boxes that lost them all follow the scene
+        masked_flow = np.where(valid[...,None], flow, np.nan)
+        box_flow = np.nanmedian(np.where(valid.any(axis=1)[:,None,None], masked_flow, median_flow), axis=1)
+
+        moved = boxes + np.tile(box_flow, 2)
+        return moved, confidence, float(np.hypot(*median_flow))
@@ -0,0 +1,453 @@
+import hashlib
+import pickle
+import cv2
+import numpy as np
+from football_analysis.utils import measure_distance, measure_xy_distance
+from football_analysis.track_store import TrackStore
+from football_analysis.checkpoint import Checkpoint
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from football_analysis.pipeline_metrics import NULL_METRICS
+from football_analysis.utils import VideoReader
+
+#estimate one chunk inside a worker process, starting a few frames early so the
+#feature state has settled by the time the chunk itself begins
+def _estimate_chunk(settings, frames, warm_start, start, stop, fast, reduction='median'):
+    estimator = CameraMovementEstimator.from_worker_settings(settings)
+    #readers are passed whole and indexed directly, anything else arrives sliced to the chunk
+    offset = 0 if isinstance(frames, VideoReader) else warm_start
+    if fast:
+        camera_movement = estimator.get_camera_movement_fast(frames, reduction=reduction, start=warm_start-offset, stop=stop-offset)
+    else:
+        camera_movement = estimator.get_camera_movement_range(frames, start=warm_start-offset, stop=stop-offset)
+    return camera_movement[start-warm_start:]
+
+#movement per frame as one x, y row each, whichever way it was estimated or loaded
+def _as_movement(camera_movement):
+    return np.asarray(camera_movement, dtype=np.float32).reshape(-1,2)
+
+class CameraMovementEstimator:
+    
+    def __init__(self,frame):
+
+        #minimum camera movement
+        self.minimum_distance = 5
+        #specify lk params
+        self.lk_params = dict(
+            winSize = (15,15),
+            maxLevel = 2,
+            criteria = (cv2.TermCriteria_EPS | cv2.TermCriteria_COUNT, 10, 0.03)
+        )
+
+        first_frame_greyscale = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+        #choosing features from the top and bottom of the frame that shouldn't be obstructed by movement
+        mask_features = np.zeros_like(first_frame_greyscale)
+        #slicing out so we have the top 20 rows of pixels and the bottom banners
+        mask_features[:,0:20] = 1
+        mask_features[:,900:1050] = 1
+
+        #setting up dictionary to use for feature extraction
+        self.features = dict(
+            maxCorners = 100,
+            qualityLevel = 0.3,
+            minDistance = 3,
+            blockSize = 7,
+            mask = mask_features
+        )
+
+        #regions of the frame covered by the feature mask, the fast mode only looks at these
+        self.feature_regions = self.get_feature_regions(mask_features)
+        self.strip_columns, self.strip_mask = self.get_strip_columns(mask_features)
+
+        #per-frame flow latency, switched off unless a run hands in its own metrics
+        self.metrics = NULL_METRICS
+
+    #what a worker process needs to estimate a chunk, the full frame mask is sent as the strips cut out of it
+    def get_worker_settings(self):
+        return {'minimum_distance': self.minimum_distance,
+                'lk_params': self.lk_params,
+                'features': {name: value for name, value in self.features.items() if name != 'mask'},
+                'mask_shape': self.features['mask'].shape,
+                'feature_regions': self.feature_regions}
+
+    #rebuild an estimator from get_worker_settings without needing a frame
+    @classmethod
+    def from_worker_settings(cls, settings):
+        estimator = cls.__new__(cls)
+        estimator.minimum_distance = settings['minimum_distance']
+        estimator.lk_params = settings['lk_params']
+        estimator.feature_regions = settings['feature_regions']
+        mask_features = np.zeros(settings['mask_shape'], dtype=np.uint8)
+        for y1, y2, x1, x2, region_mask in estimator.feature_regions:
+            mask_features[y1:y2, x1:x2] = np.maximum(mask_features[y1:y2, x1:x2], region_mask)
+        estimator.features = dict(settings['features'], mask=mask_features)
+        estimator.strip_columns, estimator.strip_mask = estimator.get_strip_columns(mask_features)
+        estimator.metrics = NULL_METRICS
+        return estimator
+
+    #find the strips of the mask as (y1,y2,x1,x2) boxes, padded so the flow window fits around features
+    def get_feature_regions(self, mask, margin=16):
+        height, width = mask.shape
+        columns = np.flatnonzero(mask.any(axis=0))
+        if len(columns) == 0:
+            return []
+        #split the masked columns into runs of neighbouring columns
+        breaks = np.flatnonzero(np.diff(columns) > 1)
+        run_starts = np.r_[columns[0], columns[breaks+1]]
+        run_ends = np.r_[columns[breaks], columns[-1]] + 1
+
+        regions = []
+        for x1, x2 in zip(run_starts, run_ends):
+            rows = np.flatnonzero(mask[:,x1:x2].any(axis=1))
+            y1, y2 = rows[0], rows[-1] + 1
+            regions.append((max(y1-margin,0), min(y2+margin,height), max(x1-margin,0), min(x2+margin,width),
+                            mask[max(y1-margin,0):min(y2+margin,height), max(x1-margin,0):min(x2+margin,width)]))
+        return regions
+    
+    #columns within margin of the mask, side by side they give the same corners and flow inside the mask as the
+    #whole frame does, the margin covers the corner window and the flow window at every pyramid level
+    def get_strip_columns(self, mask, margin=32):
+        columns = np.flatnonzero(mask.any(axis=0))
+        keep = np.zeros(mask.shape[1], dtype=bool)
+        for column in columns:
+            keep[max(column-margin,0):column+margin+1] = True
+        strip_columns = np.flatnonzero(keep)
+        return strip_columns, np.ascontiguousarray(mask[:,strip_columns])
+
+    #adjust the positions of objects accounting for camera movement
+    def adjust_positions_to_tracks(self,tracks, camera_movement_per_frame):
+        #columnar store, subtract each row's frame movement in one pass
+        if isinstance(tracks, TrackStore):
+            camera_movement_per_frame = np.asarray(camera_movement_per_frame, dtype=np.float32).reshape(-1,2)
+            for object, object_tracks in tracks.items():
+                position = object_tracks.column('position')
+                object_tracks.set_column('position_adjusted',
+                                         position - camera_movement_per_frame[object_tracks.frame])
+            return
+
+        for object, object_tracks in tracks.items():
+            for frame_num, track in enumerate(object_tracks):
+                for track_id, track_info in track.items():
+                    position = track_info['position']
+                    camera_movement = camera_movement_per_frame[frame_num]
+                    position_adjusted = position[0] - camera_movement[0], position[1] - camera_movement[1]
+                    tracks[object][frame_num][track_id]['position_adjusted'] = position_adjusted
+
+
+    #movement of every frame against the one before, as a float32 array of x, y rows
+    #fast uses get_camera_movement_fast with the given reduction, 'max' keeps to the original estimate
+    def get_camera_movement(self, frames, read_from_stub=False,stub_path=None,fast=False,
+                            workers=None,chunk_size=500,overlap=10,cache=None,video_path=None,checkpoint=None,
+                            reduction='median'):
+        #read the stub when present to cut down processing time
+        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
+            with open(stub_path, 'rb') as f:
+                return _as_movement(pickle.load(f))
+
+        #the result cache is keyed on the video and every setting that changes the estimate
+        if video_path is None:
+            video_path = getattr(frames, 'video_path', None)
+        key = None
+        if cache is not None and video_path is not None:
+            features = {name: value for name, value in self.features.items() if name != 'mask'}
+            key = cache.make_key('camera_movement', [video_path],
+                                 fast=fast,
+                                 reduction=reduction if fast and reduction != 'median' else None,
+                                 #chunk edges can shift the estimate slightly, so parallel runs are keyed separately
+                                 chunks=[chunk_size,overlap] if workers is not None and workers > 1 else None,
+                                 minimum_distance=self.minimum_distance,
+                                 lk_params=self.lk_params,
+                                 features=features,
+                                 mask=hashlib.sha256(self.features['mask'].tobytes()).hexdigest(),
+                                 version=1)
+            arrays = cache.load(key)
+            if arrays is not None:
+                return _as_movement(arrays['camera_movement'])
+
+        #cached runs checkpoint alongside their cache entry
+        if checkpoint is None and key is not None:
+            checkpoint = Checkpoint(cache.checkpoint_dir(key))
+
+        if workers is not None and workers > 1:
+            camera_movement = self.get_camera_movement_parallel(frames, workers, chunk_size, overlap, fast, checkpoint, reduction)
+        elif checkpoint is not None:
+            camera_movement = self.get_camera_movement_checkpointed(frames, checkpoint, fast, chunk_size, reduction)
+        elif fast:
+            camera_movement = self.get_camera_movement_fast(frames, reduction=reduction)
+        else:
+            camera_movement = self.get_camera_movement_range(frames)
+        camera_movement = _as_movement(camera_movement)
+
+        #store stubs after first run through
+        if stub_path is not None:
+            with open(stub_path, 'wb') as f:
+                pickle.dump(camera_movement,f)
+        if key is not None:
+            cache.save(key, {'camera_movement': camera_movement})
+        #the full result is stored, partial chunks are no longer needed
+        if checkpoint is not None:
+            checkpoint.clear('camera_movement')
+            checkpoint.clear('camera_movement_parallel')
+
+        return camera_movement
+
+    #split the video into overlapping chunks, estimate each in its own process and stitch them back
+    #chunks don't carry state between them, so each is committed to the checkpoint as soon as it and the
+    #ones before it are done, and a resumed run only estimates the chunks after the last one committed
+    def get_camera_movement_parallel(self, frames, workers, chunk_size=500, overlap=10, fast=False, checkpoint=None,
+                                     reduction='median'):
+        chunks, first_start = [], 0
+        if checkpoint is not None:
+            resumed = checkpoint.resume('camera_movement_parallel')
+            if resumed is not None:
+                chunks, _, first_start = resumed
+
+        settings = self.get_worker_settings()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for start in range(first_start, len(frames), chunk_size):
+                stop = min(start + chunk_size, len(frames))
+                #the overlap runs up to and including the frame before the chunk, so the chunk's
+                #first movement is measured against its real predecessor
+                warm_start = max(start - overlap, 0)
+                chunk_frames = frames if isinstance(frames, VideoReader) else frames[warm_start:stop]
+                futures.append((stop, executor.submit(_estimate_chunk, settings, chunk_frames, warm_start, start, stop, fast, reduction)))
+            for stop, future in futures:
+                chunks.append(future.result())
+                if checkpoint is not None:
+                    checkpoint.commit('camera_movement_parallel', stop, chunks[-1], None)
+
+        if fast:
+            return np.concatenate(chunks)
+        return [movement for chunk in chunks for movement in chunk]
+
+    #the original estimate over frames start to stop, the first frame of the range has no movement
+    def get_camera_movement_range(self, frames, start=0, stop=None, state=None, return_state=False):
+        if stop is None:
+            stop = len(frames)
+
+        #set up camera movement array
+        camera_movement = [[0,0]]*(stop-start)
+
+        #carrying on from a previous range, frame start is measured against where that range left off
+        if state is not None:
+            old_grey, old_features = state
+            first_frame = start
+        else:
+            #greyscale the frames that have been passed through
+            old_grey = cv2.cvtColor(frames[start],cv2.COLOR_BGR2GRAY)
+            #extract relevant features from the passed frames, the ** before features allows for dictionary
+            #to be expanded into features
+            old_features = cv2.goodFeaturesToTrack(old_grey,**self.features)
+            first_frame = start + 1
+
+        for frame_num in range(first_frame,stop):
+            frame_start = time.perf_counter()
+            frame_grey = cv2.cvtColor(frames[frame_num],cv2.COLOR_BGR2GRAY)
+            #pull out new features, status and error are given as wildcards, not needed
+            new_features, _, _ = cv2.calcOpticalFlowPyrLK(old_grey,
+                                                          frame_grey,
+                                                          old_features,
+                                                          None,
+                                                          **self.lk_params)
+            
+            #measure maximum distance between features
+            max_distance = 0
+            camera_movement_x, camera_movement_y = 0,0
+
+            #unspool old and new features
+            for _, (new,old) in enumerate(zip(new_features, old_features)):
+                new_features_point = new.ravel()
+                old_features_point = old.ravel()
+
+                #measure the distance between old and new features, updating max if needed
+                distance = measure_distance(new_features_point,old_features_point)
+                if distance > max_distance:
+                    max_distance = distance
+                    camera_movement_x, camera_movement_y = measure_xy_distance(old_features_point,
+                                                                               new_features_point)
+            if max_distance > self.minimum_distance:
+                camera_movement[frame_num-start] = [camera_movement_x,camera_movement_y]
+                old_features = cv2.goodFeaturesToTrack(frame_grey,**self.features)
+
+            old_grey = frame_grey.copy()
+            self.metrics.observe('camera_flow', time.perf_counter() - frame_start)
+
+        if return_state:
+            return camera_movement, (old_grey, old_features)
+        return camera_movement
+
+    #estimate in chunks, committing each one with the reference frame and features it finished on so
+    #an interrupted run resumes from the last chunk with the same result as an uninterrupted one
+    def get_camera_movement_checkpointed(self, frames, checkpoint, fast=False, chunk_size=500, reduction='median'):
+        resumed = checkpoint.resume('camera_movement')
+        if resumed is None:
+            chunks, state, start = [], None, 0
+        else:
+            chunks, state, start = resumed
+
+        for chunk_start in range(start, len(frames), chunk_size):
+            chunk_stop = min(chunk_start + chunk_size, len(frames))
+            if fast:
+                camera_movement, state = self.get_camera_movement_fast(frames, reduction=reduction, start=chunk_start, stop=chunk_stop,
+                                                                       state=state, return_state=True)
+            else:
+                camera_movement, state = self.get_camera_movement_range(frames, start=chunk_start, stop=chunk_stop,
+                                                                        state=state, return_state=True)
+            checkpoint.commit('camera_movement', chunk_stop, camera_movement, state)
+            chunks.append(camera_movement)
+
+        if fast:
+            return np.concatenate(chunks) if chunks else np.zeros((0,2), dtype=np.float32)
+        return [movement for chunk in chunks for movement in chunk]
+    
+    #greyscale and downscale only the masked strips of a frame
+    def get_region_greys(self, frame, downscale):
+        region_greys = []
+        for y1, y2, x1, x2, _ in self.feature_regions:
+            region_grey = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+            if downscale != 1:
+                region_grey = cv2.resize(region_grey, None, fx=downscale, fy=downscale, interpolation=cv2.INTER_AREA)
+            region_greys.append(region_grey)
+        return region_greys
+
+    def get_region_features(self, region_greys, downscale):
+        region_features = []
+        for region_grey, (_, _, _, _, region_mask) in zip(region_greys, self.feature_regions):
+            mask = cv2.resize(region_mask, (region_grey.shape[1],region_grey.shape[0]), interpolation=cv2.INTER_NEAREST)
+            features = dict(self.features,
+                            minDistance=max(self.features['minDistance']*downscale, 1),
+                            mask=mask)
+            region_features.append(cv2.goodFeaturesToTrack(region_grey, **features))
+        return region_features
+
+    #faster estimate: flow on downscaled mask strips, features carried frame to frame and only
+    #re-detected when too few survive, and a vectorised reduction of the feature displacements
+    #reduction='max' is the original estimate instead, see get_camera_movement_strips
+    def get_camera_movement_fast(self, frames, downscale=0.5, reduction='median', min_features=60, start=0, stop=None,
+                                 state=None, return_state=False):
+        if reduction == 'max':
+            return self.get_camera_movement_strips(frames, start, stop, state, return_state)
+        if stop is None:
+            stop = len(frames)
+        camera_movement = np.zeros((stop-start,2), dtype=np.float32)
+
+        #carrying on from a previous range, frame start is measured against where that range left off
+        if state is not None:
+            old_greys, old_features = state
+            first_frame = start
+        else:
+            old_greys = self.get_region_greys(frames[start], downscale)
+            old_features = self.get_region_features(old_greys, downscale)
+            first_frame = start + 1
+
+        for frame_num in range(first_frame,stop):
+            frame_start = time.perf_counter()
+            frame_greys = self.get_region_greys(frames[frame_num], downscale)
+
+            displacements = []
+            new_features = []
+            for old_grey, frame_grey, features in zip(old_greys, frame_greys, old_features):
+                if features is None or len(features) == 0:
+                    new_features.append(None)
+                    continue
+                tracked_features, status, _ = cv2.calcOpticalFlowPyrLK(old_grey,
+                                                                       frame_grey,
+                                                                       features,
+                                                                       None,
+                                                                       **self.lk_params)
+                good = status.ravel() == 1
+                #old minus new, in full resolution pixels
+                displacements.append((features[good] - tracked_features[good]).reshape(-1,2)/downscale)
+                new_features.append(tracked_features[good].reshape(-1,1,2))
+
+            displacements = np.concatenate(displacements) if displacements else np.zeros((0,2), dtype=np.float32)
+            if len(displacements):
+                movement = np.median(displacements, axis=0)
+                distance = np.hypot(movement[0], movement[1])
+                if distance > self.minimum_distance:
+                    camera_movement[frame_num-start] = movement
+
+            #keep tracking the surviving features unless too few are left
+            surviving_features = sum(len(features) for features in new_features if features is not None)
+            if surviving_features < min_features:
+                new_features = self.get_region_features(frame_greys, downscale)
+
+            old_greys = frame_greys
+            old_features = new_features
+            self.metrics.observe('camera_flow', time.perf_counter() - frame_start)
+
+        if return_state:
+            return camera_movement, (old_greys, old_features)
+        return camera_movement
+
+    #the original estimate, largest feature displacement with features kept until a movement is recorded,
+    #run at full resolution on the masked columns only with the per-feature loop vectorised
+    def get_camera_movement_strips(self, frames, start=0, stop=None, state=None, return_state=False):
+        if stop is None:
+            stop = len(frames)
+        camera_movement = np.zeros((stop-start,2), dtype=np.float32)
+        features = dict(self.features, mask=self.strip_mask)
+
+        #carrying on from a previous range, frame start is measured against where that range left off
+        if state is not None:
+            old_grey, old_features = state
+            first_frame = start
+        else:
+            old_grey = cv2.cvtColor(frames[start][:,self.strip_columns], cv2.COLOR_BGR2GRAY)
+            old_features = cv2.goodFeaturesToTrack(old_grey, **features)
+            first_frame = start + 1
+
+        for frame_num in range(first_frame,stop):
+            frame_start = time.perf_counter()
+            frame_grey = cv2.cvtColor(frames[frame_num][:,self.strip_columns], cv2.COLOR_BGR2GRAY)
+            if old_features is not None and len(old_features):
+                new_features, _, _ = cv2.calcOpticalFlowPyrLK(old_grey, frame_grey, old_features, None, **self.lk_params)
+                #old minus new, the first feature moved furthest wins as in the original loop
+                displacements = (old_features - new_features).reshape(-1,2)
+                distances = np.hypot(displacements[:,0], displacements[:,1])
+                largest = np.argmax(distances)
+                if distances[largest] > self.minimum_distance:
+                    camera_movement[frame_num-start] = displacements[largest]
+                    old_features = cv2.goodFeaturesToTrack(frame_grey, **features)
+
+            old_grey = frame_grey
+            self.metrics.observe('camera_flow', time.perf_counter() - frame_start)
+
+        if return_state:
+            return camera_movement, (old_grey, old_features)
+        return camera_movement
+
+    def draw_camera_movement(self,frames,camera_movement_per_frame):
+        output_frames = []
+
+        for frame_num, frame in enumerate(frames):
+            frame = frame.copy()
+            overlay = frame.copy()
+
+            #drawing housing for camera movement
+            cv2.rectangle(overlay,(50,50),(600,150),(255,255,255),cv2.FILLED)
+            alpha = 0.6
+            cv2.addWeighted(overlay,alpha,frame,1-alpha,0,frame)
+
+            x_movement, y_movement = camera_movement_per_frame[frame_num]
+            frame = cv2.putText(frame,
+                                f'Camera - X Movement: {x_movement:.2f}',
+                                (75,90),
+                                cv2.FONT_HERSHEY_SIMPLEX,
+                                1,
+                                (0,0,0),
+                                3)
+            
+            frame = cv2.putText(frame,
+                                f'Camera - Y Movement: {y_movement:.2f}',
+                                (75,140),
+                                cv2.FONT_HERSHEY_SIMPLEX,
+                                1,
+                                (0,0,0),
+                                3)
+            
+            output_frames.append(frame)
+
+        return output_frames
\ No newline at end of file
@@ -0,0 +1 @@
+from .checkpoint import Checkpoint
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+import pickle
+import shutil
+import threading
+
+#chunk by chunk record of a stage's progress, so a run that is stopped part way through can carry on
+#from the last committed chunk instead of starting again
+class Checkpoint:
+
+    def __init__(self, checkpoint_dir):
+        self.checkpoint_dir = checkpoint_dir
+
+    def _stage_dir(self, stage):
+        return os.path.join(self.checkpoint_dir, stage)
+
+    #the same video can be running in two processes at once, the first to finish clears the checkpoint
+    #from under the other, which recreates the folder and carries on
+    def _write_atomic(self, path, value, attempts=3):
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        for attempt in range(attempts):
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(temp_path, 'wb') as f:
+                    pickle.dump(value, f)
+                os.replace(temp_path, path)
+                return
+            except FileNotFoundError:
+                if attempt == attempts - 1:
+                    raise
+
+    #record the results for frames up to end, along with whatever state is needed to continue from there
+    def commit(self, stage, end, results, state):
+        stage_dir = self._stage_dir(stage)
+        os.makedirs(stage_dir, exist_ok=True)
+        progress = self._read_progress(stage)
+        chunk_num = progress['chunks'] if progress is not None else 0
+
+        #the chunk goes first, it only counts once the progress file that follows points past it
+        self._write_atomic(os.path.join(stage_dir, f'chunk_{chunk_num:05d}.pkl'), results)
+        self._write_atomic(os.path.join(stage_dir, 'progress.pkl'), {'chunks': chunk_num + 1, 'end': end, 'state': state})
+
+    def _read_progress(self, stage):
+        progress_path = os.path.join(self._stage_dir(stage), 'progress.pkl')
+        if not os.path.exists(progress_path):
+            return None
+        with open(progress_path, 'rb') as f:
+            return pickle.load(f)
+
+    #committed chunk results, the saved state and the frame to continue from, or None for a fresh start
+    def resume(self, stage):
+        progress = self._read_progress(stage)
+        if progress is None:
+            return None
+        results = []
+        for chunk_num in range(progress['chunks']):
+            with open(os.path.join(self._stage_dir(stage), f'chunk_{chunk_num:05d}.pkl'), 'rb') as f:
+                results.append(pickle.load(f))
+        return results, progress['state'], progress['end']
+
+    #drop a finished stage, or everything when no stage is given
+    def clear(self, stage=None):
+        shutil.rmtree(self._stage_dir(stage) if stage is not None else self.checkpoint_dir, ignore_errors=True)
@@ -0,0 +1,191 @@
+import time
+#time spent importing the pipeline, reported by the command line
+_import_start = time.perf_counter()
+import argparse
+import os
+from football_analysis import DEFAULT_MODEL_PATH
+from football_analysis.utils import VideoReader, save_video
+from football_analysis.trackers import Tracker
+from football_analysis.team_assigner import TeamAssigner
+from football_analysis.ball_possession import BallPossession
+from football_analysis.camera_movement_estimator import CameraMovementEstimator
+from football_analysis.view_transformer import ViewTransformer
+from football_analysis.speed_and_distance_estimator import SpeedAndDistanceEstimator
+from football_analysis.result_cache import ResultCache
+from football_analysis.checkpoint import Checkpoint
+from football_analysis.ball_possession import PossessionStats
+from football_analysis.annotation_renderer import AnnotationRenderer
+from football_analysis.pipeline_metrics import PipelineMetrics, NULL_METRICS
+IMPORT_SECONDS = time.perf_counter() - _import_start
+
+#largest memory-mapped frame store built before falling back to decoding on demand
+FRAME_STORE_MAX_BYTES = 4*1024**3
+
+#load the detection model once and warm it up, the tracker can then be reused for any number of videos
+def load_tracker(model_path=DEFAULT_MODEL_PATH, warm_up=True):
+    timings = {}
+    start = time.perf_counter()
+    tracker = Tracker(model_path)
+    timings['model_load'] = time.perf_counter() - start
+    if warm_up:
+        timings['warm_up'] = tracker.warm_up()
+    return tracker, timings
+
+#run the whole pipeline on one video
+#frames are decoded on demand unless frame_store_path is given, then they're decoded once into a memory-mapped
+#file every stage and render process shares, as long as it fits in frame_store_max_bytes
+def process_video(input_video_path, output_video_path, tracker, cache_dir='stubs/cache',
+                  frame_store_path=None, report_path='Output_Videos/possession_report.json',
+                  workers=None, metrics=None, ball_roi=False, frame_store_max_bytes=FRAME_STORE_MAX_BYTES,
+                  detection_stride=1, full_pass_imgsz=None):
+    #per-stage timings and hot path latencies, recorded only when the caller asks for them
+    if metrics is None:
+        metrics = NULL_METRICS
+    tracker.metrics = metrics
+
+    #open video from input video folder
+    with metrics.stage('decode') as stage:
+        video_frames = VideoReader(input_video_path, frame_store_path=frame_store_path,
+                                   frame_store_max_bytes=frame_store_max_bytes)
+        stage['frames'] = num_frames = len(video_frames)
+
+    #track ids start from scratch for every video
+    tracker.reset()
+
+    #results are cached against the video, model weights and settings, so re-runs skip straight past
+    #detection and camera movement but never pick up results from a different input
+    cache = ResultCache(cache_dir)
+
+    #track our video frames, stored as columns rather than nested dictionaries
+    with metrics.stage('tracking', num_frames):
+        tracks = tracker.get_track_store(video_frames, cache=cache, ball_roi=ball_roi, detection_stride=detection_stride,
+                                         full_pass_imgsz=full_pass_imgsz)
+
+    #calculate object positions
+    with metrics.stage('positions', num_frames):
+        tracker.add_position_to_tracks(tracks)
+
+    #track the camera movement
+    with metrics.stage('camera_movement', num_frames):
+        camera_movement_estimator = CameraMovementEstimator(video_frames[0])
+        camera_movement_estimator.metrics = metrics
+        camera_movement_per_frame = camera_movement_estimator.get_camera_movement(video_frames,
+                                                                                  workers=workers,
+                                                                                  cache=cache)
+
+    #transform view to reflect true dimensions of pitch, camera movement is folded into
+    #one pixel-to-pitch matrix per frame so adjusting and projecting is a single pass
+    with metrics.stage('view_transformer', num_frames):
+        view_transformer = ViewTransformer()
+        view_transformer.set_camera_movement(camera_movement_per_frame)
+        view_transformer.add_transformed_position_to_tracks(tracks)
+
+    #interpolate the position of the ball for each missing frame
+    with metrics.stage('ball_interpolation', num_frames):
+        tracks['ball'] = tracker.interpolate_ball_position(tracks['ball'])
+
+    #estimate speed and distance travelled, measured against the video's own frame rate
+    with metrics.stage('speed_and_distance', num_frames):
+        speed_and_distance_estimator = SpeedAndDistanceEstimator(frame_rate=video_frames.fps)
+        speed_and_distance_estimator.add_speed_and_distance_to_tracks(tracks)
+
+    #assign players to teams
+    with metrics.stage('team_assignment', num_frames):
+        team_assigner = TeamAssigner()
+        #there is nothing to split into teams when no players were tracked
+        if tracks['players'].num_rows > 0:
+            team_assigner.assign_team_colour(video_frames[0],
+                                             tracks['players'][0])
+
+        #colour every new track in batches rather than one clustering model per player, each batch is
+        #checkpointed with the team model so an interrupted run picks up where it stopped
+        team_checkpoint = Checkpoint(cache.checkpoint_dir(cache.make_key('teams', [video_frames.video_path, tracker.model_path])))
+        team_assigner.add_team_to_track_store(tracks, video_frames, checkpoint=team_checkpoint)
+        team_checkpoint.clear()
+
+    #assign ball possession for the whole match in one pass
+    with metrics.stage('ball_possession', num_frames):
+        ball_possession = BallPossession()
+        assigned_players = ball_possession.add_possession_to_track_store(tracks)
+
+        team_possession = ball_possession.get_team_possession(tracks['players'], assigned_players)
+        possession_stats = PossessionStats.from_frames(team_possession, assigned_players)
+        if report_path is not None:
+            possession_stats.save_report(report_path)
+
+    #draw object tracks, possession, camera movement and speed in one pass, frames are rendered
+    #across a process pool and come back in order
+    with metrics.stage('render_and_write', num_frames):
+        renderer = AnnotationRenderer()
+        output_video_frames = renderer.render_parallel(video_frames,
+                                                       tracks,
+                                                       possession_stats,
+                                                       camera_movement_per_frame,
+                                                       workers=workers)
+
+        #save our video, frames are rendered as the writer consumes them, each wait for the next
+        #frame is the render latency the writer sees
+        save_video(metrics.timed_iter('render_frame', output_video_frames), output_video_path, fps=video_frames.fps)
+    video_frames.close()
+    return possession_stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Annotate football match footage with tracks, teams, possession and speed')
+    parser.add_argument('input', help='video to process')
+    parser.add_argument('--output', default='Output_Videos/video_output_final.avi')
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--cache-dir', default='stubs/cache')
+    parser.add_argument('--frame-store', help='memory-map decoded frames to this file, about 6MB per 1080p frame')
+    parser.add_argument('--frame-store-max-gb', type=float, default=FRAME_STORE_MAX_BYTES/1024**3,
+                        help='decode on demand instead when the frame store would be larger')
+    parser.add_argument('--report', default='Output_Videos/possession_report.json')
+    parser.add_argument('--workers', type=int, help='render and camera movement processes, rendering defaults to one per core')
+    parser.add_argument('--no-warm-up', action='store_true', help='skip the warm-up inference')
+    parser.add_argument('--ball-roi', action='store_true', help='find the ball on crops around its predicted position')
+    parser.add_argument('--full-pass-imgsz', type=int,
+                        help='size the full frame is run at for detection, defaults to 480 with --ball-roi and 640 otherwise')
+    parser.add_argument('--detection-stride', type=int, default=1,
+                        help='detect every this many frames and follow the boxes with optical flow in between')
+    parser.add_argument('--metrics', help='write per-stage timings, memory and latency histograms to this JSON file')
+    parser.add_argument('--prometheus', help='also write the metrics in Prometheus text format')
+    parser.add_argument('--profile', nargs='+', metavar='STAGE', help="run these stages under cProfile, or 'all'")
+    parser.add_argument('--profile-dir', default='profiles', help='where .prof files from --profile are saved')
+    args = parser.parse_args(argv)
+
+    tracker, timings = load_tracker(args.model, warm_up=not args.no_warm_up)
+    print(f'import: {IMPORT_SECONDS:.2f}s, model load: {timings["model_load"]:.2f}s'
+          + (f', warm-up: {timings["warm_up"]:.2f}s' if 'warm_up' in timings else ''))
+
+    metrics = None
+    if args.metrics or args.prometheus or args.profile:
+        metrics = PipelineMetrics(profile=args.profile, profile_dir=args.profile_dir)
+
+    for path in (args.output, args.report, args.frame_store, args.metrics, args.prometheus):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    start = time.perf_counter()
+    process_video(args.input, args.output, tracker,
+                  cache_dir=args.cache_dir,
+                  frame_store_path=args.frame_store,
+                  frame_store_max_bytes=int(args.frame_store_max_gb*1024**3),
+                  report_path=args.report,
+                  workers=args.workers,
+                  ball_roi=args.ball_roi,
+                  detection_stride=args.detection_stride,
+                  full_pass_imgsz=args.full_pass_imgsz,
+                  metrics=metrics)
+    print(f'processed {args.input} in {time.perf_counter() - start:.1f}s')
+
+    if metrics is not None:
+        for name, stage in metrics.to_report()['stages'].items():
+            print(f"{name:<20}{stage['wall_seconds']:>8.2f}s wall{stage['cpu_seconds']:>8.2f}s cpu"
+                  f"{stage.get('fps', 0):>9.1f} fps{stage['peak_rss_mb']:>8.0f} MB peak")
+        if args.metrics:
+            metrics.save_report(args.metrics)
+        if args.prometheus:
+            metrics.save_prometheus(args.prometheus)
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1 @@
+from .pipeline_metrics import PipelineMetrics, Histogram, NULL_METRICS
\ No newline at end of file
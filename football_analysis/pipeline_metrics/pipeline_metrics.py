@@ -0,0 +1,253 @@
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+#upper bounds in seconds of the latency histogram buckets, from half a millisecond to ten seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#one shared context for every disabled timer, so a switched off hot path costs a method call and nothing more
+_NULL_CONTEXT = nullcontext()
+
+#ru_maxrss is in kilobytes on linux and bytes on mac
+_MAXRSS_SCALE = 1 if sys.platform == 'darwin' else 1024
+
+def _peak_rss(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss*_MAXRSS_SCALE
+
+#resident memory right now, falling back to the peak where /proc isn't available
+def _current_rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return _peak_rss()
+
+#counts of observed latencies per bucket, the last count is everything above the largest bucket
+class Histogram:
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = list(buckets)
+        self.counts = [0]*(len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    #upper bound of the bucket holding quantile q, the largest value seen for the overflow bucket
+    def quantile(self, q):
+        if self.count == 0:
+            return 0.0
+        target = q*self.count
+        seen = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bucket, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum_seconds': self.sum,
+            'mean_seconds': self.sum/self.count if self.count else 0.0,
+            'p50_seconds': self.quantile(0.5),
+            'p95_seconds': self.quantile(0.95),
+            'p99_seconds': self.quantile(0.99),
+            'max_seconds': self.max,
+            'buckets': dict(zip([str(bucket) for bucket in self.buckets] + ['+Inf'], self.counts)),
+        }
+
+#wall time, cpu time, frames and memory for each stage of a run, plus latency histograms for the
+#per-frame hot paths, a disabled instance records nothing and hands back shared no-op contexts
+class PipelineMetrics:
+
+    def __init__(self, enabled=True, profile=(), profile_dir=None):
+        self.enabled = enabled
+        #stages to run under cProfile, 'all' profiles every stage
+        self.profile = set(profile or ())
+        self.profile_dir = profile_dir
+        self.stages = {}
+        self.histograms = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    #locks don't pickle, an estimator sent to a worker process takes a copy that records on its own
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    #time a stage, the yielded record takes the number of frames once it's known, e.g. record['frames'] = n
+    def stage(self, name, frames=None):
+        if not self.enabled:
+            return nullcontext({})
+        return self._stage(name, frames)
+
+    @contextmanager
+    def _stage(self, name, frames):
+        record = {'frames': frames}
+        profiler = None
+        if 'all' in self.profile or name in self.profile:
+            #cProfile only sees this thread, work handed to background threads shows up as waiting on them
+            profiler = cProfile.Profile()
+        peak_before = _peak_rss()
+        times_before = os.times()
+        wall_start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield record
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall = time.perf_counter() - wall_start
+            times_after = os.times()
+            cpu = (times_after.user - times_before.user) + (times_after.system - times_before.system)
+            #render and camera movement pools count once their processes have been joined
+            children_cpu = ((times_after.children_user - times_before.children_user)
+                            + (times_after.children_system - times_before.children_system))
+            peak_after = _peak_rss()
+            self._add_stage(name, wall, cpu, children_cpu, record.get('frames'), peak_before, peak_after)
+            if profiler is not None:
+                self._save_profile(name, profiler)
+
+    def _add_stage(self, name, wall, cpu, children_cpu, frames, peak_before, peak_after):
+        with self._lock:
+            stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                                  'children_cpu_seconds': 0.0, 'frames': 0,
+                                                  'peak_rss_mb': 0.0, 'peak_rss_increase_mb': 0.0})
+            stage['calls'] += 1
+            stage['wall_seconds'] += wall
+            stage['cpu_seconds'] += cpu
+            stage['children_cpu_seconds'] += children_cpu
+            stage['frames'] += frames or 0
+            stage['rss_mb'] = _current_rss()/1024**2
+            stage['peak_rss_mb'] = max(stage['peak_rss_mb'], peak_after/1024**2)
+            #the process high water mark only moves when a stage goes past every earlier one
+            stage['peak_rss_increase_mb'] = max(stage['peak_rss_increase_mb'], (peak_after - peak_before)/1024**2)
+            if stage['frames']:
+                stage['fps'] = stage['frames']/stage['wall_seconds'] if stage['wall_seconds'] > 0 else 0.0
+            #cpu above wall means the stage kept more than one core busy
+            stage['cpu_utilisation'] = stage['cpu_seconds']/stage['wall_seconds'] if stage['wall_seconds'] > 0 else 0.0
+
+    def _save_profile(self, name, profiler):
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(20)
+        with self._lock:
+            self.stages[name]['profile'] = stream.getvalue().splitlines()
+        if self.profile_dir is not None:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stats.dump_stats(os.path.join(self.profile_dir, f'{name}.prof'))
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    #latency of one pass of a hot path, e.g. one frame through ByteTrack
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timer(name)
+
+    @contextmanager
+    def _timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    #time each item an iterable produces, a disabled instance returns the iterable untouched
+    def timed_iter(self, name, iterable):
+        if not self.enabled:
+            return iterable
+        return self._timed_iter(name, iterable)
+
+    def _timed_iter(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(name, time.perf_counter() - start)
+            yield item
+
+    def to_report(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'wall_seconds': time.time() - self.started,
+                'peak_rss_mb': _peak_rss()/1024**2,
+                'children_peak_rss_mb': _peak_rss(resource.RUSAGE_CHILDREN)/1024**2,
+                'stages': {name: dict(stage) for name, stage in self.stages.items()},
+                'histograms': {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            }
+
+    def save_report(self, report_path):
+        with open(report_path, 'w') as f:
+            json.dump(self.to_report(), f, indent=2)
+
+    #prometheus text exposition format, for the node exporter's textfile collector or a pushgateway
+    def to_prometheus(self, prefix='football_pipeline'):
+        report = self.to_report()
+        lines = []
+        stage_metrics = (('wall_seconds', 'Wall time spent in each stage'),
+                         ('cpu_seconds', 'CPU time of this process in each stage'),
+                         ('children_cpu_seconds', 'CPU time of worker processes in each stage'),
+                         ('frames', 'Frames processed by each stage'),
+                         ('peak_rss_mb', 'Process peak resident memory at the end of each stage'))
+        for metric, help_text in stage_metrics:
+            lines += [f'# HELP {prefix}_stage_{metric} {help_text}', f'# TYPE {prefix}_stage_{metric} gauge']
+            for name, stage in report['stages'].items():
+                lines.append(f'{prefix}_stage_{metric}{{stage="{name}"}} {stage[metric]}')
+
+        lines += [f'# HELP {prefix}_latency_seconds Per-frame latency of the pipeline hot paths',
+                  f'# TYPE {prefix}_latency_seconds histogram']
+        for name, histogram in self.histograms.items():
+            cumulative = 0
+            for bucket, count in zip(histogram.buckets + ['+Inf'], histogram.counts):
+                cumulative += count
+                lines.append(f'{prefix}_latency_seconds_bucket{{op="{name}",le="{bucket}"}} {cumulative}')
+            lines.append(f'{prefix}_latency_seconds_sum{{op="{name}"}} {histogram.sum}')
+            lines.append(f'{prefix}_latency_seconds_count{{op="{name}"}} {histogram.count}')
+
+        lines += [f'# HELP {prefix}_peak_rss_mb Process peak resident memory',
+                  f'# TYPE {prefix}_peak_rss_mb gauge',
+                  f'{prefix}_peak_rss_mb {report["peak_rss_mb"]}']
+        return '\n'.join(lines) + '\n'
+
+    def save_prometheus(self, path):
+        #written whole and swapped in, a collector never reads half a file
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+#shared switched off instance, the default wherever metrics aren't asked for
+NULL_METRICS = PipelineMetrics(enabled=False)
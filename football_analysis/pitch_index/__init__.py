@@ -0,0 +1 @@
+from .pitch_index import PitchIndex
\ No newline at end of file
@@ -0,0 +1,228 @@
+import math
+import numpy as np
+
+#length along x and width along y in metres of the pitch area the ViewTransformer projects onto
+PITCH_SIZE = (23.32, 68)
+
+#every index of the ranges starts[i]..stops[i] laid end to end in one array
+def _ranges(starts, stops):
+    counts = np.maximum(stops - starts, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.repeat(starts - np.r_[0, np.cumsum(counts)[:-1]], counts) + np.arange(total)
+
+#where every tracked object was on the pitch, built in one pass once the view transformer (and team
+#assignment, if teams are wanted) has run, so each query reads only the rows it needs rather than every frame.
+#rows are bucketed into grid cells within time partitions and kept sorted by partition, cell and frame, with
+#offsets so a cell's rows in one partition are one slice. the same rows are also ordered by track and by
+#frame, for per-player and per-frame queries
+class PitchIndex:
+
+    def __init__(self, tracks, objects=('players',), pitch_size=PITCH_SIZE, cell_size=1.0, fps=24, partition_seconds=60):
+        self.objects = tuple(objects)
+        self.pitch_size = pitch_size
+        self.cell_size = cell_size
+        self.fps = fps
+        self.num_cells_x = int(math.ceil(pitch_size[0]/cell_size))
+        self.num_cells_y = int(math.ceil(pitch_size[1]/cell_size))
+        self.num_cells = self.num_cells_x*self.num_cells_y
+        self.num_frames = max(tracks[object].num_frames for object in self.objects)
+        self.partition_frames = max(1, int(round(partition_seconds*fps)))
+        self.num_partitions = max(1, int(math.ceil(self.num_frames/self.partition_frames)))
+
+        #rows of every object with a position on the pitch
+        frames, track_ids, teams, object_codes, positions = [], [], [], [], []
+        for code, object in enumerate(self.objects):
+            object_tracks = tracks[object]
+            if 'transformed_position' not in object_tracks.columns:
+                raise ValueError(f'{object} has no transformed_position, run the view transformer first')
+            position = object_tracks.columns['transformed_position']
+            on_pitch = ((position >= 0) & (position <= pitch_size)).all(axis=1)
+            frames.append(object_tracks.frame[on_pitch])
+            track_ids.append(object_tracks.track_id[on_pitch])
+            team = object_tracks.columns.get('team')
+            teams.append(team[on_pitch] if team is not None else np.full(on_pitch.sum(), -1, dtype=np.int8))
+            object_codes.append(np.full(on_pitch.sum(), code, dtype=np.int8))
+            positions.append(position[on_pitch])
+        frame = np.concatenate(frames).astype(np.int32)
+        position = np.concatenate(positions).astype(np.float64)
+        cell_x = np.minimum((position[:,0]/cell_size).astype(np.int64), self.num_cells_x - 1)
+        cell_y = np.minimum((position[:,1]/cell_size).astype(np.int64), self.num_cells_y - 1)
+        cell = cell_y*self.num_cells_x + cell_x
+        partition = (frame//self.partition_frames).astype(np.int64)
+
+        #rows in grid order, the rows of cell c in partition p are offsets[p*num_cells + c] to the next offset
+        grid_key = partition*self.num_cells + cell
+        order = np.lexsort((frame, grid_key))
+        self.frame = frame[order]
+        self.track_id = np.concatenate(track_ids).astype(np.int32)[order]
+        self.team = np.concatenate(teams).astype(np.int8)[order]
+        self.object = np.concatenate(object_codes)[order]
+        self.position = position[order]
+        self.cell = cell[order]
+        self.offsets = np.r_[0, np.cumsum(np.bincount(grid_key, minlength=self.num_partitions*self.num_cells))]
+
+        #frames spent in each cell per partition, object and team (-1 included), whole partitions of a
+        #heatmap are summed from these without touching the rows
+        self.num_team_slots = int(self.team.max()) + 2 if len(self.team) else 1
+        count_key = ((partition[order]*len(self.objects) + self.object)*self.num_team_slots + self.team + 1)*self.num_cells + self.cell
+        self._cell_counts = np.bincount(count_key, minlength=self.num_partitions*len(self.objects)*self.num_team_slots*self.num_cells)\
+            .reshape(self.num_partitions, len(self.objects), self.num_team_slots, self.num_cells)
+
+        #rows by frame, a time range is one slice
+        self._frame_order = np.argsort(self.frame, kind='stable')
+        self._frame_offsets = np.searchsorted(self.frame[self._frame_order], np.arange(self.num_frames + 1))
+
+        #rows by object and track then frame, ids are only unique within an object
+        track_key = (self.object.astype(np.int64) << 32) | self.track_id
+        self._track_order = np.lexsort((self.frame, track_key))
+        self._track_frames = self.frame[self._track_order]
+        self._track_keys, self._track_offsets = np.unique(track_key[self._track_order], return_index=True)
+        self._track_offsets = np.r_[self._track_offsets, len(self._track_order)]
+
+    @property
+    def num_rows(self):
+        return len(self.frame)
+
+    #frame number at a point of the match, e.g. index.frame_at(minutes=10)
+    def frame_at(self, minutes=0, seconds=0):
+        return int(round((minutes*60 + seconds)*self.fps))
+
+    def _frame_range(self, start_frame, stop_frame):
+        stop_frame = self.num_frames if stop_frame is None else min(stop_frame, self.num_frames)
+        return max(start_frame, 0), stop_frame
+
+    def _object_code(self, object):
+        if object not in self.objects:
+            raise ValueError(f'{object} is not in the index, it was built with objects={self.objects}')
+        return self.objects.index(object)
+
+    #rows for frames start to stop in frame order
+    def frame_rows(self, start_frame=0, stop_frame=None, team=None, object='players'):
+        start_frame, stop_frame = self._frame_range(start_frame, stop_frame)
+        if stop_frame <= start_frame:
+            return np.zeros(0, dtype=np.int64)
+        rows = self._frame_order[self._frame_offsets[start_frame]:self._frame_offsets[stop_frame]]
+        keep = self.object[rows] == self._object_code(object)
+        if team is not None:
+            keep &= self.team[rows] == team
+        return rows[keep]
+
+    #rows of one track for frames start to stop in frame order
+    def track_rows(self, track_id, start_frame=0, stop_frame=None, object='players'):
+        start_frame, stop_frame = self._frame_range(start_frame, stop_frame)
+        key = (self._object_code(object) << 32) | int(track_id)
+        i = np.searchsorted(self._track_keys, key)
+        if i == len(self._track_keys) or self._track_keys[i] != key or stop_frame <= start_frame:
+            return np.zeros(0, dtype=np.int64)
+        first, last = self._track_offsets[i], self._track_offsets[i + 1]
+        start, stop = first + np.searchsorted(self._track_frames[first:last], [start_frame, stop_frame])
+        return self._track_order[start:stop]
+
+    #rows inside zone for frames start to stop, zone is (x_min, y_min, x_max, y_max) in metres
+    def zone_rows(self, zone, start_frame=0, stop_frame=None, team=None, object='players'):
+        start_frame, stop_frame = self._frame_range(start_frame, stop_frame)
+        x_min, y_min, x_max, y_max = zone
+        object_code = self._object_code(object)
+        if stop_frame <= start_frame or x_max < x_min or y_max < y_min:
+            return np.zeros(0, dtype=np.int64)
+        cell_x = np.clip((np.array([x_min, x_max])/self.cell_size).astype(np.int64), 0, self.num_cells_x - 1)
+        cell_y = np.clip((np.array([y_min, y_max])/self.cell_size).astype(np.int64), 0, self.num_cells_y - 1)
+        partitions = np.arange(start_frame//self.partition_frames, (stop_frame - 1)//self.partition_frames + 1)
+
+        #cells wholly inside the zone, in partitions wholly inside the time range, need no checks
+        inner_x = (max(int(math.ceil(x_min/self.cell_size)), cell_x[0]), min(int(math.floor(x_max/self.cell_size)) - 1, cell_x[1]))
+        inner_y = np.arange(cell_y[0], cell_y[1] + 1)
+        inner_y = (inner_y*self.cell_size >= y_min) & ((inner_y + 1)*self.cell_size <= y_max)
+        inner_partitions = (partitions*self.partition_frames >= start_frame) & ((partitions + 1)*self.partition_frames <= stop_frame)
+        inner = inner_partitions[:,None] & inner_y[None,:] & (inner_x[0] <= inner_x[1])
+
+        #each row of cells within a partition is one slice of the index, split around the inner cells
+        row_starts = partitions[:,None]*self.num_cells + np.arange(cell_y[0], cell_y[1] + 1)[None,:]*self.num_cells_x
+        starts, stops = row_starts + cell_x[0], row_starts + cell_x[1] + 1
+        inner_starts, inner_stops = row_starts[inner] + inner_x[0], row_starts[inner] + inner_x[1] + 1
+        checked = _ranges(self.offsets[np.r_[starts[~inner], starts[inner], inner_stops]],
+                          self.offsets[np.r_[stops[~inner], inner_starts, stops[inner]]])
+        unchecked = _ranges(self.offsets[inner_starts], self.offsets[inner_stops])
+
+        #cells on the edge of the zone and partitions at the ends of the time range are only partly inside
+        position = self.position[checked]
+        frame = self.frame[checked]
+        keep = ((frame >= start_frame) & (frame < stop_frame)
+                & (position[:,0] >= x_min) & (position[:,0] <= x_max)
+                & (position[:,1] >= y_min) & (position[:,1] <= y_max))
+        rows = np.concatenate([checked[keep], unchecked])
+        keep = np.ones(len(rows), dtype=bool)
+        if len(self.objects) > 1:
+            keep &= self.object[rows] == object_code
+        if team is not None:
+            keep &= self.team[rows] == team
+        return rows[keep]
+
+    #frames each track spent inside zone, e.g. who was in the box between minute 10 and 12
+    def zone_occupancy(self, zone, start_frame=0, stop_frame=None, team=None, object='players'):
+        rows = self.zone_rows(zone, start_frame, stop_frame, team, object)
+        #track ids are small counters, counting by id beats sorting the rows
+        frames = np.bincount(self.track_id[rows])
+        track_ids = np.flatnonzero(frames)
+        return dict(zip(track_ids.tolist(), frames[track_ids].tolist()))
+
+    #frames spent in each grid cell as a (cells along y, cells along x) array, for one track, one team or everyone
+    def heatmap(self, track_id=None, team=None, start_frame=0, stop_frame=None, object='players'):
+        start_frame, stop_frame = self._frame_range(start_frame, stop_frame)
+        counts = np.zeros(self.num_cells, dtype=np.int64)
+        if track_id is not None:
+            rows = self.track_rows(track_id, start_frame, stop_frame, object)
+            if team is not None:
+                rows = rows[self.team[rows] == team]
+            counts += np.bincount(self.cell[rows], minlength=self.num_cells)
+            return counts.reshape(self.num_cells_y, self.num_cells_x)
+
+        #whole partitions come from the per-partition counts, only the frames either side are read row by row
+        first = -(-start_frame//self.partition_frames)
+        last = stop_frame//self.partition_frames
+        if first < last:
+            slots = slice(None) if team is None else slice(team + 1, team + 2)
+            counts += self._cell_counts[first:last, self._object_code(object), slots].sum(axis=(0,1))
+            edges = [(start_frame, first*self.partition_frames), (last*self.partition_frames, stop_frame)]
+        else:
+            edges = [(start_frame, stop_frame)]
+        for edge_start, edge_stop in edges:
+            rows = self.frame_rows(edge_start, edge_stop, team, object)
+            counts += np.bincount(self.cell[rows], minlength=self.num_cells)
+        return counts.reshape(self.num_cells_y, self.num_cells_x)
+
+    #shape of a team in each frame from start to stop: players on the pitch, centroid, length along x and
+    #width along y in metres, nan where the team has nobody on the pitch, and the means over the range
+    def team_shape(self, team, start_frame=0, stop_frame=None, object='players'):
+        start_frame, stop_frame = self._frame_range(start_frame, stop_frame)
+        num_frames = max(stop_frame - start_frame, 0)
+        rows = self.frame_rows(start_frame, stop_frame, team, object)
+        players = np.zeros(num_frames, dtype=np.int64)
+        centroid = np.full((num_frames,2), np.nan)
+        length = np.full(num_frames, np.nan)
+        width = np.full(num_frames, np.nan)
+        if len(rows):
+            #rows are in frame order, so each frame's players are one run
+            frames, first, counts = np.unique(self.frame[rows], return_index=True, return_counts=True)
+            position = self.position[rows]
+            low = np.minimum.reduceat(position, first)
+            high = np.maximum.reduceat(position, first)
+            frames -= start_frame
+            players[frames] = counts
+            centroid[frames] = np.add.reduceat(position, first)/counts[:,None]
+            length[frames] = high[:,0] - low[:,0]
+            width[frames] = high[:,1] - low[:,1]
+
+        seen = players > 0
+        return {
+            'frames': np.arange(start_frame, stop_frame),
+            'players': players,
+            'centroid': centroid,
+            'length': length,
+            'width': width,
+            'mean_centroid': centroid[seen].mean(axis=0) if seen.any() else np.full(2, np.nan),
+            'mean_length': float(length[seen].mean()) if seen.any() else float('nan'),
+            'mean_width': float(width[seen].mean()) if seen.any() else float('nan'),
+        }
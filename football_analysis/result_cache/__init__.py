@@ -0,0 +1 @@
+from .result_cache import ResultCache
\ No newline at end of file
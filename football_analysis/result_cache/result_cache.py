@@ -0,0 +1,136 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import threading
+import numpy as np
+
+#cache of stage results keyed by the contents of their inputs, each entry is a folder of numpy
+#columns that are memory-mapped on load rather than read into memory
+class ResultCache:
+
+    def __init__(self, cache_dir='stubs/cache', max_bytes=4*1024**3, compress=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        #entries are compressed into a single npz by default, each column is then decompressed on first
+        #access since a compressed file can't be memory-mapped. compress=False stores plain .npy columns
+        #that are memory-mapped instead, larger on disk but opened without reading them
+        self.compress = compress
+        os.makedirs(cache_dir, exist_ok=True)
+        #hashing a whole video takes a while, so digests are remembered against size and modified time
+        self._hashes_path = os.path.join(cache_dir, 'file_hashes.json')
+
+    #sha256 of a file's contents, reused while the file is unchanged
+    def hash_file(self, path, chunk_size=1<<20):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        hashes = self._read_hashes()
+        if path in hashes and hashes[path][:2] == signature:
+            return hashes[path][2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+
+        #other processes sharing the cache may have added digests since it was read, so the file is read
+        #again and updated under a lock, then replaced in one step so readers never see it half written
+        with open(f'{self._hashes_path}.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            hashes = self._read_hashes()
+            hashes[path] = signature + [digest.hexdigest()]
+            self._write_atomic(self._hashes_path, json.dumps(hashes, indent=2))
+        return digest.hexdigest()
+
+    def _read_hashes(self):
+        if not os.path.exists(self._hashes_path):
+            return {}
+        with open(self._hashes_path) as f:
+            return json.load(f)
+
+    #key for a stage run, changes whenever any input file or parameter does
+    def make_key(self, stage, files=(), **params):
+        digest = hashlib.sha256(stage.encode())
+        for path in files:
+            digest.update(self.hash_file(path).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return f'{stage}-{digest.hexdigest()[:32]}'
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    #where partial results for key are checkpointed while it is being computed, hidden from eviction
+    def checkpoint_dir(self, key):
+        return os.path.join(self.cache_dir, '.checkpoints', key)
+
+    def __contains__(self, key):
+        return os.path.isdir(self._entry_path(key))
+
+    #columns stored under key, or None when there is no entry
+    def load(self, key):
+        entry_path = self._entry_path(key)
+        if not os.path.isdir(entry_path):
+            return None
+        #mark the entry as recently used for eviction
+        os.utime(entry_path)
+
+        compressed_path = os.path.join(entry_path, 'columns.npz')
+        if os.path.exists(compressed_path):
+            return np.load(compressed_path)
+        #copy-on-write maps, later stages can modify what they are given without touching the cache
+        return {file_name[:-4]: np.load(os.path.join(entry_path, file_name), mmap_mode='c')
+                for file_name in sorted(os.listdir(entry_path)) if file_name.endswith('.npy')}
+
+    #store a dictionary of arrays under key, replacing any existing entry
+    def save(self, key, arrays, compress=None):
+        if compress is None:
+            compress = self.compress
+        entry_path = self._entry_path(key)
+        #write into a temporary folder first so a half written entry is never picked up
+        temp_path = os.path.join(self.cache_dir, f'.{key}.{os.getpid()}.{threading.get_ident()}.tmp')
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+        if compress:
+            np.savez_compressed(os.path.join(temp_path, 'columns.npz'), **arrays)
+        else:
+            for name, values in arrays.items():
+                np.save(os.path.join(temp_path, f'{name}.npy'), np.asarray(values))
+
+        shutil.rmtree(entry_path, ignore_errors=True)
+        os.replace(temp_path, entry_path)
+        self.evict(keep=key)
+
+    #remove the least recently used entries until the cache fits in max_bytes
+    def evict(self, keep=None):
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_path = self._entry_path(key)
+            if key.startswith('.') or not os.path.isdir(entry_path):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_path, file_name)) for file_name in os.listdir(entry_path))
+            entries.append((os.path.getmtime(entry_path), key, size))
+
+        total = sum(size for _, _, size in entries)
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_path(key), ignore_errors=True)
+            total -= size
+        return total
+
+    def clear(self):
+        for key in os.listdir(self.cache_dir):
+            entry_path = self._entry_path(key)
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path, ignore_errors=True)
+
+    def _write_atomic(self, path, text):
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(text)
+        os.replace(temp_path, path)
@@ -0,0 +1,261 @@
+from football_analysis.utils import measure_distance, get_foot_position
+from football_analysis.track_store import TrackStore
+from collections import deque
+import cv2
+import numpy as np
+
+class SpeedAndDistanceEstimator():
+
+    def __init__(self, frame_rate=24, frame_window=5, smoothing=None):
+        #define window to measure speed over
+        self.frame_window = frame_window
+        #frames per second of the video, pass the reader's fps so speeds are in real time
+        self.frame_rate = frame_rate
+        #average each track's position over its last `smoothing` detections before measuring, which
+        #takes the jitter of the pitch projection out of the speed, None measures the raw positions
+        self.smoothing = smoothing
+        #objects that aren't given a speed or distance
+        self.skip_objects = ('ball', 'referees')
+        self.reset()
+
+    #trailing mean of each track's last `smoothing` positions, rows are sorted by frame then track so a
+    #stable sort by track leaves each track's rows in time order, a window with a missing position is missing
+    def smooth_positions(self, track_id, positions):
+        if self.smoothing is None or self.smoothing <= 1 or len(track_id) == 0:
+            return positions
+        order = np.argsort(track_id, kind='stable')
+        sorted_ids = track_id[order]
+        sorted_positions = positions[order].astype(np.float64)
+
+        row = np.arange(len(order))
+        track_starts = np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]
+        first_row = np.maximum.accumulate(np.where(track_starts, row, 0))
+        window_first = np.maximum(row - self.smoothing + 1, first_row)
+
+        missing = np.isnan(sorted_positions).any(axis=1)
+        position_sums = np.vstack([np.zeros((1,2)), np.cumsum(np.where(missing[:,None], 0, sorted_positions), axis=0)])
+        missing_counts = np.r_[0, np.cumsum(missing)]
+        smoothed = (position_sums[row+1] - position_sums[window_first])/(row - window_first + 1)[:,None]
+        smoothed[missing_counts[row+1] - missing_counts[window_first] > 0] = np.nan
+
+        unsorted = np.empty_like(smoothed)
+        unsorted[order] = smoothed
+        return unsorted
+
+    #columnar version of the windowed speed calculation, every track of an object in one pass
+    def add_speed_and_distance_to_track_store(self, tracks):
+        for object, object_tracks in tracks.items():
+            if object in self.skip_objects:
+                continue
+            number_of_frames = object_tracks.num_frames
+            frame = object_tracks.frame
+            track_id = object_tracks.track_id
+            transformed_position = self.smooth_positions(track_id, object_tracks.column('transformed_position'))
+
+            #window starts and ends, the last window is cut short at the final frame
+            window_start = np.arange(0,number_of_frames,self.frame_window)
+            window_end = np.minimum(window_start+self.frame_window,number_of_frames-1)
+
+            #rows at the start of a window, paired with the same track at the end of it
+            start_rows = np.flatnonzero(frame % self.frame_window == 0)
+            window = frame[start_rows] // self.frame_window
+            end_rows = object_tracks.find_rows(window_end[window], track_id[start_rows])
+
+            found = (end_rows >= 0) & (window_end[window] > window_start[window])
+            start_rows, end_rows, window = start_rows[found], end_rows[found], window[found]
+            start_position = transformed_position[start_rows]
+            end_position = transformed_position[end_rows]
+            valid = ~(np.isnan(start_position).any(axis=1) | np.isnan(end_position).any(axis=1))
+            start_rows, window = start_rows[valid], window[valid]
+
+            speed = object_tracks.column('speed')
+            distance = object_tracks.column('distance')
+            if len(window) == 0:
+                continue
+
+            distance_covered = np.linalg.norm(end_position[valid] - start_position[valid], axis=1)
+            time_taken = (window_end[window]-window_start[window])/self.frame_rate
+            speed_km_h = distance_covered/time_taken*3.6
+
+            #running total per track, windows are summed in order so sort by track then window
+            window_track_id = track_id[start_rows]
+            order = np.lexsort((window, window_track_id))
+            window, window_track_id = window[order], window_track_id[order]
+            speed_km_h, distance_covered = speed_km_h[order], distance_covered[order]
+            total_distance = np.cumsum(distance_covered)
+            track_starts = np.r_[True, window_track_id[1:] != window_track_id[:-1]]
+            offsets = np.maximum.accumulate(np.where(track_starts, np.arange(len(window)), 0))
+            total_distance -= (total_distance - distance_covered)[offsets]
+
+            #every row inside a window gets that window's speed and the running distance,
+            #the windows are already sorted by track then window so their keys can be searched
+            window_keys = (window_track_id.astype(np.int64) << 32) | window.astype(np.int64)
+            row_window = frame // self.frame_window
+            in_window = frame < window_end[row_window]
+            row_keys = (track_id.astype(np.int64) << 32) | row_window.astype(np.int64)
+            match = np.minimum(np.searchsorted(window_keys, row_keys), len(window_keys)-1)
+            has_window = in_window & (window_keys[match] == row_keys)
+
+            speed[has_window] = speed_km_h[match[has_window]]
+            distance[has_window] = total_distance[match[has_window]]
+
+    def add_speed_and_distance_to_tracks(self,tracks):
+        if isinstance(tracks, TrackStore):
+            self.add_speed_and_distance_to_track_store(tracks)
+            return
+        if self.smoothing is not None and self.smoothing > 1:
+            raise ValueError('position smoothing needs the tracks as a TrackStore')
+
+        total_distance = {}
+
+        for object, object_tracks in tracks.items():
+            if object in self.skip_objects:
+                continue
+            number_of_frames = len(object_tracks)
+            for frame_num in range(0,number_of_frames,self.frame_window):
+                last_frame = min(frame_num+self.frame_window,number_of_frames-1)
+                #a window starting on the final frame has no time to measure over
+                if last_frame == frame_num:
+                    continue
+
+                #if track is in the first frame but not the last frame, we continue
+                for track_id, _ in object_tracks[frame_num].items():
+                    if track_id not in object_tracks[last_frame]:
+                        continue
+
+                    start_position = object_tracks[frame_num][track_id]['transformed_position']
+                    end_position = object_tracks[last_frame][track_id]['transformed_position']
+
+                    if start_position is None or end_position is None:
+                        continue
+                    distance_covered = measure_distance(start_position,end_position)
+                    time_taken = (last_frame-frame_num)/self.frame_rate
+                    speed_m_s = distance_covered/time_taken
+                    speed_km_h = speed_m_s*3.6
+                    if object not in total_distance:
+                        total_distance[object] = {}
+
+                    if track_id not in total_distance[object]:
+                        total_distance[object][track_id] = 0
+
+                    total_distance[object][track_id] += distance_covered
+
+                    for frame_num_batch in range(frame_num,last_frame):
+                        if track_id not in tracks[object][frame_num_batch]:
+                            continue
+                        tracks[object][frame_num_batch][track_id]['speed'] = speed_km_h
+                        tracks[object][frame_num_batch][track_id]['distance'] = total_distance[object][track_id]
+
+    #online mode, for tracks that arrive a frame at a time, gives the same speeds and distances as the
+    #whole-match calculation
+    def reset(self):
+        #per object: the open window's first frame and positions, the rows seen since, the latest frame,
+        #running distance per track and the recent positions smoothing averages over
+        self._online = {}
+
+    def _smooth_online(self, state, track_ids, positions):
+        if self.smoothing is None or self.smoothing <= 1:
+            return positions
+        smoothed = np.empty_like(positions)
+        for index, (track_id, position) in enumerate(zip(track_ids.tolist(), positions)):
+            history = state['history'].setdefault(track_id, deque(maxlen=self.smoothing))
+            history.append(position)
+            #a missing position anywhere in the window makes the average missing, as in smooth_positions
+            smoothed[index] = np.mean(history, axis=0)
+        return smoothed
+
+    #speed for the window that started at the open window's first frame and ends at end_frame, handed to
+    #every row of a track present at both ends, as (frames, track_ids, speed, distance) arrays
+    def _close_window(self, state, end_frame, end_ids, end_positions):
+        start_ids, start_positions = state['start']
+        common, start_index, end_index = np.intersect1d(start_ids, end_ids, return_indices=True)
+        distance_covered = np.linalg.norm(end_positions[end_index] - start_positions[start_index], axis=1)
+        valid = ~np.isnan(distance_covered)
+        common, distance_covered = common[valid], distance_covered[valid]
+
+        time_taken = (end_frame - state['start_frame'])/self.frame_rate
+        speed_km_h = distance_covered/time_taken*3.6
+        total_distance = np.array([state['totals'].get(track_id, 0.0) for track_id in common.tolist()]) + distance_covered
+        state['totals'].update(zip(common.tolist(), total_distance.tolist()))
+
+        frames = np.concatenate([np.full(len(ids), frame_num) for frame_num, ids in state['rows']])
+        track_ids = np.concatenate([ids for _, ids in state['rows']])
+        match = np.minimum(np.searchsorted(common, track_ids), max(len(common)-1, 0))
+        found = (common[match] == track_ids) if len(common) else np.zeros(len(track_ids), dtype=bool)
+        return frames[found], track_ids[found], speed_km_h[match[found]], total_distance[match[found]]
+
+    def _no_rows(self):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    #feed every frame in order, including frames where the object has no rows, with the pitch positions
+    #of its tracks, returns the rows whose speed and distance are now known as (frames, track_ids,
+    #speed, distance) arrays, a window's rows are settled when the frame that closes it arrives
+    def update(self, object, frame_num, track_ids, positions):
+        if object in self.skip_objects:
+            return self._no_rows()
+        state = self._online.setdefault(object, {'start_frame': None, 'start': None, 'rows': [], 'last': None,
+                                                  'totals': {}, 'history': {}})
+        track_ids = np.asarray(track_ids, dtype=np.int64).reshape(-1)
+        positions = self._smooth_online(state, track_ids, np.asarray(positions, dtype=np.float64).reshape(-1,2))
+        #intersect1d and searchsorted want the ids sorted
+        order = np.argsort(track_ids)
+        track_ids, positions = track_ids[order], positions[order]
+
+        settled = self._no_rows()
+        if frame_num % self.frame_window == 0:
+            if state['start_frame'] is not None and frame_num > state['start_frame']:
+                settled = self._close_window(state, frame_num, track_ids, positions)
+            state['start_frame'] = frame_num
+            state['start'] = (track_ids, positions)
+            state['rows'] = []
+        if state['start_frame'] is not None:
+            state['rows'].append((frame_num, track_ids))
+        state['last'] = (frame_num, track_ids, positions)
+        return settled
+
+    #end of the video, the last window is cut short at the final frame as in the whole-match calculation
+    def flush(self, object):
+        state = self._online.pop(object, None)
+        if state is None or state['start_frame'] is None or state['last'][0] <= state['start_frame']:
+            return self._no_rows()
+        last_frame, last_ids, last_positions = state['last']
+        #the final frame ends the window rather than being part of it
+        state['rows'] = [(frame_num, ids) for frame_num, ids in state['rows'] if frame_num < last_frame]
+        return self._close_window(state, last_frame, last_ids, last_positions)
+
+    def draw_speed_distance_annotations(self,video_frames,tracks):
+        output_frames = []
+        for frame_num, frame in enumerate(video_frames):
+            for object, object_tracks in tracks.items():
+                if object in self.skip_objects:
+                    continue
+                for _, track_info in object_tracks[frame_num].items():
+                    if 'speed' in track_info:
+                        speed = track_info.get('speed',None)
+                        distance = track_info.get('distance',None)
+                        if speed is None or distance is None:
+                            continue
+
+                        bbox = track_info['bbox']
+                        position = get_foot_position(bbox)
+                        position = list(position)
+                        position[1] += 60
+
+                        position = tuple(map(int,position))
+                        cv2.putText(frame,
+                                    f'{speed:.2f} Km/h',
+                                    position,
+                                    cv2.FONT_HERSHEY_SIMPLEX,
+                                    0.5,
+                                    (0,0,0),
+                                    2)
+                        cv2.putText(frame,
+                                    f'{distance:.2f} m',
+                                    (position[0],position[1]+20),
+                                    cv2.FONT_HERSHEY_SIMPLEX,
+                                    0.5,
+                                    (0,0,0),
+                                    2)
+            output_frames.append(frame)
+
+        return output_frames
\ No newline at end of file
@@ -0,0 +1,301 @@
+import numpy as np
+import cv2
+
+#2-means run on the pixels of many crops at once. pixels is every crop's pixels concatenated into one
+#(pixels, 3) buffer, crop_of gives the crop of each pixel and centres is (crops, 2, 3)
+def batched_two_means(pixels, crop_of, initial_centres, iterations=20):
+    num_crops = len(initial_centres)
+    centres = initial_centres.copy()
+    #totals per crop are fixed, so cluster 0 is whatever cluster 1 doesn't hold
+    pixel_counts = np.bincount(crop_of, minlength=num_crops)
+    pixel_sums = np.stack([np.bincount(crop_of, weights=pixels[:,channel], minlength=num_crops) for channel in range(3)],axis=1)
+
+    labels = _closer_to_second(pixels, crop_of, centres)
+    for _ in range(iterations):
+        counts = np.bincount(crop_of, weights=labels, minlength=num_crops)
+        sums = np.stack([np.bincount(crop_of, weights=pixels[:,channel]*labels, minlength=num_crops) for channel in range(3)],axis=1)
+
+        #an empty cluster keeps its previous centre
+        for cluster, cluster_counts, cluster_sums in ((0, pixel_counts-counts, pixel_sums-sums), (1, counts, sums)):
+            has_members = cluster_counts > 0
+            centres[has_members,cluster] = cluster_sums[has_members]/cluster_counts[has_members,None]
+
+        new_labels = _closer_to_second(pixels, crop_of, centres)
+        #stop once no pixel changes cluster
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    #sum of squared distances to the assigned centre, used to pick between starting points
+    assigned_centres = centres[crop_of, labels.astype(int)]
+    inertia = np.bincount(crop_of, weights=_squared_distances(pixels, assigned_centres), minlength=num_crops)
+    return labels, centres, inertia
+
+def _squared_distances(pixels, points):
+    return ((pixels - points)**2).sum(axis=1)
+
+def _closer_to_second(pixels, crop_of, centres):
+    #|x-c1|^2 < |x-c0|^2 rearranges to a dot product against a threshold, one per crop
+    direction = centres[:,1] - centres[:,0]
+    threshold = ((centres[:,1]**2).sum(axis=1) - (centres[:,0]**2).sum(axis=1))/2
+    return np.einsum('ij,ij->i', pixels, direction[crop_of]) > threshold[crop_of]
+
+#pixel of each crop furthest from a per-crop point
+def _furthest_pixel(pixels, crop_of, crop_offsets, point):
+    distances = _squared_distances(pixels, point[crop_of])
+    furthest = np.maximum.reduceat(distances, crop_offsets)
+    #first pixel of each crop reaching its maximum
+    candidates = np.flatnonzero(distances == furthest[crop_of])
+    _, first = np.unique(crop_of[candidates], return_index=True)
+    return pixels[candidates[first]]
+
+#one standard deviation along the direction each crop's colours vary most
+def _main_axis_offset(pixels, crop_of, mean_colour, pixel_counts):
+    centred = pixels - mean_colour[crop_of]
+    covariance = np.zeros((len(mean_colour),3,3))
+    for i in range(3):
+        for j in range(i,3):
+            covariance[:,i,j] = covariance[:,j,i] = np.bincount(crop_of, weights=centred[:,i]*centred[:,j],
+                                                               minlength=len(mean_colour))/pixel_counts
+    variances, axes = np.linalg.eigh(covariance)
+    return axes[:,:,-1]*np.sqrt(np.maximum(variances[:,-1:],0))
+
+#rows a python slice start:stop takes from a sequence of length, negative ends count back from the end
+def _slice_length(start, stop, length):
+    start = np.where(start < 0, np.maximum(start + length, 0), np.minimum(start, length))
+    stop = np.where(stop < 0, np.maximum(stop + length, 0), np.minimum(stop, length))
+    return np.maximum(stop - start, 0)
+
+class TeamAssigner:
+
+    def __init__(self):
+        #set up dictionary of team colours
+        self.team_colours = {}
+        #set up dictionary of which player belongs to which team
+        self.player_team_dict = {}
+
+    #function to produce our clustering model for each image
+    def get_clustering_model(self, image):
+        #reshape the image into 2d array
+        image_2d = image.reshape(-1,3)
+
+        #sklearn is slow to import, so it is only loaded once clustering is needed
+        from sklearn.cluster import KMeans
+        #instantiate KMeans model with 2 clusters: one for background and one for player
+        kmeans = KMeans(n_clusters=2,random_state=0,n_init=10,init='k-means++')
+        #fit our model to each image
+        kmeans.fit(image_2d)
+        #return our model
+        return kmeans
+
+    #function deciding on the colour of each player
+    def get_player_colour(self, frame, bbox):
+        #crop the image around each player
+        image = frame[int(bbox[1]):int(bbox[3]), int(bbox[0]):int(bbox[2])]
+        #get top half of the image
+        image_top_half = image[0:int(image.shape[0]/2)]
+
+        #provide clustering model
+        kmeans = self.get_clustering_model(image_top_half)
+
+        #pull out cluster lables for each pixel
+        cluster_labels = kmeans.labels_
+
+        #reshape to image shape
+        clustered_image = cluster_labels.reshape(image_top_half.shape[0],image_top_half.shape[1])
+
+        #pull out corner clusters
+        corner_clusters = [clustered_image[0,0],clustered_image[0,-1],clustered_image[-1,0],clustered_image[-1,-1]]
+        non_player_cluster = max(set(corner_clusters),key=corner_clusters.count)
+
+        #define the player cluster
+        player_cluster = 1-non_player_cluster
+
+        #pull out the colour of the player cluster in RGB format
+        player_colour = kmeans.cluster_centers_[player_cluster]
+
+        return player_colour
+    
+    #top half of each player crop, the same region get_player_colour clusters
+    def get_top_half_crops(self, frame, bboxes):
+        crops = []
+        for bbox in bboxes:
+            image = frame[int(bbox[1]):int(bbox[3]), int(bbox[0]):int(bbox[2])]
+            crops.append(image[0:int(image.shape[0]/2)])
+        return crops
+
+    #whether each box leaves any pixels in the top half of its crop from get_top_half_crops
+    def has_top_half(self, bboxes, frame_shape):
+        bboxes = np.trunc(np.asarray(bboxes, dtype=np.float64).reshape(-1,4))
+        height = _slice_length(bboxes[:,1], bboxes[:,3], frame_shape[0])
+        width = _slice_length(bboxes[:,0], bboxes[:,2], frame_shape[1])
+        return (width > 0) & (height >= 2)
+
+    #jersey colour of many crops in one go, crops can come from one frame or a window of frames.
+    #sample_size optionally resizes every crop to (height, width) first to cut the pixel count.
+    #a crop without pixels, from a box under two pixels tall or off the frame, has no colour and gets nan
+    def get_player_colours(self, crops, sample_size=None):
+        has_pixels = np.array([crop.size > 0 for crop in crops], dtype=bool)
+        if not has_pixels.all():
+            player_colours = np.full((len(crops),3), np.nan)
+            player_colours[has_pixels] = self.get_player_colours([crop for crop in crops if crop.size > 0], sample_size)
+            return player_colours
+        if len(crops) == 0:
+            return np.zeros((0,3))
+
+        if sample_size is not None:
+            crops = [cv2.resize(crop,(sample_size[1],sample_size[0]),interpolation=cv2.INTER_NEAREST) for crop in crops]
+        heights = np.array([crop.shape[0] for crop in crops])
+        widths = np.array([crop.shape[1] for crop in crops])
+
+        #every crop's pixels in one buffer, crop_offsets is where each crop starts
+        pixel_counts = heights*widths
+        crop_offsets = np.r_[0, np.cumsum(pixel_counts)[:-1]]
+        pixels = np.concatenate([crop.reshape(-1,3) for crop in crops]).astype(np.float64)
+        crop_of = np.repeat(np.arange(len(crops)), pixel_counts)
+
+        #index of the four corners of each crop
+        corners = crop_offsets[:,None] + np.stack([np.zeros_like(widths),
+                                                   widths-1,
+                                                   (heights-1)*widths,
+                                                   heights*widths-1],axis=1)
+
+        #several starting points, like n_init in sklearn the one with the lower inertia is kept for each crop:
+        #the corner colour and the pixel furthest from it, the two pixels furthest apart from the mean,
+        #and either side of the mean along each crop's main colour axis
+        corner_start = pixels[corners].mean(axis=1)
+        mean_colour = np.stack([np.bincount(crop_of, weights=pixels[:,channel]) for channel in range(3)],axis=1)/pixel_counts[:,None]
+        spread_start = _furthest_pixel(pixels, crop_of, crop_offsets, mean_colour)
+        axis_offset = _main_axis_offset(pixels, crop_of, mean_colour, pixel_counts)
+        starts = [np.stack([corner_start,_furthest_pixel(pixels, crop_of, crop_offsets, corner_start)],axis=1),
+                  np.stack([_furthest_pixel(pixels, crop_of, crop_offsets, spread_start),spread_start],axis=1),
+                  np.stack([mean_colour-axis_offset,mean_colour+axis_offset],axis=1)]
+
+        labels, centres, inertia = batched_two_means(pixels,crop_of,starts[0])
+        for start in starts[1:]:
+            start_labels, start_centres, start_inertia = batched_two_means(pixels,crop_of,start)
+            better = start_inertia < inertia
+            centres[better], inertia[better] = start_centres[better], start_inertia[better]
+            better_pixels = better[crop_of]
+            labels[better_pixels] = start_labels[better_pixels]
+
+        #the cluster holding most of the corners is the background, ties go to cluster 0 as before
+        corner_labels = labels[corners]
+        non_player_cluster = (corner_labels.sum(axis=1) > 2).astype(int)
+        player_cluster = 1-non_player_cluster
+        return centres[np.arange(len(crops)),player_cluster]
+
+    #function to assign team colours based on player colours
+    def assign_team_colour(self, frame, player_detections, batched=True):
+        bboxes = [player_detection['bbox'] for player_detection in player_detections.values()]
+        if batched:
+            #every player crop of the frame clustered in one call
+            player_colours = self.get_player_colours(self.get_top_half_crops(frame, bboxes))
+        else:
+            #one clustering model per player
+            player_colours = [self.get_player_colour(frame, bbox) for bbox in bboxes]
+
+        from sklearn.cluster import KMeans
+        #instantiate KMeans model to split player colours into 2 clusters
+        kmeans = KMeans(n_clusters=2,random_state=0,n_init=10,init='k-means++')
+        #fit the model to our player colours
+        kmeans.fit(player_colours)
+
+        #save this kmeans model to refer back to it later
+        self.kmeans = kmeans
+
+        #assign team colours within initial dictionary to cluster colours
+        self.team_colours[0] = kmeans.cluster_centers_[0]
+        self.team_colours[1] = kmeans.cluster_centers_[1]
+
+    
+    #function to assign players to each team
+    def get_player_team(self, frame, player_bbox, player_id):
+
+        #if the player is already within the dictionary, return the corresponding team
+        if player_id in self.player_team_dict:
+            return self.player_team_dict[player_id]
+        
+        #if not in dictionary, get the player colour
+        player_colour = self.get_player_colour(frame, player_bbox)
+
+        #set the team id to the prediction of the kmeans model
+        team_id = self.kmeans.predict(player_colour.reshape(1,-1))[0]
+        
+        #hardcode goalkeeper of white team to be white
+        if player_id == 91:
+            team_id = 1
+
+        #save this team id and player id combo to the player team dictionary
+        self.player_team_dict[player_id] = team_id
+
+        return team_id
+
+    #teams for several players of a frame, new players are coloured and predicted in one batch
+    def get_player_teams(self, frame, player_bboxes, player_ids):
+        new_players = [(bbox, player_id) for bbox, player_id in zip(player_bboxes, player_ids)
+                       if player_id not in self.player_team_dict]
+        player_colours = self.get_player_colours(self.get_top_half_crops(frame, [bbox for bbox, _ in new_players]))
+        #players without a colour are tried again on a later frame
+        has_colour = ~np.isnan(player_colours).any(axis=1)
+        new_players = [new_player for new_player, coloured in zip(new_players, has_colour) if coloured]
+        if new_players:
+            team_ids = self.kmeans.predict(player_colours[has_colour])
+            for (_, player_id), team_id in zip(new_players, team_ids):
+                #hardcode goalkeeper of white team to be white
+                if player_id == 91:
+                    team_id = 1
+                self.player_team_dict[player_id] = team_id
+        return [self.player_team_dict.get(player_id, -1) for player_id in player_ids]
+
+    #team for every player row of a track store, each track is coloured once on the first frame it has a crop
+    #to colour, and crops are gathered over windows of frames so clustering runs in a few large batches.
+    #tracks that never have one keep team -1
+    def add_team_to_track_store(self, tracks, frames, window=250, checkpoint=None):
+        #carry on from the last committed window with the same team model, ids already coloured are skipped
+        resumed = checkpoint.resume('teams') if checkpoint is not None else None
+        if resumed is not None:
+            windows, state, _ = resumed
+            for window_teams in windows:
+                self.player_team_dict.update(window_teams)
+            self.kmeans = state['kmeans']
+            self.team_colours = state['team_colours']
+
+        player_tracks = tracks['players']
+        track_ids = np.unique(player_tracks.track_id)
+        bboxes = player_tracks.column('bbox')
+        if player_tracks.num_rows == 0:
+            tracks.set_team_colours(self.team_colours)
+            return
+        #rows are sorted by frame, so np.unique's first index per id among the rows with a crop is the first
+        #frame that track can be coloured on
+        colourable = np.flatnonzero(self.has_top_half(bboxes, frames[0].shape))
+        _, first_rows = np.unique(player_tracks.track_id[colourable], return_index=True)
+        first_rows = np.sort(colourable[first_rows])
+        first_rows = first_rows[[int(player_tracks.track_id[row]) not in self.player_team_dict for row in first_rows]]
+
+        for window_start in range(0, len(first_rows), window):
+            window_rows = first_rows[window_start:window_start+window]
+            #each frame is read once for all of its rows
+            window_frames = player_tracks.frame[window_rows]
+            crops = []
+            for frame_rows in np.split(window_rows, np.flatnonzero(np.diff(window_frames)) + 1):
+                crops += self.get_top_half_crops(frames[int(player_tracks.frame[frame_rows[0]])], bboxes[frame_rows])
+            team_ids = self.kmeans.predict(self.get_player_colours(crops))
+            window_teams = {}
+            for row, team_id in zip(window_rows, team_ids):
+                player_id = int(player_tracks.track_id[row])
+                #hardcode goalkeeper of white team to be white
+                if player_id == 91:
+                    team_id = 1
+                window_teams[player_id] = team_id
+            self.player_team_dict.update(window_teams)
+
+            if checkpoint is not None:
+                end = int(player_tracks.frame[window_rows[-1]]) + 1
+                checkpoint.commit('teams', end, window_teams, {'kmeans': self.kmeans, 'team_colours': self.team_colours})
+
+        #spread each track's team over all of its rows
+        teams = np.array([self.player_team_dict.get(int(track_id), -1) for track_id in track_ids])
+        player_tracks.set_column('team', teams[np.searchsorted(track_ids, player_tracks.track_id)])
+        tracks.set_team_colours(self.team_colours)
\ No newline at end of file
@@ -0,0 +1,308 @@
+from collections.abc import Mapping
+import numpy as np
+
+#per-row columns: dtype, shape of each entry and the fill value for rows that haven't been set
+COLUMNS = {
+    'bbox': (np.float32, (4,), np.nan),
+    'position': (np.float32, (2,), np.nan),
+    'position_adjusted': (np.float32, (2,), np.nan),
+    'transformed_position': (np.float64, (2,), np.nan),
+    'speed': (np.float64, (), np.nan),
+    'distance': (np.float64, (), np.nan),
+    'team': (np.int8, (), -1),
+    'has_ball': (np.bool_, (), False),
+}
+
+#read-only view of one frame, looks like the old {track_id: {'bbox':...}} dictionary
+class FrameTracks(Mapping):
+
+    def __init__(self, object_tracks, frame_num):
+        self.object_tracks = object_tracks
+        self.rows = object_tracks.frame_rows(frame_num)
+
+    def __getitem__(self, track_id):
+        row = self.object_tracks.find_row(self.rows, track_id)
+        if row < 0:
+            raise KeyError(track_id)
+        return self.object_tracks.row_dict(row)
+
+    def __iter__(self):
+        for track_id in self.object_tracks.track_id[self.rows]:
+            yield int(track_id)
+
+    def __len__(self):
+        return self.rows.stop - self.rows.start
+
+#every detection of one object type stored as rows sorted by frame then track id
+class ObjectTracks:
+
+    def __init__(self, num_frames, frame, track_id, bbox):
+        self.num_frames = num_frames
+
+        frame = np.asarray(frame, dtype=np.int32)
+        track_id = np.asarray(track_id, dtype=np.int32)
+        order = np.lexsort((track_id, frame))
+
+        self.frame = frame[order]
+        self.track_id = track_id[order]
+        #row offsets of each frame, rows of frame f are frame_offsets[f]:frame_offsets[f+1]
+        self.frame_offsets = np.searchsorted(self.frame, np.arange(num_frames + 1)).astype(np.int64)
+        self._keys = None
+
+        self.columns = {}
+        self.set_column('bbox', np.asarray(bbox, dtype=np.float32).reshape(-1,4)[order])
+        #team colours are shared with the owning store so views can fill in 'team_colour'
+        self.team_colours = {}
+
+    @property
+    def num_rows(self):
+        return len(self.frame)
+
+    #columns are allocated on first use so untouched stages cost nothing
+    def column(self, name):
+        if name not in self.columns:
+            dtype, shape, fill = COLUMNS[name]
+            self.columns[name] = np.full((self.num_rows,) + shape, fill, dtype=dtype)
+        return self.columns[name]
+
+    def set_column(self, name, values):
+        dtype, shape, _ = COLUMNS[name]
+        values = np.asarray(values, dtype=dtype)
+        if values.shape != (self.num_rows,) + shape:
+            raise ValueError(f'Column {name} expects shape {(self.num_rows,) + shape}, got {values.shape}')
+        self.columns[name] = values
+
+    def frame_rows(self, frame_num):
+        return slice(int(self.frame_offsets[frame_num]), int(self.frame_offsets[frame_num+1]))
+
+    #row holding track_id within a frame's rows, -1 if the track isn't in that frame
+    def find_row(self, rows, track_id):
+        row = rows.start + int(np.searchsorted(self.track_id[rows], track_id))
+        if row < rows.stop and self.track_id[row] == track_id:
+            return row
+        return -1
+
+    #vectorised lookup of (frame, track_id) pairs, -1 where a pair isn't present
+    def find_rows(self, frames, track_ids):
+        query = (np.asarray(frames, dtype=np.int64) << 32) | np.asarray(track_ids, dtype=np.int64)
+        if self.num_rows == 0:
+            return np.full(query.shape, -1, dtype=np.int64)
+        keys = self._row_keys()
+        rows = np.minimum(np.searchsorted(keys, query), self.num_rows - 1)
+        return np.where(keys[rows] == query, rows, -1)
+
+    def _row_keys(self):
+        #track ids are non-negative, so packing frame into the high bits keeps the row order
+        if self._keys is None:
+            self._keys = (self.frame.astype(np.int64) << 32) | self.track_id.astype(np.int64)
+        return self._keys
+
+    #build the old style dictionary for a single row, only including what has been computed
+    def row_dict(self, row):
+        track_info = {'bbox': self.columns['bbox'][row].tolist()}
+        if 'position' in self.columns:
+            track_info['position'] = tuple(self.columns['position'][row].tolist())
+        if 'position_adjusted' in self.columns:
+            track_info['position_adjusted'] = tuple(self.columns['position_adjusted'][row].tolist())
+        if 'transformed_position' in self.columns:
+            transformed_position = self.columns['transformed_position'][row]
+            track_info['transformed_position'] = None if np.isnan(transformed_position[0]) else transformed_position.tolist()
+        if 'speed' in self.columns and not np.isnan(self.columns['speed'][row]):
+            track_info['speed'] = float(self.columns['speed'][row])
+            track_info['distance'] = float(self.column('distance')[row])
+        if 'team' in self.columns and self.columns['team'][row] >= 0:
+            team = int(self.columns['team'][row])
+            track_info['team'] = team
+            if team in self.team_colours:
+                track_info['team_colour'] = self.team_colours[team]
+        if 'has_ball' in self.columns and self.columns['has_ball'][row]:
+            track_info['has_ball'] = True
+        return track_info
+
+    #copy of the rows for frames start to stop, renumbered so frame start becomes frame 0
+    def select_frames(self, start, stop):
+        rows = slice(int(self.frame_offsets[start]), int(self.frame_offsets[stop]))
+        selected = ObjectTracks(stop - start, self.frame[rows] - start, self.track_id[rows], self.columns['bbox'][rows])
+        for name, values in self.columns.items():
+            if name != 'bbox':
+                selected.set_column(name, values[rows])
+        selected.team_colours = self.team_colours
+        return selected
+
+    #compatibility with tracks[object][frame_num][track_id]
+    def __len__(self):
+        return self.num_frames
+
+    def __getitem__(self, frame_num):
+        if frame_num < 0:
+            frame_num += self.num_frames
+        if frame_num < 0 or frame_num >= self.num_frames:
+            raise IndexError(frame_num)
+        return FrameTracks(self, frame_num)
+
+    def __iter__(self):
+        for frame_num in range(self.num_frames):
+            yield FrameTracks(self, frame_num)
+
+    def to_dicts(self):
+        return [dict(frame_tracks.items()) for frame_tracks in self]
+
+    #rows that are already sorted by frame then track id, e.g. memory-mapped from the result cache,
+    #are used as they are rather than being sorted and copied
+    @classmethod
+    def from_sorted(cls, num_frames, frame, track_id, columns):
+        object_store = cls.__new__(cls)
+        object_store.num_frames = num_frames
+        object_store.frame = frame
+        object_store.track_id = track_id
+        object_store.frame_offsets = np.searchsorted(frame, np.arange(num_frames + 1)).astype(np.int64)
+        object_store._keys = None
+        object_store.columns = {}
+        for name, values in columns.items():
+            object_store.set_column(name, values)
+        object_store.team_colours = {}
+        return object_store
+
+    @classmethod
+    def from_dicts(cls, object_tracks):
+        frames, track_ids, bboxes = [], [], []
+        for frame_num, track in enumerate(object_tracks):
+            for track_id, track_info in track.items():
+                frames.append(frame_num)
+                track_ids.append(track_id)
+                bboxes.append(track_info['bbox'])
+        object_store = cls(len(object_tracks), frames, track_ids, np.array(bboxes, dtype=np.float32).reshape(-1,4))
+
+        #carry over anything the old stages already added
+        for name in COLUMNS:
+            if name == 'bbox':
+                continue
+            values = [track_info.get(name) for track in object_tracks for track_info in track.values()]
+            if not any(value is not None for value in values):
+                continue
+            column = object_store.column(name)
+            rows = object_store.find_rows(frames, track_ids)
+            for row, value in zip(rows, values):
+                if value is not None:
+                    column[row] = value
+        return object_store
+
+#rows of each object gathered a frame at a time as arrays, so detections go straight into columns
+#without a dictionary per object on the way
+class TrackRows:
+
+    def __init__(self, objects=('players', 'referees', 'ball')):
+        self.objects = objects
+        self._reset()
+
+    def _reset(self):
+        self._counts = {object: [] for object in self.objects}
+        self._track_ids = {object: [] for object in self.objects}
+        self._bboxes = {object: [] for object in self.objects}
+        self._frames = []
+
+    def add_frame(self, frame_num):
+        self._frames.append(frame_num)
+        for object in self.objects:
+            self._counts[object].append(0)
+
+    #rows for the frame last added
+    def add(self, object, track_ids, bboxes):
+        self._counts[object][-1] = len(track_ids)
+        self._track_ids[object].append(track_ids)
+        self._bboxes[object].append(bboxes)
+
+    #rows added since the last pack as {object: (frame, track_id, bbox)} arrays, small enough to checkpoint
+    def pack(self):
+        frames = np.asarray(self._frames, dtype=np.int32)
+        packed = {}
+        for object in self.objects:
+            track_ids = self._track_ids[object]
+            packed[object] = (np.repeat(frames, self._counts[object]),
+                              np.concatenate(track_ids).astype(np.int32) if track_ids else np.zeros(0, dtype=np.int32),
+                              np.concatenate(self._bboxes[object]).astype(np.float32).reshape(-1,4) if track_ids
+                              else np.zeros((0,4), dtype=np.float32))
+        self._reset()
+        return packed
+
+    #store from chunks packed earlier, e.g. resumed from a checkpoint, followed by the rows not packed yet
+    def to_store(self, num_frames, chunks=()):
+        chunks = list(chunks) + [self.pack()]
+        track_store = TrackStore(num_frames)
+        for object in self.objects:
+            frame, track_id, bbox = (np.concatenate([chunk[object][i] for chunk in chunks]) for i in range(3))
+            track_store[object] = ObjectTracks(num_frames, frame, track_id, bbox)
+        return track_store
+
+#columnar replacement for the tracks dictionary, indexed by object name like the old structure
+class TrackStore:
+
+    def __init__(self, num_frames, objects=None):
+        self.num_frames = num_frames
+        self.objects = {}
+        self.team_colours = {}
+        for object, object_tracks in (objects or {}).items():
+            self[object] = object_tracks
+
+    def __getitem__(self, object):
+        return self.objects[object]
+
+    def __setitem__(self, object, object_tracks):
+        #accept the old list of dictionaries as well as a columnar ObjectTracks
+        if not isinstance(object_tracks, ObjectTracks):
+            object_tracks = ObjectTracks.from_dicts(object_tracks)
+        object_tracks.team_colours = self.team_colours
+        self.objects[object] = object_tracks
+
+    def __contains__(self, object):
+        return object in self.objects
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def keys(self):
+        return self.objects.keys()
+
+    def items(self):
+        return self.objects.items()
+
+    def set_team_colours(self, team_colours):
+        #update in place, every ObjectTracks holds a reference to this dictionary
+        self.team_colours.clear()
+        self.team_colours.update(team_colours)
+
+    #store holding only frames start to stop renumbered from 0, small enough to hand to a worker process
+    def select_frames(self, start, stop):
+        selected = TrackStore(stop - start)
+        selected.set_team_colours(self.team_colours)
+        for object, object_tracks in self.items():
+            selected[object] = object_tracks.select_frames(start, stop)
+        return selected
+
+    #flat dictionary of arrays, 'players.frame', 'players.bbox' and so on, for saving to the result cache
+    def to_arrays(self):
+        arrays = {'num_frames': np.array(self.num_frames), 'objects': np.array(list(self.keys()))}
+        for object, object_tracks in self.items():
+            arrays[f'{object}.frame'] = object_tracks.frame
+            arrays[f'{object}.track_id'] = object_tracks.track_id
+            for name, values in object_tracks.columns.items():
+                arrays[f'{object}.{name}'] = values
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        num_frames = int(arrays['num_frames'])
+        track_store = cls(num_frames)
+        #objects keep the order they were saved in
+        for object in arrays['objects'].tolist():
+            columns = {name: arrays[f'{object}.{name}'] for name in COLUMNS if f'{object}.{name}' in arrays}
+            track_store[object] = ObjectTracks.from_sorted(num_frames, arrays[f'{object}.frame'], arrays[f'{object}.track_id'], columns)
+        return track_store
+
+    def to_tracks(self):
+        return {object: object_tracks.to_dicts() for object, object_tracks in self.items()}
+
+    @classmethod
+    def from_tracks(cls, tracks):
+        num_frames = max(len(object_tracks) for object_tracks in tracks.values())
+        return cls(num_frames, tracks)
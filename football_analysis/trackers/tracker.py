@@ -0,0 +1,583 @@
+#ultralytics and supervision take seconds to import, so they are imported inside the methods that
+#use them rather than here, importing this module stays cheap
+#import pickle for saving
+import pickle
+#import os to check the path
+import os
+import time
+import cv2
+import numpy as np
+
+from football_analysis.utils import get_box_centre, get_box_width, get_foot_position, background_iter
+from football_analysis.track_store import TrackStore, ObjectTracks, TrackRows
+from football_analysis.ball_possession import PossessionStats
+from football_analysis.box_propagator import BoxPropagator
+from football_analysis.checkpoint import Checkpoint
+from football_analysis.ball_gap_filler import BallGapFiller
+from football_analysis.ball_roi_tracker import BallRoiTracker
+from football_analysis.pipeline_metrics import NULL_METRICS
+
+#model input size of the full-frame pass when the ball is followed on crops, players and referees are
+#big enough to be found at this size once the pass no longer has to find the ball
+BALL_ROI_FULL_PASS_IMGSZ = 480
+
+#create new tracker class
+class Tracker:
+    def __init__(self, model_path, batch_size=20, prefetch=2):
+        #import for model
+        from ultralytics import YOLO
+
+        #model set up on initiation
+        self.model_path = model_path
+        self.model = YOLO(model_path)
+        #frames per inference call, and how many batches decoding and inference may run ahead
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        #latency histograms for inference and ByteTrack, switched off unless a run hands in its own
+        self.metrics = NULL_METRICS
+        #class ids of the model, worked out from the first detection
+        self._class_map = None
+        #tracker set up on instantiation
+        self.reset()
+
+    #fresh ByteTrack state, so the next video's track ids start from 1 again. the id counter is shared by
+    #every tracker in the process, so a process tracks one video at a time, the worker service and batch
+    #scheduler give each clip running at once its own process
+    def reset(self):
+        #import for tracking purposes
+        import supervision as sv
+        #ByteTrack numbers new tracks from a counter shared by every tracker
+        from supervision.tracker.byte_tracker.basetrack import BaseTrack
+
+        self.tracker = sv.ByteTrack()
+        BaseTrack._count = 0
+
+    #run the model once on a blank frame so the first real batch doesn't pay for initialisation,
+    #returns how long it took
+    def warm_up(self, frame_shape=(1080,1920,3)):
+        start = time.perf_counter()
+        self.model.predict(np.zeros(frame_shape, dtype=np.uint8), conf=0.1, verbose=False)
+        return time.perf_counter() - start
+    #add position to tracks
+    def add_position_to_tracks(self, tracks):
+        #columnar store, one pass over every row of each object
+        if isinstance(tracks, TrackStore):
+            for object, object_tracks in tracks.items():
+                bbox = object_tracks.column('bbox').astype(np.float64)
+                x_centre = np.trunc((bbox[:,0] + bbox[:,2])/2)
+                if object == 'ball':
+                    y = np.trunc((bbox[:,1] + bbox[:,3])/2)
+                else:
+                    y = np.trunc(bbox[:,3])
+                object_tracks.set_column('position', np.stack([x_centre,y],axis=1))
+            return
+
+        for object, object_tracks in tracks.items():
+            for frame_num, track in enumerate(object_tracks):
+                for track_id, track_info in track.items():
+                    bbox = track_info['bbox']
+                    if object == 'ball':
+                        position = get_box_centre(bbox)
+                    else:
+                        position = get_foot_position(bbox)
+                    tracks[object][frame_num][track_id]['position'] = position
+    #employ interpolation to fill in missing ball positions, max_speed drops detections that would
+    #need the ball to move further than that many pixels per frame
+    def interpolate_ball_position(self, ball_positions, max_speed=None):
+        ball_gap_filler = BallGapFiller(max_speed=max_speed)
+
+        #columnar ball tracks are interpolated and returned in the same format
+        if isinstance(ball_positions, ObjectTracks):
+            ball_bboxes = np.full((ball_positions.num_frames,4), np.nan)
+            ball_rows = ball_positions.track_id == 1
+            ball_bboxes[ball_positions.frame[ball_rows]] = ball_positions.column('bbox')[ball_rows]
+            num_frames = ball_positions.num_frames
+            return ObjectTracks(num_frames, np.arange(num_frames), np.ones(num_frames), ball_gap_filler.fill(ball_bboxes))
+
+        #one row per frame, missing frames left as NaN for the filler
+        missing = [np.nan]*4
+        ball_bboxes = np.array([x[1]['bbox'] if 1 in x else missing for x in ball_positions], dtype=np.float64).reshape(-1,4)
+
+        #fill in missing values with linear interpolation, holding the first and last detections at the edges
+        ball_positions = [{1:{'bbox':x}} for x in ball_gap_filler.fill(ball_bboxes).tolist()]
+
+        return ball_positions
+
+    #detect frames from our video files
+    def detect_frames(self, frames, batch_size=None):
+        return list(self.iter_detections(frames, batch_size))
+
+    #split the frames into batches, readers decode one chunk at a time rather than the whole video
+    def iter_frame_batches(self, frames, batch_size, start=0):
+        if hasattr(frames, 'iter_chunks'):
+            for _, chunk in frames.iter_chunks(batch_size, start=start):
+                #touch the pixels here so memory-mapped frames are paged in ahead of inference
+                yield [np.ascontiguousarray(frame) for frame in chunk]
+            return
+        for i in range(start,len(frames),batch_size):
+            yield frames[i:i+batch_size]
+
+    #pipelined detection, decoding the next batch and running inference both happen on background
+    #threads while the caller tracks the detections already returned
+    def iter_detections(self, frames, batch_size=None, start=0, imgsz=640):
+        if batch_size is None:
+            batch_size = self.batch_size
+        batches = background_iter(self.iter_frame_batches(frames, batch_size, start), self.prefetch)
+        #predicting from the model, will be treating goalkeepers as normal players for this
+        #so can't directly track yet as we want to overwrite or intial tracking data to remove
+        #goalkeepers
+        detection_batches = background_iter((self.predict_batch(batch, imgsz) for batch in batches), self.prefetch)
+        for detections_batch in detection_batches:
+            yield from detections_batch
+
+    #one inference call on a batch of frames
+    def predict_batch(self, batch, imgsz=640):
+        with self.metrics.timer('detect_batch'):
+            return self.model.predict(batch,conf=0.1,imgsz=imgsz)
+
+    #most confident ball box the model finds in one image, in that image's coordinates, or None
+    #imgsz is the size the image is scaled to, a crop run at its own size isn't shrunk at all
+    def detect_ball(self, image, imgsz=640, conf=0.1):
+        with self.metrics.timer('detect_ball'):
+            detection = self.model.predict(image, conf=conf, imgsz=imgsz, verbose=False)[0]
+        class_names_inverse = {v:k for k,v in detection.names.items()}
+        boxes = detection.boxes
+        ball = boxes.cls.cpu().numpy().astype(int) == class_names_inverse['ball']
+        if not ball.any():
+            return None
+        confidence = boxes.conf.cpu().numpy()[ball]
+        return boxes.xyxy.cpu().numpy()[ball][np.argmax(confidence)]
+
+    #ball tracks from detections on a crop around where the ball's trajectory says it will be, the
+    #full frame is only searched once it has been lost, fallback_tracks are ball tracks from a full-frame
+    #pass at fallback_imgsz that has already run, reused whenever the crop misses rather than searching
+    #again and counted in the model pixels
+    def get_ball_tracks_roi(self, frames, fallback_tracks=None, fallback_imgsz=640, **roi_settings):
+        roi_tracker = BallRoiTracker(shared_full_pass=fallback_tracks is not None, shared_pass_imgsz=fallback_imgsz,
+                                     **roi_settings)
+        fallback_bboxes = None
+        if fallback_tracks is not None:
+            fallback_bboxes = np.full((len(frames),4), np.nan)
+            fallback_rows = fallback_tracks.track_id == 1
+            fallback_bboxes[fallback_tracks.frame[fallback_rows]] = fallback_tracks.column('bbox')[fallback_rows]
+
+        ball_frames = []
+        ball_bboxes = []
+        for frame_num, frame in enumerate(background_iter(iter(frames), self.prefetch)):
+            fallback_bbox = None
+            if fallback_bboxes is not None and not np.isnan(fallback_bboxes[frame_num,0]):
+                fallback_bbox = fallback_bboxes[frame_num]
+            bbox = roi_tracker.search(frame, frame_num, self.detect_ball, fallback_bbox)
+            if bbox is not None:
+                ball_frames.append(frame_num)
+                ball_bboxes.append(bbox)
+
+        #searches, hits and model pixels against running the whole frame through the model every frame
+        self.ball_roi_stats = dict(roi_tracker.stats, pixel_ratio=roi_tracker.pixel_ratio())
+        return ObjectTracks(len(frames), ball_frames, np.ones(len(ball_frames)), np.reshape(ball_bboxes, (-1,4)))
+
+    #function to draw an ellipse around the players
+    def draw_ellipse(self, frame, bbox, colour, track_id=None):
+        #set the position of the box
+        y2 = int(bbox[3])
+
+        #define centre and width, denote y-centre as wildcard to cover parsing issue
+        x_centre, _ = get_box_centre(bbox)
+        width = get_box_width(bbox)
+
+        #draw an ellipse around the players to mark them
+        cv2.ellipse(
+            frame,
+            center=(x_centre,y2),
+            axes=(int(width),int(0.35*width)),
+            angle=0.0,
+            startAngle=-20,
+            endAngle=240,
+            color=colour,
+            thickness=3,
+            lineType=cv2.LINE_4
+        )
+        
+        #draw a shape for the tracking number of each player to be displayed
+        #set height and width of rectangle
+        rect_height = 20
+        rect_width = 35
+        #set coordinates for rectangle to sit at
+        x1_rect = x_centre - rect_width//2 
+        x2_rect = x_centre + rect_width//2
+        y1_rect = (y2 - rect_height//2) + 30
+        y2_rect = (y2 + rect_height//2) + 30
+
+        #if a track_id is present, draw the rectangle to hold the track id
+        if track_id is not None:
+            cv2.rectangle(
+                frame,
+                (int(x1_rect),int(y1_rect)),
+                (int(x2_rect),int(y2_rect)),
+                colour,
+                cv2.FILLED
+            )
+            
+            #set up where the track id text should sit
+            x1_text = x1_rect + 7
+            if track_id > 99:
+                x1_text -= 10
+
+            #write in track id to the rectangle
+            cv2.putText(frame,
+                        f"{track_id}",
+                        (int(x1_text),int(y2_rect-3)),
+                        cv2.FONT_HERSHEY_SIMPLEX,
+                        fontScale=0.6,
+                        color=(0,0,0),
+                        thickness=2)
+        
+        return frame
+    
+    #function to draw a triangle above the ball
+    def draw_triangle(self, frame, bbox, colour):
+        y = int(bbox[1])
+        x, _ = get_box_centre(bbox)
+
+        triangle_points = np.array([[x,y],
+                                   [x-10,y-15],
+                                   [x+10,y-15]])
+        
+        #draw the triangle
+        cv2.drawContours(frame,[triangle_points],0,colour,cv2.FILLED)
+        #draw the outline of the triangle
+        cv2.drawContours(frame,[triangle_points],0,(0,0,0),2)
+
+        return frame
+    #function to draw team possession stats
+    def draw_team_possession(self, frame, frame_num, team_possession):
+        #draw rectangle to fill with possession stats
+        overlay = frame.copy()
+        cv2.rectangle(overlay,
+                     (1350,850),
+                     (1900,970),
+                     (255,255,255),
+                     cv2.FILLED)
+        #transparency level of rectangle
+        alpha = 0.4
+        #add to the frame
+        cv2.addWeighted(overlay,alpha,frame,1-alpha,0,frame)
+
+        #running counts up to this frame, looked up rather than recounted from the start
+        if not isinstance(team_possession, PossessionStats):
+            team_possession = PossessionStats.from_frames(team_possession)
+        possession_percentages = team_possession.possession_percentages(frame_num)
+        team_1_possession = possession_percentages[1]
+        team_2_possession = possession_percentages[0]
+
+        #write this out within frame
+        cv2.putText(frame,
+                    f'Team 1 Possession: {team_1_possession:.2f}%',
+                    (1400,900),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=1,
+                    color=(0,0,0),
+                    thickness=3)
+        cv2.putText(frame,
+                    f'Team 2 Possession: {team_2_possession:.2f}%',
+                    (1400,950),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    fontScale=1,
+                    color=(0,0,0),
+                    thickness=3)
+        
+        return frame
+    #class ids by name, and a lookup array that turns goalkeepers into players, built once per model
+    #rather than for every frame
+    def get_class_map(self, class_names):
+        if self._class_map is None or self._class_map[0] != class_names:
+            class_names_inverse = {v:k for k,v in class_names.items()}
+            class_remap = np.arange(max(class_names) + 1)
+            class_remap[class_names_inverse['goalkeeper']] = class_names_inverse['player']
+            self._class_map = (dict(class_names), class_names_inverse, class_remap)
+        return self._class_map[1], self._class_map[2]
+
+    #convert one frame's model output to supervision format, with goalkeepers counted as players
+    def convert_detection(self, detection):
+        import supervision as sv
+
+        class_names_inverse, class_remap = self.get_class_map(detection.names)
+
+        #convert this detection to supervision detection format
+        detection_supervision = sv.Detections.from_ultralytics(detection)
+
+        #convert goalkeepers to players
+        detection_supervision.class_id = class_remap[detection_supervision.class_id]
+
+        return detection_supervision, class_names_inverse
+
+    #run ByteTrack on one frame's detections and add the results to the tracks dictionary
+    def add_detections_to_tracks(self, tracks, frame_num, detection_supervision, class_names_inverse):
+        #Track objects
+        with self.metrics.timer('bytetrack_update'):
+            detections_with_tracks = self.tracker.update_with_detections(detection_supervision)
+
+        #add dictionary within each entry of the tracks dictionary, will contain track_id:bounding box
+        #pair for each frame
+        tracks['players'].append({})
+        tracks['referees'].append({})
+        tracks['ball'].append({})
+        
+        #loop through tracked frames, extract each class, track and bbox and add track id and bbox
+        #if class information is correct
+        for frame_detection in detections_with_tracks:
+            bbox = frame_detection[0].tolist()
+            class_id = frame_detection[3]
+            track_id = frame_detection[4]
+
+            if class_id == class_names_inverse['player']:
+                tracks['players'][frame_num][track_id] = {'bbox':bbox}
+
+            if class_id == class_names_inverse['referee']:
+                tracks['referees'][frame_num][track_id] = {'bbox':bbox}
+        
+        for frame_detection in detection_supervision:
+            bbox = frame_detection[0].tolist()
+            class_id = frame_detection[3]
+
+            if class_id == class_names_inverse['ball']:
+                tracks['ball'][frame_num][1] = {'bbox':bbox}
+
+    #run ByteTrack on one frame's detections and add each class's rows, picked out with array masks
+    def add_detections_to_rows(self, rows, frame_num, detection_supervision, class_names_inverse):
+        with self.metrics.timer('bytetrack_update'):
+            detections_with_tracks = self.tracker.update_with_detections(detection_supervision)
+
+        rows.add_frame(frame_num)
+        tracked_class_id = detections_with_tracks.class_id
+        for object, class_name in (('players','player'), ('referees','referee')):
+            mask = tracked_class_id == class_names_inverse[class_name]
+            rows.add(object, detections_with_tracks.tracker_id[mask], detections_with_tracks.xyxy[mask])
+
+        #the ball isn't tracked, it always has track id 1 and the last ball detected in a frame is kept
+        ball = np.flatnonzero(detection_supervision.class_id == class_names_inverse['ball'])[-1:]
+        rows.add('ball', np.ones(len(ball), dtype=np.int32), detection_supervision.xyxy[ball])
+
+    #detect and track every frame into a TrackStore, written column by column as frames are tracked
+    def track_frames(self, frames, checkpoint=None, checkpoint_every=500, imgsz=640):
+        #ByteTrack numbers new tracks from a counter shared by every tracker, so checkpoints save it too
+        from supervision.tracker.byte_tracker.basetrack import BaseTrack
+
+        #pick up after the last committed chunk, with ByteTrack exactly as it was at that point
+        start = 0
+        chunks = []
+        resumed = checkpoint.resume('track_rows') if checkpoint is not None else None
+        if resumed is not None:
+            chunks, state, start = resumed
+            self.tracker = state['tracker']
+            BaseTrack._count = state['track_count']
+
+        #detections arrive batch by batch while later frames are still being decoded and detected
+        detections = self.iter_detections(frames, start=start, imgsz=imgsz)
+
+        rows = TrackRows()
+        num_frames = chunk_start = start
+        for frame_num, detection in enumerate(detections, start):
+            detection_supervision, class_names_inverse = self.convert_detection(detection)
+            self.add_detections_to_rows(rows, frame_num, detection_supervision, class_names_inverse)
+            num_frames = frame_num + 1
+
+            #commit the frames since the last checkpoint together with the tracker state after them
+            if checkpoint is not None and num_frames - chunk_start == checkpoint_every:
+                chunk = rows.pack()
+                checkpoint.commit('track_rows', num_frames, chunk, {'tracker': self.tracker, 'track_count': BaseTrack._count})
+                chunks.append(chunk)
+                chunk_start = num_frames
+
+        return rows.to_store(num_frames, chunks)
+
+    #function to retrieve object tracks, either from existing stub or by running the code
+    def get_object_tracks(self, frames, read_from_stub=False, stub_path=None, checkpoint=None, checkpoint_every=500):
+        #if we specify pathway that exists, load tracks and then return it without running rest of code
+        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
+            with open(stub_path,'rb') as f:
+                tracks = pickle.load(f)
+            return tracks
+
+        #tracks are built as columns and turned into the dictionary format once at the end
+        tracks = self.track_frames(frames, checkpoint, checkpoint_every).to_tracks()
+
+        if stub_path is not None:
+            with open(stub_path,'wb') as f:
+                pickle.dump(tracks,f)
+        #returning a list of dictionaries, frame number, tracking id and bounding box for player
+        #referee and ball 
+        return tracks
+    #tracks as a TrackStore, reused from the result cache when the video, model weights and
+    #settings all match a previous run
+    #ball_roi follows the ball with get_ball_tracks_roi on top of the full-frame pass, which still runs
+    #for the players and referees but at full_pass_imgsz, so the crops and the smaller pass together push
+    #fewer pixels through the model than the pass at 640 alone
+    #detection_stride above 1 detects every detection_stride frames with track_frames_adaptive and moves
+    #the boxes with optical flow in between
+    def get_track_store(self, frames, cache=None, video_path=None, ball_roi=False, detection_stride=1,
+                        min_confidence=0.6, max_pan=8, full_pass_imgsz=None):
+        if video_path is None:
+            video_path = getattr(frames, 'video_path', None)
+        adaptive = detection_stride > 1
+        if full_pass_imgsz is None:
+            full_pass_imgsz = BALL_ROI_FULL_PASS_IMGSZ if ball_roi else 640
+        key = None
+        if cache is not None and video_path is not None:
+            #left out when off so tracks cached before the options existed are still found
+            settings = {'ball_roi': True} if ball_roi else {}
+            if full_pass_imgsz != 640:
+                settings['imgsz'] = full_pass_imgsz
+            if adaptive:
+                settings['adaptive'] = {'stride': detection_stride, 'min_confidence': min_confidence, 'max_pan': max_pan}
+            key = cache.make_key('tracks', [video_path, self.model_path], conf=0.1, tracker='ByteTrack', version=1, **settings)
+            arrays = cache.load(key)
+            if arrays is not None:
+                return TrackStore.from_arrays(arrays)
+
+        #an interrupted run carries on from its last checkpoint
+        checkpoint = Checkpoint(cache.checkpoint_dir(key)) if key is not None else None
+        if adaptive:
+            tracks = self.track_frames_adaptive(frames, detection_stride, min_confidence, max_pan, imgsz=full_pass_imgsz,
+                                                checkpoint=checkpoint)
+        else:
+            tracks = self.track_frames(frames, checkpoint=checkpoint, imgsz=full_pass_imgsz)
+        if ball_roi:
+            tracks['ball'] = self.get_ball_tracks_roi(frames, fallback_tracks=tracks['ball'], fallback_imgsz=full_pass_imgsz)
+        if key is not None:
+            cache.save(key, tracks.to_arrays())
+        if checkpoint is not None:
+            checkpoint.clear('adaptive_rows' if adaptive else 'track_rows')
+        return tracks
+
+    #run detection every stride frames and move the boxes with optical flow in between, detecting
+    #early whenever the camera pans quickly or the flow stops tracking the boxes reliably
+    def get_object_tracks_adaptive(self, frames, stride=3, min_confidence=0.6, max_pan=8,
+                                   read_from_stub=False, stub_path=None, checkpoint=None, checkpoint_every=500):
+        if read_from_stub and stub_path is not None and os.path.exists(stub_path):
+            with open(stub_path,'rb') as f:
+                tracks = pickle.load(f)
+            return tracks
+
+        tracks = self.track_frames_adaptive(frames, stride, min_confidence, max_pan,
+                                            checkpoint=checkpoint, checkpoint_every=checkpoint_every).to_tracks()
+
+        if stub_path is not None:
+            with open(stub_path,'wb') as f:
+                pickle.dump(tracks,f)
+        return tracks
+
+    #the adaptive pass behind get_object_tracks_adaptive, tracked into a TrackStore as track_frames does
+    #and checkpointed the same way, with the last detection and the frame it's propagated from saved
+    #alongside ByteTrack so a resumed run makes the same choices as an uninterrupted one
+    def track_frames_adaptive(self, frames, stride=3, min_confidence=0.6, max_pan=8, imgsz=640,
+                              checkpoint=None, checkpoint_every=500):
+        import supervision as sv
+        from supervision.tracker.byte_tracker.basetrack import BaseTrack
+
+        rows = TrackRows()
+        propagator = BoxPropagator()
+        #how many frames were detected, propagated, and detected early because propagation wasn't trusted
+        self.adaptive_stats = {'detected_frames':0, 'propagated_frames':0, 'fallback_frames':0}
+
+        last_detection = None
+        class_names_inverse = None
+        old_grey = None
+        frames_since_detection = 0
+        start = 0
+        chunks = []
+        resumed = checkpoint.resume('adaptive_rows') if checkpoint is not None else None
+        if resumed is not None:
+            chunks, state, start = resumed
+            self.tracker = state['tracker']
+            BaseTrack._count = state['track_count']
+            self.adaptive_stats = state['adaptive_stats']
+            last_detection, class_names_inverse, old_grey, frames_since_detection = state['propagation']
+
+        if hasattr(frames, 'iter_frames'):
+            frame_iter = frames.iter_frames(start)
+        else:
+            frame_iter = (frames[frame_num] for frame_num in range(start, len(frames)))
+        num_frames = chunk_start = start
+        for frame_num, frame in enumerate(background_iter(frame_iter, self.prefetch), start):
+            frame_grey = cv2.cvtColor(frame,cv2.COLOR_BGR2GRAY)
+
+            detect = last_detection is None or frames_since_detection + 1 >= stride or len(last_detection) == 0
+            if not detect:
+                boxes, confidence, pan = propagator.propagate(old_grey, frame_grey, last_detection.xyxy)
+                #the ball is too small to track reliably, so only the people decide whether to trust the flow
+                people = last_detection.class_id != class_names_inverse['ball']
+                frame_confidence = confidence[people].mean() if people.any() else 0
+                if pan > max_pan or frame_confidence < min_confidence:
+                    detect = True
+                    self.adaptive_stats['fallback_frames'] += 1
+
+            if detect:
+                detection = self.predict_batch(frame, imgsz)[0]
+                detection_supervision, class_names_inverse = self.convert_detection(detection)
+                frames_since_detection = 0
+                self.adaptive_stats['detected_frames'] += 1
+            else:
+                detection_supervision = sv.Detections(xyxy=boxes,
+                                                      confidence=last_detection.confidence,
+                                                      class_id=last_detection.class_id)
+                frames_since_detection += 1
+                self.adaptive_stats['propagated_frames'] += 1
+
+            self.add_detections_to_rows(rows, frame_num, detection_supervision, class_names_inverse)
+            last_detection = detection_supervision
+            old_grey = frame_grey
+            num_frames = frame_num + 1
+
+            #commit the frames since the last checkpoint together with everything the next frame depends on
+            if checkpoint is not None and num_frames - chunk_start == checkpoint_every:
+                chunk = rows.pack()
+                checkpoint.commit('adaptive_rows', num_frames, chunk,
+                                  {'tracker': self.tracker, 'track_count': BaseTrack._count,
+                                   'adaptive_stats': dict(self.adaptive_stats),
+                                   'propagation': (last_detection, class_names_inverse, old_grey, frames_since_detection)})
+                chunks.append(chunk)
+                chunk_start = num_frames
+
+        return rows.to_store(num_frames, chunks)
+    #annotate the frames, using the drawing functions defined above
+    def draw_annotations(self,video_frames,tracks, team_possession):
+        #empty list to hold output frames once annotated
+        output_video_frames = []
+        #build the running possession counts once for the whole video
+        if not isinstance(team_possession, PossessionStats):
+            team_possession = PossessionStats.from_frames(team_possession)
+        #loop over index and frame in supplied video
+        for frame_num, frame in enumerate(video_frames):
+            #copy video frames, so we don't affect the original
+            frame = frame.copy()
+
+            #set up our dictionaries for players, ball, referees positions
+            player_dict = tracks['players'][frame_num]
+            ball_dict = tracks['ball'][frame_num]
+            referee_dict = tracks['referees'][frame_num]
+
+            #draw annotations around players
+            for track_id, player in player_dict.items():
+                colour = player.get('team_colour',(255,0,255))
+                frame = self.draw_ellipse(frame, player['bbox'],colour,track_id)
+
+                #if player is near the ball, denote this with triangle
+                if player.get('has_ball',False):
+                    frame = self.draw_triangle(frame, player['bbox'],(255,249,125))
+
+            #draw annotations around referees, no track id as we only want this for players
+            for _, referee in referee_dict.items():
+                frame = self.draw_ellipse(frame, referee['bbox'],(0,255,255))
+
+            #draw annotations for the ball
+            for _, ball in ball_dict.items():
+                frame = self.draw_triangle(frame, ball['bbox'],(0,0,255))
+
+            #draw team possession annotation
+            frame = self.draw_team_possession(frame, frame_num, team_possession)
+
+            #append resulting frames to output video and then return it
+            output_video_frames.append(frame)
+
+        return output_video_frames
\ No newline at end of file
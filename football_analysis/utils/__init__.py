@@ -0,0 +1,3 @@
+from .video_utils import read_video, save_video, save_video_segments, VideoReader, VideoWriter
+from .bbox_utils import get_box_centre, get_box_width, measure_distance, measure_xy_distance, get_foot_position
+from .pipeline_utils import background_iter
\ No newline at end of file
@@ -0,0 +1,51 @@
+import queue
+import threading
+
+#marks the end of the items, or carries an exception raised by the producer
+class _Done:
+    def __init__(self, error=None):
+        self.error = error
+
+#run an iterable on a background thread, items are handed over through a bounded queue so the
+#producer works at most queue_size items ahead of whoever is consuming them
+def background_iter(iterable, queue_size=2):
+    items = queue.Queue(maxsize=queue_size)
+    stopped = threading.Event()
+
+    def put(item):
+        #give up if the consumer has gone away rather than blocking on a full queue forever
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_Done(e))
+            return
+        finally:
+            #shut down any stage feeding this one as soon as we stop pulling from it
+            if hasattr(iterable, 'close'):
+                iterable.close()
+        put(_Done())
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = items.get()
+            if isinstance(item, _Done):
+                if item.error is not None:
+                    raise item.error
+                return
+            yield item
+    finally:
+        stopped.set()
+        thread.join()
@@ -0,0 +1,316 @@
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+
+#define a function to read in our video files and add each frame to a list
+def read_video(video_path):
+    #capture the video using opencv
+    cap = cv2.VideoCapture(video_path)
+    #empty list for frames to be added to
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        #add frames
+        frames.append(frame)
+    #return frames
+    return frames
+
+#random access reader over a video file, frames are decoded on demand rather than held in a list
+class VideoReader:
+
+    def __init__(self, video_path, frame_store_path=None, frame_store_max_bytes=None):
+        self.video_path = video_path
+        self.frame_store_path = None
+
+        #read the video properties once up front
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise IOError(f'Could not open video: {video_path}')
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 24
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+
+        #capture handle and position used for sequential reads, opened lazily
+        self._capture = None
+        self._next_index = 0
+        #memory-mapped decoded frames, shared between every stage and worker process
+        self._frame_store = None
+
+        #a decoded 1080p frame is about 6MB, so a store past the budget isn't built and frames are decoded on demand
+        if frame_store_path is not None and (frame_store_max_bytes is None or self.frame_store_bytes() <= frame_store_max_bytes):
+            self.build_frame_store(frame_store_path)
+
+    def frame_store_bytes(self):
+        return self.frame_count*self.height*self.width*3
+
+    #decode the whole video once into a single memory-mapped file
+    def build_frame_store(self, frame_store_path):
+        store = np.lib.format.open_memmap(frame_store_path,
+                                          mode='w+',
+                                          dtype=np.uint8,
+                                          shape=(self.frame_count,self.height,self.width,3))
+        cap = cv2.VideoCapture(self.video_path)
+        frame_num = 0
+        #the reported frame count can be an estimate, so stop at whichever runs out first
+        while frame_num < self.frame_count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            store[frame_num] = frame
+            frame_num += 1
+        cap.release()
+        store.flush()
+        del store
+
+        self.frame_count = frame_num
+        self.frame_store_path = frame_store_path
+        self._frame_store = None
+
+    #open the frame store read-only, each process maps the same file rather than copying it
+    def _get_frame_store(self):
+        if self._frame_store is None and self.frame_store_path is not None:
+            self._frame_store = np.load(self.frame_store_path, mmap_mode='r')
+        return self._frame_store
+
+    def _read_frame(self, index):
+        #seek only when the read isn't the next frame in sequence
+        if self._capture is None:
+            self._capture = cv2.VideoCapture(self.video_path)
+            self._next_index = 0
+        if index != self._next_index:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        ret, frame = self._capture.read()
+        if not ret:
+            raise IndexError(f'Could not read frame {index} from {self.video_path}')
+        self._next_index = index + 1
+        return frame
+
+    def __len__(self):
+        return self.frame_count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.read_frames(*index.indices(self.frame_count))
+        if index < 0:
+            index += self.frame_count
+        if index < 0 or index >= self.frame_count:
+            raise IndexError(f'Frame {index} out of range for {self.frame_count} frames')
+
+        frame_store = self._get_frame_store()
+        if frame_store is not None:
+            return frame_store[index]
+        return self._read_frame(index)
+
+    def __iter__(self):
+        return self.iter_frames()
+
+    #read a range of frames with an optional stride
+    def read_frames(self, start=0, stop=None, step=1):
+        return list(self.iter_frames(start, stop, step))
+
+    def iter_frames(self, start=0, stop=None, step=1):
+        if stop is None or stop > self.frame_count:
+            stop = self.frame_count
+
+        frame_store = self._get_frame_store()
+        if frame_store is not None:
+            for frame_num in range(start, stop, step):
+                yield frame_store[frame_num]
+            return
+
+        #decode sequentially with a private capture so iterating doesn't disturb random access reads
+        cap = cv2.VideoCapture(self.video_path)
+        if start > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        frame_num = start
+        while frame_num < stop:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+            #grab skips frames without decoding them when a stride is used
+            for _ in range(step - 1):
+                cap.grab()
+            frame_num += step
+        cap.release()
+
+    #iterate in fixed size chunks, yielding the index of the first frame alongside the chunk
+    def iter_chunks(self, chunk_size, start=0, stop=None, step=1):
+        if stop is None or stop > self.frame_count:
+            stop = self.frame_count
+
+        frame_store = self._get_frame_store()
+        if frame_store is not None:
+            for chunk_start in range(start, stop, chunk_size*step):
+                chunk_stop = min(chunk_start + chunk_size*step, stop)
+                yield chunk_start, frame_store[chunk_start:chunk_stop:step]
+            return
+
+        chunk = []
+        chunk_start = start
+        for frame_num, frame in zip(range(start, stop, step), self.iter_frames(start, stop, step)):
+            if not chunk:
+                chunk_start = frame_num
+            chunk.append(frame)
+            if len(chunk) == chunk_size:
+                yield chunk_start, chunk
+                chunk = []
+        if chunk:
+            yield chunk_start, chunk
+
+    def close(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+        self._frame_store = None
+
+    #capture handles and memory maps can't be pickled, worker processes reopen them from the paths
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_capture'] = None
+        state['_next_index'] = 0
+        state['_frame_store'] = None
+        return state
+
+#video writer that encodes on a background thread, frames are handed over through a bounded queue
+class VideoWriter:
+
+    def __init__(self, output_video_path, fps=24, fourcc='XVID', queue_size=64):
+        self.output_video_path = output_video_path
+        self.fps = fps
+        self.fourcc = fourcc
+        #bounded so a fast producer blocks rather than buffering the whole video in memory
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
+
+    def _encode(self, frame_size):
+        out = None
+        try:
+            out = cv2.VideoWriter(self.output_video_path,
+                                  cv2.VideoWriter_fourcc(*self.fourcc),
+                                  self.fps,
+                                  frame_size)
+        except Exception as e:
+            self._error = e
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            #keep draining after a failure so the producer never blocks on a full queue
+            if self._error is not None:
+                continue
+            try:
+                out.write(frame)
+            except Exception as e:
+                self._error = e
+        if out is not None:
+            out.release()
+
+    #hand an item to the encoding thread, giving up if the thread has died and will never take it
+    def _put(self, item):
+        while True:
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                if not self._thread.is_alive():
+                    if self._error is None:
+                        self._error = RuntimeError('Video encoding thread stopped')
+                    return False
+
+    #queue a frame for encoding, the frame shouldn't be modified after it has been written
+    def write(self, frame):
+        if self._error is not None:
+            raise self._error
+        #the output size is taken from the first frame
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._encode,
+                                            args=((frame.shape[1],frame.shape[0]),),
+                                            daemon=True)
+            self._thread.start()
+        if not self._put(frame):
+            raise self._error
+
+    #wait for the queue to drain and finish the file
+    def close(self):
+        if self._thread is not None:
+            self._put(None)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+#encode one segment of a random access frame source, run inside a worker process
+def _encode_segment(frames, start, stop, segment_path, fps, fourcc):
+    out = None
+    for frame_num in range(start, stop):
+        frame = frames[frame_num]
+        if out is None:
+            out = cv2.VideoWriter(segment_path,
+                                  cv2.VideoWriter_fourcc(*fourcc),
+                                  fps,
+                                  (frame.shape[1],frame.shape[0]))
+        out.write(frame)
+    if out is not None:
+        out.release()
+    return segment_path
+
+#encode independent segments in a process pool and join them into one output without re-encoding
+def save_video_segments(frames, output_video_path, fps=24, workers=None, segment_size=500, fourcc='XVID'):
+    #segments are joined with ffmpeg's stream copy, without it there is nothing to gain over a serial encode
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        save_video(frames, output_video_path, fps=fps, fourcc=fourcc)
+        return
+
+    extension = os.path.splitext(output_video_path)[1]
+    with tempfile.TemporaryDirectory() as segment_dir:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for segment_num, start in enumerate(range(0, len(frames), segment_size)):
+                stop = min(start + segment_size, len(frames))
+                segment_path = os.path.join(segment_dir, f'segment_{segment_num:05d}{extension}')
+                #lists are sliced so each worker only receives its own frames, readers are passed whole
+                if isinstance(frames, list):
+                    futures.append(executor.submit(_encode_segment, frames[start:stop], 0, stop - start,
+                                                   segment_path, fps, fourcc))
+                else:
+                    futures.append(executor.submit(_encode_segment, frames, start, stop,
+                                                   segment_path, fps, fourcc))
+            segment_paths = [future.result() for future in futures]
+
+        #list the segments in order for the concat demuxer
+        list_path = os.path.join(segment_dir, 'segments.txt')
+        with open(list_path, 'w') as f:
+            for segment_path in segment_paths:
+                f.write(f"file '{segment_path}'\n")
+
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error',
+                        '-f', 'concat', '-safe', '0',
+                        '-i', list_path,
+                        '-c', 'copy',
+                        output_video_path],
+                       check=True)
+
+def save_video(output_video_frames,output_video_path,fps=24,fourcc='XVID'):
+    #frames can be any iterable, encoding overlaps with whatever is producing them
+    with VideoWriter(output_video_path, fps=fps, fourcc=fourcc) as out:
+        for frame in output_video_frames:
+            out.write(frame)
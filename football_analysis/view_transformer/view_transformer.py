@@ -0,0 +1,137 @@
+import numpy as np
+import cv2
+from football_analysis.track_store import TrackStore
+
+class ViewTransformer():
+
+    def __init__(self):
+        #width of football pitch
+        pitch_w = 68
+        #length of segment of football pitch
+        pitch_l = 23.32
+
+        #provide the position of the points that map with this section of the pitch
+        self.pixel_verticies = np.array([
+            [110,1035],
+            [265,275],
+            [910,260],
+            [1640,915]
+        ])
+
+        #provide the target corners of the size of the pitch that the trapezoid corresponds to
+        self.target_verticies = np.array([
+            [0,pitch_w],
+            [0,0],
+            [pitch_l,0],
+            [pitch_l,pitch_w]
+        ])
+
+        #per-frame camera compensation matrices and their composition with the pitch projection
+        self.camera_matrices = None
+        self.frame_homographies = None
+
+        self.set_calibration(self.pixel_verticies,self.target_verticies)
+
+    #set the pitch calibration, camera matrices are kept so only the composition is redone
+    def set_calibration(self, pixel_verticies, target_verticies):
+        #cast each set of corners as floats
+        self.pixel_verticies = np.asarray(pixel_verticies).astype(np.float32)
+        self.target_verticies = np.asarray(target_verticies).astype(np.float32)
+
+        #transform the image into the desired measurements
+        self.perpective_transformer = cv2.getPerspectiveTransform(self.pixel_verticies,self.target_verticies)
+        self.frame_homographies = None
+
+    #turn the per-frame camera movement into translation matrices that undo it
+    def set_camera_movement(self, camera_movement_per_frame):
+        camera_movement_per_frame = np.asarray(camera_movement_per_frame, dtype=np.float64).reshape(-1,2)
+        camera_matrices = np.tile(np.eye(3), (len(camera_movement_per_frame),1,1))
+        camera_matrices[:,0,2] = -camera_movement_per_frame[:,0]
+        camera_matrices[:,1,2] = -camera_movement_per_frame[:,1]
+        self.camera_matrices = camera_matrices
+        self.frame_homographies = None
+
+    #one pixel-to-pitch matrix per frame, cached until the calibration or camera movement changes
+    def get_frame_homographies(self):
+        if self.frame_homographies is None:
+            self.frame_homographies = np.matmul(self.perpective_transformer, self.camera_matrices)
+        return self.frame_homographies
+
+    #transform the points based on transformer
+    def transform_point(self,point):
+        p  = (int(point[0]),int(point[1]))
+        is_inside = cv2.pointPolygonTest(self.pixel_verticies,p,False) >= 0
+        if not is_inside:
+            return None
+        reshaped_point = point.reshape(-1,1,2).astype(np.float32)
+        transform_point = cv2.perspectiveTransform(reshaped_point,self.perpective_transformer)
+
+        return transform_point.reshape(-1,2)
+
+    #vectorised version of the inside test, points on the edge count as inside like pointPolygonTest
+    def points_inside(self, points):
+        #the test is done on whole pixel coordinates, matching the int cast in transform_point
+        points = np.trunc(points)
+        vertices = self.pixel_verticies.astype(np.float64)
+        edges = np.roll(vertices, -1, axis=0) - vertices
+        #cross product of each edge with the vector to the point, the pitch quadrilateral is convex
+        cross = (edges[:,0][None,:]*(points[:,1][:,None] - vertices[:,1][None,:]) -
+                 edges[:,1][None,:]*(points[:,0][:,None] - vertices[:,0][None,:]))
+        return np.all(cross >= 0, axis=1) | np.all(cross <= 0, axis=1)
+
+    #transform every point at once, rows outside the pitch section come back as nan
+    def transform_points(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1,2)
+        transformed_points = np.full(points.shape, np.nan)
+        valid = ~np.isnan(points).any(axis=1)
+        inside = np.zeros(len(points), dtype=bool)
+        inside[valid] = self.points_inside(points[valid])
+        if inside.any():
+            reshaped_points = points[inside].reshape(-1,1,2).astype(np.float32)
+            transformed_points[inside] = cv2.perspectiveTransform(reshaped_points,
+                                                                  self.perpective_transformer).reshape(-1,2)
+        return transformed_points
+
+    #project raw pixel points from any frames with the fused per-frame matrices,
+    #returns the camera adjusted points alongside the pitch positions
+    def project_points(self, points, frame_nums):
+        points = np.asarray(points, dtype=np.float64).reshape(-1,2)
+        frame_nums = np.asarray(frame_nums, dtype=np.int64)
+
+        #the inside test is still done in camera adjusted pixels, which is only a translation
+        adjusted_points = points + self.camera_matrices[frame_nums,:2,2]
+        transformed_points = np.full(points.shape, np.nan)
+        valid = ~np.isnan(points).any(axis=1)
+        inside = np.zeros(len(points), dtype=bool)
+        inside[valid] = self.points_inside(adjusted_points[valid])
+
+        homographies = self.get_frame_homographies()[frame_nums[inside]]
+        homogeneous_points = np.einsum('nij,nj->ni', homographies,
+                                       np.column_stack([points[inside], np.ones(inside.sum())]))
+        transformed_points[inside] = homogeneous_points[:,:2]/homogeneous_points[:,2:]
+        return adjusted_points, transformed_points
+
+    #add this transformed position to the tracks dictionary
+    def add_transformed_position_to_tracks(self, tracks):
+        #columnar store, every row of an object is transformed in a single call
+        if isinstance(tracks, TrackStore):
+            for object, object_tracks in tracks.items():
+                #with camera movement set, project straight from the raw positions
+                if self.camera_matrices is not None:
+                    adjusted_position, transformed_position = self.project_points(object_tracks.column('position'),
+                                                                                  object_tracks.frame)
+                    object_tracks.set_column('position_adjusted', adjusted_position)
+                else:
+                    transformed_position = self.transform_points(object_tracks.column('position_adjusted'))
+                object_tracks.set_column('transformed_position', transformed_position)
+            return
+
+        for object, object_tracks in tracks.items():
+            for frame_num, track in enumerate(object_tracks):
+                for track_id, track_info in track.items():
+                    position = track_info['position_adjusted']
+                    position = np.array(position)
+                    transformed_position = self.transform_point(position)
+                    if transformed_position is not None:
+                        transformed_position = transformed_position.squeeze().tolist()
+                    tracks[object][frame_num][track_id]['transformed_position'] = transformed_position
@@ -0,0 +1 @@
+from .worker_service import AnalysisWorker
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .worker_service import main
+if __name__ == '__main__':
+    raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,358 @@
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import traceback
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from football_analysis.main import load_tracker, process_video
+from football_analysis import DEFAULT_MODEL_PATH
+
+STATES = ('incoming', 'processing', 'done', 'failed')
+
+#long running service that keeps the detection model loaded and works through clips dropped into a
+#spool folder, so each clip only pays for its own processing rather than for starting python and
+#loading the model again
+class AnalysisWorker:
+
+    def __init__(self, spool_dir='spool', model_path=DEFAULT_MODEL_PATH, concurrency=1, cache_dir='stubs/cache',
+                 render_workers=None, poll_interval=1.0, warm_up=True, frame_stores=False):
+        self.spool_dir = spool_dir
+        self.model_path = model_path
+        #clips processed at once, each in its own process with its own tracker, ByteTrack numbers tracks from
+        #a counter shared by the whole process so two clips can't be tracked side by side in one
+        self.concurrency = concurrency
+        self.cache_dir = cache_dir
+        #render processes per clip, the cores are shared out between the clips running at once
+        self.render_workers = render_workers if render_workers is not None else max(1, (os.cpu_count() or 1)//concurrency)
+        self.poll_interval = poll_interval
+        self.warm_up = warm_up
+        #decode each clip into a memory-mapped file first, costs disk for the length of the clip
+        self.frame_stores = frame_stores
+
+        for state in STATES + ('status', 'outputs', 'frame_stores'):
+            os.makedirs(os.path.join(spool_dir, state), exist_ok=True)
+
+        #settings a slot process builds its own worker from
+        self._settings = {'spool_dir': spool_dir, 'model_path': model_path, 'concurrency': concurrency,
+                          'cache_dir': cache_dir, 'render_workers': self.render_workers,
+                          'poll_interval': poll_interval, 'warm_up': warm_up, 'frame_stores': frame_stores}
+        #set by the service, seen by every slot process
+        self._stop = multiprocessing.Event()
+        self._processes = []
+        self._server = None
+
+    def _path(self, state, job_id):
+        return os.path.join(self.spool_dir, state, f'{job_id}.json')
+
+    def _write_atomic(self, path, value):
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(value, f, indent=2)
+        os.replace(temp_path, path)
+
+    #add a clip to the queue, outputs default to the spool's outputs folder
+    def submit(self, input_path, output_path=None, report_path=None):
+        job_id = f'{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}'
+        outputs_dir = os.path.join(self.spool_dir, 'outputs')
+        job = {
+            'job_id': job_id,
+            'input': os.path.abspath(input_path),
+            'output': os.path.abspath(output_path or os.path.join(outputs_dir, f'{job_id}.avi')),
+            'report': os.path.abspath(report_path or os.path.join(outputs_dir, f'{job_id}_possession.json')),
+            'submitted': time.time(),
+        }
+        self._set_status(job, 'queued')
+        #the job file is what workers pick up, so it goes last
+        self._write_atomic(self._path('incoming', job_id), job)
+        return job_id
+
+    def _set_status(self, job, state, **details):
+        status = dict(job, state=state, updated=time.time(), **details)
+        self._write_atomic(self._path('status', job['job_id']), status)
+        return status
+
+    def status(self, job_id):
+        path = self._path('status', job_id)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    #number of job files in each folder
+    def counts(self):
+        return {state: sum(file_name.endswith('.json') for file_name in os.listdir(os.path.join(self.spool_dir, state)))
+                for state in STATES}
+
+    #move the oldest waiting job into processing, None when the queue is empty, moving the file is
+    #what claims it so two workers never take the same job
+    def claim(self):
+        incoming_dir = os.path.join(self.spool_dir, 'incoming')
+        file_names = [file_name for file_name in os.listdir(incoming_dir) if file_name.endswith('.json')]
+        for file_name in sorted(file_names, key=lambda file_name: os.path.getmtime(os.path.join(incoming_dir, file_name))):
+            job_id = file_name[:-5]
+            try:
+                os.replace(self._path('incoming', job_id), self._path('processing', job_id))
+            except FileNotFoundError:
+                continue
+            with open(self._path('processing', job_id)) as f:
+                return json.load(f)
+        return None
+
+    #jobs left in processing by a service that was killed go back on the queue, checkpoints in the
+    #cache let them carry on from where they stopped
+    def recover(self):
+        recovered = []
+        for file_name in os.listdir(os.path.join(self.spool_dir, 'processing')):
+            if file_name.endswith('.json'):
+                job_id = file_name[:-5]
+                os.replace(self._path('processing', job_id), self._path('incoming', job_id))
+                recovered.append(job_id)
+        return recovered
+
+    def run_job(self, job, tracker, slot):
+        job_id = job['job_id']
+        started = time.time()
+        self._set_status(job, 'processing', started=started, worker=slot)
+        #each worker decodes into its own frame store so clips running at once don't overwrite each other
+        frame_store_path = None
+        if self.frame_stores:
+            frame_store_path = os.path.join(self.spool_dir, 'frame_stores', f'{os.getpid()}_{slot}.npy')
+        try:
+            for path in (job['output'], job['report']):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            possession_stats = process_video(job['input'], job['output'], tracker,
+                                             cache_dir=self.cache_dir,
+                                             frame_store_path=frame_store_path,
+                                             report_path=job['report'],
+                                             workers=self.render_workers)
+            finished = time.time()
+            self._set_status(job, 'done', started=started, finished=finished, seconds=finished - started,
+                             worker=slot, frames=int(possession_stats.num_frames))
+            os.replace(self._path('processing', job_id), self._path('done', job_id))
+        except Exception as error:
+            finished = time.time()
+            self._set_status(job, 'failed', started=started, finished=finished, seconds=finished - started,
+                             worker=slot, error=f'{type(error).__name__}: {error}', traceback=traceback.format_exc())
+            os.replace(self._path('processing', job_id), self._path('failed', job_id))
+        finally:
+            if frame_store_path is not None and os.path.exists(frame_store_path):
+                os.remove(frame_store_path)
+
+    def _work(self, tracker, slot, drain):
+        while not self._stop.is_set():
+            job = self.claim()
+            if job is None:
+                if drain:
+                    break
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_job(job, tracker, slot)
+
+    #start one process per slot, each loads its own tracker and takes jobs until stopped, drain stops each
+    #one once the queue is empty. returns once every slot has its model loaded
+    def start(self, drain=False):
+        self.recover()
+        ready = multiprocessing.Queue()
+        for slot in range(self.concurrency):
+            #not daemonic, a slot starts its own render and camera movement pools
+            process = multiprocessing.Process(target=_run_slot, args=(self._settings, slot, drain, self._stop, ready),
+                                              name=f'analysis-worker-{slot}')
+            process.start()
+            self._processes.append(process)
+
+        self.load_seconds = []
+        errors = []
+        reported = set()
+        while len(reported) < self.concurrency:
+            try:
+                slot, load_seconds, error = ready.get(timeout=1)
+            except queue.Empty:
+                #a slot that died before it could report, e.g. killed for running out of memory
+                for slot, process in enumerate(self._processes):
+                    if slot not in reported and not process.is_alive():
+                        reported.add(slot)
+                        errors.append(f'worker {slot}: exited with code {process.exitcode}')
+                continue
+            reported.add(slot)
+            if error is not None:
+                errors.append(f'worker {slot}: {error}')
+            else:
+                self.load_seconds.append(load_seconds)
+        if errors:
+            self.stop()
+            self.wait()
+            raise RuntimeError('failed to load the model, ' + '; '.join(errors))
+
+    def is_running(self):
+        return any(process.is_alive() for process in self._processes)
+
+    #finish the clips already running and take no more
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def wait(self):
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
+    #end the slot processes without letting their clips finish, the jobs go back on the queue next start.
+    #slots ignore SIGTERM so they can finish a clip, so they are killed outright
+    def terminate(self):
+        for process in self._processes:
+            process.kill()
+        self.wait()
+
+    def serve_http(self, port=8765, host='127.0.0.1'):
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        thread = threading.Thread(target=self._server.serve_forever, name='analysis-http', daemon=True)
+        thread.start()
+        return self._server.server_address
+
+    #running jobs are the ones in processing, with the slot their status file says took them
+    def running(self):
+        running = {}
+        for file_name in os.listdir(os.path.join(self.spool_dir, 'processing')):
+            if file_name.endswith('.json'):
+                status = self.status(file_name[:-5])
+                running[file_name[:-5]] = status.get('worker') if status is not None else None
+        return running
+
+    def health(self):
+        return {'workers': self.concurrency, 'running': self.running(), 'stopping': self._stop.is_set(), 'jobs': self.counts()}
+
+#body of a slot process, the service decides when to stop so signals sent to the whole process group,
+#Ctrl-C in a terminal for instance, leave the running clip to finish
+def _run_slot(settings, slot, drain, stop, ready):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    worker = AnalysisWorker(**settings)
+    worker._stop = stop
+    try:
+        tracker, timings = load_tracker(worker.model_path, warm_up=worker.warm_up)
+    except Exception as error:
+        ready.put((slot, None, f'{type(error).__name__}: {error}'))
+        return
+    ready.put((slot, sum(timings.values()), None))
+    worker._work(tracker, slot, drain)
+
+#request handler bound to a worker
+#POST /jobs with {"input": ..., "output": ..., "report": ...} queues a clip, GET /jobs/<id> is its status,
+#GET /jobs and GET /health summarise the queue
+def _make_handler(worker):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def _reply(self, code, body):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = self.path.strip('/').split('/')
+            if parts == ['health'] or parts == ['jobs']:
+                self._reply(200, worker.health())
+            elif len(parts) == 2 and parts[0] == 'jobs':
+                status = worker.status(parts[1])
+                self._reply(200, status) if status is not None else self._reply(404, {'error': 'unknown job'})
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path.strip('/') != 'jobs':
+                return self._reply(404, {'error': 'not found'})
+            if worker._stop.is_set():
+                return self._reply(503, {'error': 'shutting down'})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                input_path = body['input']
+            except (ValueError, KeyError, TypeError):
+                return self._reply(400, {'error': 'expected a JSON body with an "input" video path'})
+            if not os.path.exists(input_path):
+                return self._reply(400, {'error': f'no such file: {input_path}'})
+            job_id = worker.submit(input_path, body.get('output'), body.get('report'))
+            self._reply(202, worker.status(job_id))
+
+        #keep request logging out of the way of the job output
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep the analysis model loaded and process clips from a spool folder')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help='process queued clips until stopped')
+    serve.add_argument('--spool-dir', default='spool')
+    serve.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    serve.add_argument('--concurrency', type=int, default=1, help='clips processed at once, each loads its own model')
+    serve.add_argument('--cache-dir', default='stubs/cache')
+    serve.add_argument('--render-workers', type=int, help='render processes per clip')
+    serve.add_argument('--poll-interval', type=float, default=1.0)
+    serve.add_argument('--port', type=int, help='also accept jobs over HTTP on localhost')
+    serve.add_argument('--drain', action='store_true', help='exit once the queue is empty')
+    serve.add_argument('--no-warm-up', action='store_true')
+    serve.add_argument('--frame-stores', action='store_true', help='memory-map each clip\'s decoded frames while it is processed')
+
+    submit = subparsers.add_parser('submit', help='queue clips for a running service')
+    submit.add_argument('inputs', nargs='+')
+    submit.add_argument('--spool-dir', default='spool')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'submit':
+        worker = AnalysisWorker(args.spool_dir)
+        for input_path in args.inputs:
+            print(worker.submit(input_path), input_path)
+        return 0
+
+    worker = AnalysisWorker(args.spool_dir, args.model, concurrency=args.concurrency, cache_dir=args.cache_dir,
+                            render_workers=args.render_workers, poll_interval=args.poll_interval,
+                            warm_up=not args.no_warm_up, frame_stores=args.frame_stores)
+
+    #the first signal lets running clips finish, a second one ends the slot processes at once
+    def handle_second_signal(signum, frame):
+        print(f'{signal.Signals(signum).name} received again, stopping now')
+        worker.terminate()
+        raise SystemExit(1)
+
+    def handle_signal(signum, frame):
+        print(f'{signal.Signals(signum).name} received, finishing {len(worker.running())} running job(s)')
+        signal.signal(signal.SIGINT, handle_second_signal)
+        signal.signal(signal.SIGTERM, handle_second_signal)
+        worker.stop()
+    signal.signal(signal.SIGINT, handle_signal)
+    signal.signal(signal.SIGTERM, handle_signal)
+
+    try:
+        worker.start(drain=args.drain)
+    except RuntimeError as error:
+        print(error)
+        return 1
+    print(f'{args.concurrency} worker(s) ready in {sum(worker.load_seconds):.1f}s, watching {args.spool_dir}')
+    if args.port is not None:
+        host, port = worker.serve_http(args.port)
+        print(f'accepting jobs on http://{host}:{port}/jobs')
+
+    #the main thread stays free to handle signals while the workers run
+    while worker.is_running():
+        time.sleep(0.2)
+    worker.stop()
+    worker.wait()
+    print(f'stopped, jobs: {worker.counts()}')
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
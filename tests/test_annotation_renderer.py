@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from football_analysis.track_store import TrackStore, ObjectTracks
+from football_analysis.ball_possession import PossessionStats
+from football_analysis.annotation_renderer import AnnotationRenderer
+
+NUM_FRAMES = 14
+
+#players, a referee and the ball moving about a full size frame so every panel is drawn on
+@pytest.fixture(scope='module')
+def match():
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (1080, 1920, 3), dtype=np.uint8) for _ in range(NUM_FRAMES)]
+    frame = np.repeat(np.arange(NUM_FRAMES), 4)
+    track_id = np.tile([1, 2, 3, 4], NUM_FRAMES)
+    corner = rng.uniform(100, 900, (len(frame), 2))
+    player_tracks = ObjectTracks(NUM_FRAMES, frame, track_id, np.hstack([corner, corner + [40, 90]]))
+    player_tracks.set_column('team', track_id % 2)
+    player_tracks.set_column('has_ball', track_id == frame % 4 + 1)
+    player_tracks.set_column('speed', rng.uniform(0, 30, len(frame)))
+    player_tracks.set_column('distance', rng.uniform(0, 100, len(frame)))
+    ball_tracks = ObjectTracks(NUM_FRAMES, np.arange(NUM_FRAMES), np.ones(NUM_FRAMES), [[500, 500, 510, 510]]*NUM_FRAMES)
+    tracks = TrackStore(NUM_FRAMES, {'players': player_tracks, 'ball': ball_tracks})
+    tracks.set_team_colours({0: (10.0, 200.0, 30.0), 1: (220.0, 20.0, 90.0)})
+    possession_stats = PossessionStats.from_frames(rng.integers(-1, 2, NUM_FRAMES))
+    camera_movement = rng.normal(0, 2, (NUM_FRAMES, 2)).astype(np.float32)
+    return frames, tracks, possession_stats, camera_movement
+
+@pytest.mark.parametrize('max_buffer_bytes', [1024**3, 1])
+def test_parallel_matches_serial(match, max_buffer_bytes):
+    frames, tracks, possession_stats, camera_movement = match
+    renderer = AnnotationRenderer()
+    serial = list(renderer.render(frames, tracks, possession_stats, camera_movement))
+    #a tiny buffer shortens the chunks down to a single frame
+    parallel = list(renderer.render_parallel(frames, tracks, possession_stats, camera_movement,
+                                             workers=2, chunk_size=4, max_buffer_bytes=max_buffer_bytes))
+    assert len(parallel) == NUM_FRAMES
+    for serial_frame, parallel_frame in zip(serial, parallel):
+        np.testing.assert_array_equal(parallel_frame, serial_frame)
+
+def test_select_frames_renumbers_from_start(match):
+    _, tracks, possession_stats, _ = match
+    selected = tracks.select_frames(5, 9)
+    assert selected.num_frames == 4
+    player_tracks = selected['players']
+    assert len(player_tracks.frame_offsets) == 5
+    np.testing.assert_array_equal(player_tracks.frame, np.repeat(np.arange(4), 4))
+    np.testing.assert_array_equal(player_tracks.columns['bbox'], tracks['players'].columns['bbox'][20:36])
+
+    selected_stats = possession_stats.select_frames(5, 9)
+    assert selected_stats.num_frames == 4
+    for frame_num in range(4):
+        np.testing.assert_array_equal(selected_stats.possession_percentages(frame_num),
+                                      possession_stats.possession_percentages(frame_num + 5))
+        assert selected_stats.holder(frame_num) == possession_stats.holder(frame_num + 5)
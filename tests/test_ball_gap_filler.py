@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from football_analysis.ball_gap_filler import BallGapFiller
+
+#ball boxes along a path, with gaps at the start, the end and in between
+def make_bboxes(num_frames=120, missing=0.4, seed=0):
+    rng = np.random.default_rng(seed)
+    centre = np.cumsum(rng.normal(0, 4, (num_frames,2)), axis=0) + 500
+    bboxes = np.hstack([centre - 5, centre + 5])
+    bboxes[rng.random(num_frames) < missing] = np.nan
+    bboxes[:3] = np.nan
+    bboxes[-4:] = np.nan
+    return bboxes
+
+#settle every frame through the online filler
+def run_online(ball_gap_filler, bboxes):
+    filled = np.full(bboxes.shape, np.nan)
+    settled = []
+    for frame_num, bbox in enumerate(bboxes):
+        settled += ball_gap_filler.update(frame_num, None if np.isnan(bbox).any() else bbox)
+    settled += ball_gap_filler.flush()
+    for frame_num, bbox in settled:
+        filled[frame_num] = bbox
+    return filled
+
+def test_fill_matches_pandas():
+    pd = pytest.importorskip('pandas')
+    bboxes = make_bboxes()
+    #the original interpolation
+    df_positions = pd.DataFrame(bboxes.tolist(), columns=['x1','y1','x2','y2'])
+    reference = df_positions.interpolate().bfill().to_numpy()
+    np.testing.assert_allclose(BallGapFiller().fill(bboxes), reference)
+
+@pytest.mark.parametrize('max_speed', [None, 6])
+def test_online_matches_whole_match(max_speed):
+    bboxes = make_bboxes()
+    whole = BallGapFiller(max_speed=max_speed).fill(bboxes)
+    online = run_online(BallGapFiller(look_ahead=len(bboxes), max_speed=max_speed), bboxes)
+    np.testing.assert_allclose(online, whole)
+
+def test_max_speed_drops_outlier():
+    bboxes = make_bboxes(missing=0)
+    outlier = bboxes.copy()
+    outlier[60] += 400
+    without = bboxes.copy()
+    without[60] = np.nan
+    np.testing.assert_allclose(BallGapFiller(max_speed=30).fill(outlier), BallGapFiller().fill(without))
+
+def test_no_detections():
+    assert np.isnan(BallGapFiller().fill(np.full((10,4), np.nan))).all()
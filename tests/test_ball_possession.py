@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from football_analysis.track_store import TrackStore, ObjectTracks
+from football_analysis.ball_possession import BallPossession, PossessionStats
+
+#players bunched around the ball so several are in range at once, whole pixel boxes so some are tied,
+#and frames where the ball wasn't seen
+def make_tracks(num_frames=80, num_players=10, seed=0):
+    rng = np.random.default_rng(seed)
+    tracks = {'players': [], 'ball': []}
+    for frame_num in range(num_frames):
+        ball = rng.integers(100, 400, 2)
+        players = {}
+        for track_id in rng.permutation(np.arange(1, num_players + 1)).tolist():
+            x, y = ball + rng.integers(-80, 80, 2)
+            players[track_id] = {'bbox': [float(x - 20), float(y - 90), float(x + 20), float(y)]}
+        tracks['players'].append(dict(sorted(players.items())))
+        tracks['ball'].append({} if rng.random() < 0.2 else {1: {'bbox': [float(ball[0] - 5), float(ball[1] - 5),
+                                                                     float(ball[0] + 5), float(ball[1] + 5)]}})
+    return tracks
+
+#the original per-frame loop
+def reference_possession(tracks):
+    ball_possession = BallPossession()
+    return np.array([ball_possession.assign_ball_possession(players, ball[1]['bbox']) if 1 in ball else -1
+                     for players, ball in zip(tracks['players'], tracks['ball'])])
+
+def test_track_store_matches_loop():
+    tracks = make_tracks()
+    reference = reference_possession(tracks)
+    assert (reference >= 0).sum() > 20
+
+    store = TrackStore.from_tracks(tracks)
+    assigned_players = BallPossession().add_possession_to_track_store(store)
+    np.testing.assert_array_equal(assigned_players, reference)
+
+    player_tracks = store['players']
+    holders = player_tracks.find_rows(np.flatnonzero(reference >= 0), reference[reference >= 0])
+    has_ball = np.zeros(player_tracks.num_rows, dtype=bool)
+    has_ball[holders] = True
+    np.testing.assert_array_equal(player_tracks.column('has_ball'), has_ball)
+
+def test_grid_matches_loop():
+    tracks = make_tracks()
+    reference = reference_possession(tracks)
+    store = TrackStore.from_tracks(tracks)
+    ball_possession = BallPossession()
+
+    player_tracks = store['players']
+    ball_tracks = store['ball']
+    assigned_players = ball_possession.assign_ball_possession_grid(ball_tracks.frame,
+                                                                   ball_possession.get_ball_centres(ball_tracks.column('bbox')),
+                                                                   player_tracks.frame,
+                                                                   player_tracks.track_id,
+                                                                   ball_possession.get_foot_corners(player_tracks.column('bbox')))
+    np.testing.assert_array_equal(assigned_players, reference[ball_tracks.frame])
+
+def test_team_possession_follows_holder():
+    store = TrackStore.from_tracks(make_tracks())
+    ball_possession = BallPossession()
+    assigned_players = ball_possession.add_possession_to_track_store(store)
+    player_tracks = store['players']
+    player_tracks.set_column('team', player_tracks.track_id % 2)
+    team_possession = ball_possession.get_team_possession(player_tracks, assigned_players)
+    np.testing.assert_array_equal(team_possession, np.where(assigned_players >= 0, assigned_players % 2, -1))
+
+def test_no_players_means_no_possession():
+    num_frames = 5
+    ball_tracks = ObjectTracks(num_frames, np.arange(num_frames), np.ones(num_frames), [[100, 100, 110, 110]]*num_frames)
+    store = TrackStore(num_frames, {'players': ObjectTracks(num_frames, [], [], np.zeros((0, 4))), 'ball': ball_tracks})
+    ball_possession = BallPossession()
+    assigned_players = ball_possession.add_possession_to_track_store(store)
+    assert assigned_players.tolist() == [-1]*num_frames
+    assert ball_possession.get_team_possession(store['players'], assigned_players).tolist() == [-1]*num_frames
+
+#team per frame with stretches of -1 where nobody has the ball
+def make_team_possession(num_frames=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.repeat(rng.integers(-1, 2, num_frames//5), 5)
+
+def test_percentages_match_prefix_scan():
+    team_possession = make_team_possession()
+    stats = PossessionStats.from_frames(team_possession)
+    for frame_num in range(len(team_possession)):
+        #what the original drawing code counted from every frame up to this one
+        team_possession_frame = team_possession[:frame_num+1]
+        team_1_num_frames = team_possession_frame[team_possession_frame == 1].shape[0]
+        team_2_num_frames = team_possession_frame[team_possession_frame == 0].shape[0]
+        if team_1_num_frames + team_2_num_frames == 0:
+            np.testing.assert_array_equal(stats.possession_percentages(frame_num), [0, 0])
+            continue
+        team_1_possession = (team_1_num_frames / (team_1_num_frames + team_2_num_frames))*100
+        team_2_possession = (team_2_num_frames / (team_1_num_frames + team_2_num_frames))*100
+        np.testing.assert_allclose(stats.possession_percentages(frame_num), [team_2_possession, team_1_possession])
+
+def test_update_matches_from_frames():
+    team_possession = make_team_possession()
+    player_possession = np.where(team_possession >= 0, np.arange(len(team_possession)) % 7, -1)
+    whole = PossessionStats.from_frames(team_possession, player_possession)
+    online = PossessionStats(capacity=4)
+    for team, player in zip(team_possession.tolist(), player_possession.tolist()):
+        online.update(team, player)
+
+    assert online.num_frames == whole.num_frames
+    assert online.spells() == whole.spells()
+    assert online.to_report() == whole.to_report()
+    for frame_num in range(len(team_possession)):
+        assert online.holder(frame_num) == whole.holder(frame_num)
+        assert online.current_spell(frame_num) == whole.current_spell(frame_num)
+
+def test_spells_change_with_team():
+    stats = PossessionStats.from_frames([-1, 0, 0, -1, 0, 1, 1, -1, 0])
+    assert stats.spells() == [(0, 1, 4), (1, 5, 7), (0, 8, 8)]
+    assert stats.holder(0) == (-1, -1)
+    assert stats.current_spell(7) == (1, 5)
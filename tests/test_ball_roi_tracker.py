@@ -0,0 +1,76 @@
+import numpy as np
+from football_analysis.ball_roi_tracker import BallRoiTracker
+from football_analysis.ball_roi_tracker.ball_roi_tracker import model_input_pixels
+
+HEIGHT, WIDTH = 1080, 1920
+
+#ball moving steadily across the frame, as (x1,y1,x2,y2) per frame
+def ball_path(num_frames=40):
+    centre = np.stack([300 + 12*np.arange(num_frames), 500 + 3*np.arange(num_frames)], axis=1).astype(np.float64)
+    return np.hstack([centre - 4, centre + 4])
+
+#frame with the ball drawn in, a white box on black
+def draw_frame(bbox):
+    frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    x1, y1, x2, y2 = bbox.astype(int)
+    frame[y1:y2, x1:x2] = 255
+    return frame
+
+#detector that finds the white pixels in whatever image it's given, except on the frames in blind
+def make_detect(blind=()):
+    state = {'frame_num': 0, 'calls': []}
+    def detect(image, imgsz):
+        state['calls'].append((image.shape[:2], imgsz))
+        ys, xs = np.nonzero(image[:,:,0])
+        if state['frame_num'] in blind or len(xs) == 0:
+            return None
+        return [xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]
+    return detect, state
+
+def run(roi_tracker, detect, state, bboxes, fallback=None):
+    found = []
+    for frame_num, bbox in enumerate(bboxes):
+        state['frame_num'] = frame_num
+        fallback_bbox = fallback[frame_num] if fallback is not None else None
+        found.append(roi_tracker.search(draw_frame(bbox), frame_num, detect, fallback_bbox))
+    return found
+
+def test_follows_the_ball_on_crops():
+    bboxes = ball_path()
+    detect, state = make_detect()
+    roi_tracker = BallRoiTracker()
+    found = run(roi_tracker, detect, state, bboxes)
+    np.testing.assert_allclose(np.array(found), bboxes)
+    assert roi_tracker.stats['full_searches'] == 1
+    assert roi_tracker.stats['roi_found'] == len(bboxes) - 1
+    assert roi_tracker.pixel_ratio() < 0.5
+
+def test_crop_miss_falls_back_to_shared_pass():
+    bboxes = ball_path()
+    #the crops miss on a few frames the full-frame pass still caught
+    detect, state = make_detect(blind={10, 11, 20})
+    roi_tracker = BallRoiTracker(shared_full_pass=True, shared_pass_imgsz=480)
+    found = run(roi_tracker, detect, state, bboxes, fallback=bboxes)
+    np.testing.assert_allclose(np.array(found), bboxes)
+    #the first frame and the three misses
+    assert roi_tracker.stats['fallback_found'] == 4
+    assert roi_tracker.stats['full_searches'] == 0
+
+def test_shared_pass_counts_towards_pixels():
+    bboxes = ball_path()
+    detect, state = make_detect()
+    roi_tracker = BallRoiTracker(shared_full_pass=True, shared_pass_imgsz=480)
+    run(roi_tracker, detect, state, bboxes, fallback=bboxes)
+    crop_pixels = sum(model_input_pixels(h, w, imgsz) for (h, w), imgsz in state['calls'])
+    pass_pixels = len(bboxes)*model_input_pixels(HEIGHT, WIDTH, 480)
+    assert roi_tracker.stats['model_pixels'] == crop_pixels + pass_pixels
+    assert roi_tracker.pixel_ratio() < 1
+
+def test_lost_ball_searched_every_interval_with_shared_pass():
+    bboxes = ball_path()
+    #the pass never sees the ball and neither does anything else
+    detect, state = make_detect(blind=set(range(len(bboxes))))
+    roi_tracker = BallRoiTracker(shared_full_pass=True, lost_search_interval=4)
+    found = run(roi_tracker, detect, state, bboxes)
+    assert all(bbox is None for bbox in found)
+    assert roi_tracker.stats['full_searches'] == len(range(0, len(bboxes), 4))
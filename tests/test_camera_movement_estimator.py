@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from football_analysis.checkpoint import Checkpoint
+from football_analysis.camera_movement_estimator import CameraMovementEstimator
+from benchmarks.synthetic import make_panning_frames
+
+#wide enough for both strips of the feature mask, short enough to stay quick
+@pytest.fixture(scope='module')
+def frames():
+    frames, _ = make_panning_frames(num_frames=36, height=240, width=1100, max_pan=6)
+    return frames
+
+@pytest.mark.parametrize('fast', [False, True])
+def test_parallel_matches_serial(frames, fast):
+    estimator = CameraMovementEstimator(frames[0])
+    serial = estimator.get_camera_movement(frames, fast=fast)
+    parallel = estimator.get_camera_movement(frames, fast=fast, workers=2, chunk_size=10, overlap=10)
+    assert np.abs(serial).sum() > 0
+    #chunk edges can shift the estimate by a fraction of a pixel
+    np.testing.assert_allclose(parallel, serial, atol=0.05)
+
+    #arrays are sent in slices rather than whole
+    parallel = estimator.get_camera_movement(np.stack(frames), fast=fast, workers=2, chunk_size=10, overlap=10)
+    np.testing.assert_allclose(parallel, serial, atol=0.05)
+
+def test_every_path_returns_an_array(frames, tmp_path):
+    estimator = CameraMovementEstimator(frames[0])
+    results = [estimator.get_camera_movement(frames),
+               estimator.get_camera_movement(frames, fast=True),
+               estimator.get_camera_movement(frames, workers=2, chunk_size=10),
+               estimator.get_camera_movement(frames, checkpoint=Checkpoint(str(tmp_path)), chunk_size=10)]
+    for camera_movement in results:
+        assert isinstance(camera_movement, np.ndarray)
+        assert camera_movement.dtype == np.float32
+        assert camera_movement.shape == (len(frames), 2)
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_checkpoint_resume_matches_uninterrupted(frames, tmp_path, workers):
+    estimator = CameraMovementEstimator(frames[0])
+    uninterrupted = estimator.get_camera_movement(frames, workers=workers, chunk_size=10)
+
+    #run on the first chunks only, as if the run had been stopped part way through
+    checkpoint = Checkpoint(str(tmp_path))
+    if workers is None:
+        estimator.get_camera_movement_checkpointed(frames[:20], checkpoint, chunk_size=10)
+    else:
+        estimator.get_camera_movement_parallel(frames[:20], workers, chunk_size=10, checkpoint=checkpoint)
+
+    resumed = estimator.get_camera_movement(frames, workers=workers, chunk_size=10, checkpoint=checkpoint)
+    np.testing.assert_array_equal(resumed, uninterrupted)
+    assert not any(tmp_path.iterdir())
+
+def test_worker_settings_rebuild_the_estimator(frames):
+    estimator = CameraMovementEstimator(frames[0])
+    settings = estimator.get_worker_settings()
+    assert 'mask' not in settings['features']
+    rebuilt = CameraMovementEstimator.from_worker_settings(settings)
+    np.testing.assert_array_equal(rebuilt.features['mask'], estimator.features['mask'])
+    assert rebuilt.get_camera_movement(frames).tolist() == estimator.get_camera_movement(frames).tolist()
+
+def test_max_reduction_matches_accurate(frames, tmp_path):
+    estimator = CameraMovementEstimator(frames[0])
+    accurate = estimator.get_camera_movement(frames)
+    assert np.abs(accurate).sum() > 0
+    np.testing.assert_allclose(estimator.get_camera_movement(frames, fast=True, reduction='max'), accurate, atol=0.01)
+    #carried across chunks and split between workers it still follows the accurate mode
+    checkpointed = estimator.get_camera_movement(frames, fast=True, reduction='max',
+                                                 checkpoint=Checkpoint(str(tmp_path)), chunk_size=10)
+    np.testing.assert_allclose(checkpointed, accurate, atol=0.01)
+    parallel = estimator.get_camera_movement(frames, fast=True, reduction='max', workers=2, chunk_size=10, overlap=10)
+    serial_parallel = estimator.get_camera_movement(frames, workers=2, chunk_size=10, overlap=10)
+    np.testing.assert_allclose(parallel, serial_parallel, atol=0.01)
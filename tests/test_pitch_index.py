@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from football_analysis.pitch_index import PitchIndex
+from football_analysis.track_store import TrackStore, ObjectTracks
+from benchmarks.pitch_index_benchmark import make_pitch_tracks, scan_zone_occupancy, PENALTY_AREA
+
+FPS = 24
+
+#two minutes split into ten second partitions, so time ranges start and end inside partitions
+@pytest.fixture(scope='module')
+def tracks():
+    return make_pitch_tracks(minutes=2, fps=FPS, num_players=12)
+
+@pytest.fixture(scope='module')
+def index(tracks):
+    return PitchIndex(tracks, fps=FPS, partition_seconds=10)
+
+#rows of the original tracks that are on the pitch, with their positions and teams
+def on_pitch(tracks, start_frame=0, stop_frame=None, team=None):
+    player_tracks = tracks['players']
+    position = player_tracks.column('transformed_position')
+    stop_frame = player_tracks.num_frames if stop_frame is None else stop_frame
+    keep = (((position >= 0) & (position <= [23.32, 68])).all(axis=1)
+            & (player_tracks.frame >= start_frame) & (player_tracks.frame < stop_frame))
+    if team is not None:
+        keep &= player_tracks.column('team') == team
+    return player_tracks.frame[keep], player_tracks.track_id[keep], position[keep]
+
+#zones on cell edges, inside a single cell, the whole pitch and empty
+ZONES = [PENALTY_AREA, (3.0, 10.0, 8.0, 30.0), (4.2, 4.2, 4.7, 4.9), (0, 0, 23.32, 68), (10, 10, 5, 20)]
+RANGES = [(0, None), (100, 700), (240, 480), (1000, 1001), (500, 500)]
+
+@pytest.mark.parametrize('zone', ZONES)
+@pytest.mark.parametrize('start_frame,stop_frame', RANGES)
+def test_zone_occupancy_matches_scan(tracks, index, zone, start_frame, stop_frame):
+    stop = tracks['players'].num_frames if stop_frame is None else stop_frame
+    assert index.zone_occupancy(zone, start_frame, stop_frame) == scan_zone_occupancy(tracks['players'], zone, start_frame, stop)
+
+def test_zone_occupancy_by_team(tracks, index):
+    frame, track_id, position = on_pitch(tracks, team=1)
+    inside = ((position[:,0] >= PENALTY_AREA[0]) & (position[:,0] <= PENALTY_AREA[2])
+              & (position[:,1] >= PENALTY_AREA[1]) & (position[:,1] <= PENALTY_AREA[3]))
+    track_ids, frames = np.unique(track_id[inside], return_counts=True)
+    assert index.zone_occupancy(PENALTY_AREA, team=1) == dict(zip(track_ids.tolist(), frames.tolist()))
+
+def scan_heatmap(index, frame, position):
+    cell_x = np.minimum((position[:,0]/index.cell_size).astype(int), index.num_cells_x - 1)
+    cell_y = np.minimum((position[:,1]/index.cell_size).astype(int), index.num_cells_y - 1)
+    counts = np.zeros((index.num_cells_y, index.num_cells_x), dtype=np.int64)
+    np.add.at(counts, (cell_y, cell_x), 1)
+    return counts
+
+@pytest.mark.parametrize('start_frame,stop_frame', RANGES)
+def test_heatmap_matches_scan(tracks, index, start_frame, stop_frame):
+    frame, track_id, position = on_pitch(tracks, start_frame, stop_frame)
+    np.testing.assert_array_equal(index.heatmap(start_frame=start_frame, stop_frame=stop_frame),
+                                  scan_heatmap(index, frame, position))
+
+    player = track_id == 7
+    np.testing.assert_array_equal(index.heatmap(track_id=7, start_frame=start_frame, stop_frame=stop_frame),
+                                  scan_heatmap(index, frame[player], position[player]))
+
+    frame, track_id, position = on_pitch(tracks, start_frame, stop_frame, team=0)
+    np.testing.assert_array_equal(index.heatmap(team=0, start_frame=start_frame, stop_frame=stop_frame),
+                                  scan_heatmap(index, frame, position))
+
+def test_team_shape_matches_scan(tracks, index):
+    start_frame, stop_frame = 230, 260
+    shape = index.team_shape(1, start_frame, stop_frame)
+    frame, _, position = on_pitch(tracks, start_frame, stop_frame, team=1)
+    for frame_num in range(start_frame, stop_frame):
+        players = position[frame == frame_num]
+        i = frame_num - start_frame
+        assert shape['players'][i] == len(players)
+        np.testing.assert_allclose(shape['centroid'][i], players.mean(axis=0))
+        np.testing.assert_allclose(shape['length'][i], np.ptp(players[:,0]))
+        np.testing.assert_allclose(shape['width'][i], np.ptp(players[:,1]))
+
+def test_track_and_frame_rows(tracks, index):
+    frame, track_id, _ = on_pitch(tracks, 100, 200)
+    rows = index.track_rows(7, 100, 200)
+    np.testing.assert_array_equal(index.frame[rows], frame[track_id == 7])
+    assert len(index.frame_rows(100, 200)) == len(frame)
+    assert len(index.track_rows(999)) == 0
+
+def test_needs_pitch_positions():
+    player_tracks = ObjectTracks(2, [0, 1], [1, 1], np.zeros((2,4)))
+    with pytest.raises(ValueError):
+        PitchIndex(TrackStore(2, {'players': player_tracks}))
@@ -0,0 +1,66 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pytest
+from football_analysis.result_cache import ResultCache
+from football_analysis.track_store import TrackStore
+from benchmarks.synthetic import make_match
+
+@pytest.fixture(scope='module')
+def tracks():
+    _, tracks, _ = make_match(num_frames=6)
+    return tracks
+
+#a different file hashed into the same cache from each process
+def hash_in_process(cache_dir, path):
+    return ResultCache(cache_dir).hash_file(path)
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_round_trip(tmp_path, tracks, compress):
+    cache = ResultCache(str(tmp_path), compress=compress)
+    cache.save('tracks', tracks.to_arrays())
+    arrays = cache.load('tracks')
+    loaded = TrackStore.from_arrays(arrays)
+    for object, object_tracks in tracks.items():
+        np.testing.assert_array_equal(loaded[object].frame, object_tracks.frame)
+        np.testing.assert_array_equal(loaded[object].column('bbox'), object_tracks.column('bbox'))
+    #compressed entries are one npz archive, the rest one memory-mappable npy per column
+    entry = os.listdir(tmp_path / 'tracks')
+    if compress:
+        assert entry == ['columns.npz']
+    else:
+        assert all(name.endswith('.npy') for name in entry)
+        assert isinstance(arrays['players.bbox'], np.memmap)
+
+def test_compressed_by_default(tmp_path, tracks):
+    assert ResultCache(str(tmp_path)).compress
+    ResultCache(str(tmp_path)).save('tracks', tracks.to_arrays())
+    assert os.listdir(tmp_path / 'tracks') == ['columns.npz']
+
+def test_key_follows_file_contents(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    video_path = tmp_path / 'video.avi'
+    video_path.write_bytes(b'frames')
+    key = cache.make_key('tracks', [str(video_path)], conf=0.1)
+    assert cache.make_key('tracks', [str(video_path)], conf=0.1) == key
+    assert cache.make_key('tracks', [str(video_path)], conf=0.2) != key
+    with open(video_path, 'ab') as f:
+        f.write(b'more')
+    assert cache.make_key('tracks', [str(video_path)], conf=0.1) != key
+
+def test_concurrent_hashing_keeps_every_digest(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    ResultCache(cache_dir)
+    paths = []
+    for i in range(16):
+        path = tmp_path / f'video_{i}.avi'
+        path.write_bytes(os.urandom(1024))
+        paths.append(str(path))
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        digests = list(executor.map(hash_in_process, [cache_dir]*len(paths), paths))
+
+    with open(os.path.join(cache_dir, 'file_hashes.json')) as f:
+        hashes = json.load(f)
+    assert sorted(hashes) == sorted(os.path.abspath(path) for path in paths)
+    assert [hashes[os.path.abspath(path)][2] for path in paths] == digests
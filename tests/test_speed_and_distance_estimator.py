@@ -0,0 +1,78 @@
+import copy
+import numpy as np
+import pytest
+from football_analysis.track_store import TrackStore
+from football_analysis.speed_and_distance_estimator import SpeedAndDistanceEstimator
+
+#players wandering over the pitch, tracks drop out now and then and some positions are missing
+def make_tracks(num_frames=53, num_players=8, seed=0):
+    rng = np.random.default_rng(seed)
+    position = rng.uniform(0, 20, (num_players,2))
+    tracks = {'players': [], 'referees': [], 'ball': []}
+    for frame_num in range(num_frames):
+        position = position + rng.normal(0, 0.2, position.shape)
+        players = {}
+        for track_id in range(1, num_players + 1):
+            if rng.random() < 0.1:
+                continue
+            transformed_position = None if rng.random() < 0.05 else position[track_id-1].tolist()
+            players[track_id] = {'bbox': [0,0,10,20], 'transformed_position': transformed_position}
+        tracks['players'].append(players)
+        tracks['referees'].append({99: {'bbox': [0,0,10,20], 'transformed_position': [1.0,1.0]}})
+        tracks['ball'].append({1: {'bbox': [0,0,2,2], 'transformed_position': [5.0,5.0]}})
+    return tracks
+
+#speed and distance per player row, worked out by the online estimator a frame at a time
+def run_online(estimator, player_tracks):
+    speed = np.full(player_tracks.num_rows, np.nan)
+    distance = np.full(player_tracks.num_rows, np.nan)
+    position = player_tracks.column('transformed_position')
+    settled = []
+    for frame_num in range(player_tracks.num_frames):
+        rows = player_tracks.frame_rows(frame_num)
+        settled.append(estimator.update('players', frame_num, player_tracks.track_id[rows], position[rows]))
+    settled.append(estimator.flush('players'))
+    for frames, track_ids, window_speed, window_distance in settled:
+        rows = player_tracks.find_rows(frames, track_ids)
+        speed[rows] = window_speed
+        distance[rows] = window_distance
+    return speed, distance
+
+#the last window ends on the final frame, is cut short, or starts on the final frame
+@pytest.mark.parametrize('num_frames', [51, 53, 55])
+def test_track_store_matches_dictionaries(num_frames):
+    tracks = make_tracks(num_frames)
+    reference = copy.deepcopy(tracks)
+    SpeedAndDistanceEstimator().add_speed_and_distance_to_tracks(reference)
+    reference = TrackStore.from_tracks(reference)
+
+    store = TrackStore.from_tracks(tracks)
+    SpeedAndDistanceEstimator().add_speed_and_distance_to_tracks(store)
+
+    for name in ('speed', 'distance'):
+        np.testing.assert_allclose(store['players'].column(name), reference['players'].column(name))
+    assert not np.isnan(store['players'].column('speed')).all()
+    for object in ('referees', 'ball'):
+        assert np.isnan(store[object].column('speed')).all()
+
+@pytest.mark.parametrize('smoothing', [None, 3])
+def test_online_matches_whole_match(smoothing):
+    store = TrackStore.from_tracks(make_tracks())
+    SpeedAndDistanceEstimator(smoothing=smoothing).add_speed_and_distance_to_tracks(store)
+
+    speed, distance = run_online(SpeedAndDistanceEstimator(smoothing=smoothing), store['players'])
+    np.testing.assert_allclose(speed, store['players'].column('speed'))
+    np.testing.assert_allclose(distance, store['players'].column('distance'))
+
+def test_speed_follows_frame_rate():
+    tracks = make_tracks()
+    speeds = []
+    for frame_rate in (24, 48):
+        store = TrackStore.from_tracks(tracks)
+        SpeedAndDistanceEstimator(frame_rate=frame_rate).add_speed_and_distance_to_tracks(store)
+        speeds.append(store['players'].column('speed'))
+    np.testing.assert_allclose(speeds[1], 2*speeds[0])
+
+def test_smoothing_needs_track_store():
+    with pytest.raises(ValueError):
+        SpeedAndDistanceEstimator(smoothing=3).add_speed_and_distance_to_tracks(make_tracks())
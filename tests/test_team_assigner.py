@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from football_analysis.track_store import TrackStore, ObjectTracks
+from football_analysis.team_assigner import TeamAssigner
+from benchmarks.synthetic import make_match
+from benchmarks.team_assigner_benchmark import compare_team_labels
+
+@pytest.fixture(scope='module')
+def match():
+    frames, tracks, _ = make_match(num_frames=4)
+    return frames, tracks
+
+#frames that count how often each one is read
+class CountingFrames:
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.reads = [0]*len(frames)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __getitem__(self, frame_num):
+        self.reads[frame_num] += 1
+        return self.frames[frame_num]
+
+def fitted_assigner(frames, tracks):
+    team_assigner = TeamAssigner()
+    player_tracks = tracks['players']
+    rows = player_tracks.frame_rows(0)
+    team_assigner.assign_team_colour(frames[0], {int(track_id): {'bbox': bbox} for track_id, bbox
+                                                 in zip(player_tracks.track_id[rows], player_tracks.column('bbox')[rows])})
+    return team_assigner
+
+def test_labels_agree_with_per_crop_path(match):
+    results = compare_team_labels(*match)
+    assert results['crops'] > 60
+    assert results['colour_agreement'] >= 0.9
+    assert results['team_agreement'] >= 0.9
+
+def test_empty_crops_have_no_colour(match):
+    frames, tracks = match
+    team_assigner = TeamAssigner()
+    bboxes = tracks['players'].column('bbox')[:5]
+    crops = team_assigner.get_top_half_crops(frames[0], bboxes)
+    #a box one pixel tall and one entirely off the frame
+    empty = team_assigner.get_top_half_crops(frames[0], [[100, 100, 140, 101], [2000, 100, 2040, 190]])
+    assert all(crop.size == 0 for crop in empty)
+    colours = team_assigner.get_player_colours(crops[:2] + empty + crops[2:])
+    assert np.isnan(colours[2:4]).all()
+    np.testing.assert_array_equal(np.delete(colours, [2, 3], axis=0), team_assigner.get_player_colours(crops))
+
+def test_has_top_half_matches_crops(match):
+    frames, _ = match
+    team_assigner = TeamAssigner()
+    bboxes = np.array([[100, 100, 140, 190], [100, 100, 140, 101], [100, 100, 140, 102], [-30, 5, 10, 60],
+                       [1900, 1070, 1960, 1100], [2000, 100, 2040, 190], [50, -20, 90, -5], [10.7, 20.2, 10.9, 80]])
+    crops = team_assigner.get_top_half_crops(frames[0], bboxes)
+    np.testing.assert_array_equal(team_assigner.has_top_half(bboxes, frames[0].shape), [crop.size > 0 for crop in crops])
+
+def test_track_store_reads_each_frame_once(match):
+    frames, tracks = match
+    team_assigner = fitted_assigner(frames, tracks)
+    counting_frames = CountingFrames(frames)
+    team_assigner.add_team_to_track_store(tracks, counting_frames)
+    #the first frame is read once for its shape and once for its crops
+    assert counting_frames.reads[0] <= 2
+    assert max(counting_frames.reads[1:], default=0) <= 1
+
+    #each track takes the team its first crop is predicted as
+    player_tracks = tracks['players']
+    reference = fitted_assigner(frames, tracks)
+    rows = player_tracks.frame_rows(0)
+    expected = reference.get_player_teams(frames[0], player_tracks.column('bbox')[rows], player_tracks.track_id[rows].tolist())
+    np.testing.assert_array_equal(player_tracks.column('team')[rows], expected)
+
+def test_tracks_without_a_crop_use_a_later_frame(match):
+    frames, tracks = match
+    bboxes = tracks['players'].column('bbox')
+    track_ids = tracks['players'].track_id
+    player_tracks = ObjectTracks(3, [0, 1, 0, 1, 2], [1, 1, 2, 2, 2],
+                                 [[100, 100, 140, 101], bboxes[0], [100, 100, 140, 101], [0, 0, 0, 0], bboxes[1]])
+    store = TrackStore(3, {'players': player_tracks})
+    team_assigner = fitted_assigner(frames, tracks)
+    team_assigner.add_team_to_track_store(store, frames)
+
+    reference = fitted_assigner(frames, tracks)
+    expected_1 = reference.get_player_teams(frames[1], [bboxes[0]], [1])[0]
+    expected_2 = reference.get_player_teams(frames[2], [bboxes[1]], [2])[0]
+    #rows are in frame then track order
+    np.testing.assert_array_equal(player_tracks.column('team'), [expected_1, expected_2, expected_1, expected_2, expected_2])
+
+    #with nothing to colour the track keeps no team
+    empty = TrackStore(1, {'players': ObjectTracks(1, [0], [5], [[100, 100, 140, 101]])})
+    team_assigner.add_team_to_track_store(empty, frames)
+    assert empty['players'].column('team').tolist() == [-1]
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+import pytest
+from football_analysis.utils import VideoReader, VideoWriter, save_video, save_video_segments
+from football_analysis.utils import video_utils
+
+#frames that can be told apart after lossy encoding by their overall brightness
+def make_frames(num_frames=30, height=64, width=96):
+    return [np.full((height, width, 3), 8*frame_num, dtype=np.uint8) for frame_num in range(num_frames)]
+
+def brightness(frames):
+    return np.array([float(np.mean(frame)) for frame in frames])
+
+#stands in for cv2.VideoWriter and keeps whatever it was given, failing on the frame numbered fail_at
+class RecordingWriter:
+    written = []
+    fail_at = None
+    error = RuntimeError
+
+    def __init__(self, path, fourcc, fps, frame_size):
+        RecordingWriter.written = []
+
+    def write(self, frame):
+        if len(RecordingWriter.written) == RecordingWriter.fail_at:
+            raise RecordingWriter.error('write failed')
+        RecordingWriter.written.append(frame)
+
+    def release(self):
+        pass
+
+@pytest.fixture
+def recording_writer(monkeypatch):
+    monkeypatch.setattr(video_utils.cv2, 'VideoWriter', RecordingWriter)
+    RecordingWriter.fail_at = None
+    RecordingWriter.error = RuntimeError
+    return RecordingWriter
+
+def test_frames_written_in_order(recording_writer, tmp_path):
+    frames = make_frames(200)
+    #a small queue so the producer keeps blocking on the encoder
+    with VideoWriter(str(tmp_path / 'out.avi'), queue_size=2) as out:
+        for frame in frames:
+            out.write(frame)
+    assert len(recording_writer.written) == len(frames)
+    assert all(written is frame for written, frame in zip(recording_writer.written, frames))
+
+def test_write_error_reaches_the_producer(recording_writer, tmp_path):
+    recording_writer.fail_at = 3
+    out = VideoWriter(str(tmp_path / 'out.avi'), queue_size=2)
+    #the encoder keeps draining after the failure, so the producer is never stuck on a full queue
+    with pytest.raises(RuntimeError, match='write failed'):
+        for frame in make_frames(200):
+            out.write(frame)
+    with pytest.raises(RuntimeError, match='write failed'):
+        out.close()
+    assert len(recording_writer.written) == 3
+
+def test_close_after_error_does_not_hang(recording_writer, tmp_path):
+    recording_writer.fail_at = 0
+    out = VideoWriter(str(tmp_path / 'out.avi'), queue_size=1)
+    out.write(make_frames(1)[0])
+    with pytest.raises(RuntimeError, match='write failed'):
+        out.close()
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_close_when_encoder_thread_died(recording_writer, tmp_path):
+    #an exception the encoder doesn't catch ends the thread with frames still queued
+    recording_writer.fail_at = 0
+    recording_writer.error = SystemExit
+    out = VideoWriter(str(tmp_path / 'out.avi'), queue_size=1)
+    with pytest.raises(RuntimeError, match='stopped'):
+        for frame in make_frames(10):
+            out.write(frame)
+    with pytest.raises(RuntimeError, match='stopped'):
+        out.close()
+
+def test_save_video_round_trip(tmp_path):
+    frames = make_frames()
+    output_path = str(tmp_path / 'out.avi')
+    save_video(iter(frames), output_path)
+    reader = VideoReader(output_path)
+    written = reader.read_frames()
+    assert len(written) == len(frames)
+    np.testing.assert_allclose(brightness(written), brightness(frames), atol=4)
+
+def test_save_video_segments_serial_fallback(tmp_path, monkeypatch):
+    #without ffmpeg the segments can't be joined, so the video is written in one pass
+    monkeypatch.setattr(video_utils.shutil, 'which', lambda name: None)
+    frames = make_frames()
+    output_path = str(tmp_path / 'out.avi')
+    save_video_segments(frames, output_path, workers=2, segment_size=8)
+    written = VideoReader(output_path).read_frames()
+    assert len(written) == len(frames)
+    np.testing.assert_allclose(brightness(written), brightness(frames), atol=4)
+
+@pytest.mark.skipif(video_utils.shutil.which('ffmpeg') is None, reason='segments are joined with ffmpeg')
+@pytest.mark.parametrize('as_reader', [False, True])
+def test_save_video_segments_matches_order(tmp_path, as_reader):
+    frames = make_frames()
+    source = frames
+    if as_reader:
+        source_path = str(tmp_path / 'source.avi')
+        save_video(frames, source_path)
+        source = VideoReader(source_path)
+    output_path = str(tmp_path / 'out.avi')
+    save_video_segments(source, output_path, workers=2, segment_size=8)
+    written = VideoReader(output_path).read_frames()
+    assert len(written) == len(frames)
+    np.testing.assert_allclose(brightness(written), brightness(frames), atol=4)
@@ -1,2 +0,0 @@
-from .video_utils import read_video, save_video
-from .bbox_utils import get_box_centre, get_box_width, measure_distance, measure_xy_distance, get_foot_position
\ No newline at end of file